@@ -1,6 +1,7 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from typing import List, Tuple, Optional
 from io import BytesIO
 import base64
@@ -9,43 +10,75 @@ import os
 
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 
+from app.cache import DiskCache, LRUCache, TieredCache, stable_key
+from app.config import get_settings
+from app.storage import IMAGE_SPECS, get_repository
+
 
 # ---------- Fonts
 
-def _try_font(paths: List[str], size: int) -> Optional[ImageFont.FreeTypeFont]:
+# Common system font candidates; add more if you have them
+FONT_CANDIDATES: dict[str, List[str]] = {
+    "regular": [
+        "/System/Library/Fonts/SFNS.ttf",
+        "/Library/Fonts/Arial.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    ],
+    "bold": [
+        "/System/Library/Fonts/SFNSBold.ttf",
+        "/Library/Fonts/Arial Bold.ttf",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    ],
+    "mono": [
+        "/Library/Fonts/Menlo.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
+    ],
+}
+
+# weight -> first candidate that actually loads (None = Pillow's default bitmap font)
+_FONT_PATHS: dict[str, Optional[str]] = {}
+
+def _try_font(paths: List[str], size: int) -> Optional[str]:
     for p in paths:
         if os.path.exists(p):
             try:
-                return ImageFont.truetype(p, size=size)
+                ImageFont.truetype(p, size=size)
+                return p
             except Exception:
                 continue
     return None
 
-def load_font(size: int, weight: str = "regular") -> ImageFont.ImageFont:
-    # Common system font candidates; add more if you have them
-    CANDIDATES = {
-        "regular": [
-            "/System/Library/Fonts/SFNS.ttf",
-            "/System/Library/Fonts/SFNS.ttf",
-            "/Library/Fonts/Arial.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        ],
-        "bold": [
-            "/System/Library/Fonts/SFNSBold.ttf",
-            "/Library/Fonts/Arial Bold.ttf",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-        ],
-        "mono": [
-            "/Library/Fonts/Menlo.ttc",
-            "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf",
-        ],
-    }
-    font = _try_font(CANDIDATES.get(weight, CANDIDATES["regular"]), size)
-    if font:
-        return font
+def _font_path(weight: str) -> Optional[str]:
+    if weight not in _FONT_PATHS:
+        _FONT_PATHS[weight] = _try_font(FONT_CANDIDATES[weight], 12)
+    return _FONT_PATHS[weight]
+
+@lru_cache(maxsize=128)
+def _font(weight: str, size: int) -> ImageFont.ImageFont:
+    path = _font_path(weight)
+    if path:
+        return ImageFont.truetype(path, size=size)
     # Fallback
     return ImageFont.load_default()
 
+def load_font(size: int, weight: str = "regular") -> ImageFont.ImageFont:
+    """Process-wide memoized font by (weight, size); paths are resolved once."""
+    return _font(weight if weight in FONT_CANDIDATES else "regular", size)
+
+def resolved_fonts() -> dict[str, Optional[str]]:
+    """Which file each weight resolved to (None = default bitmap font)."""
+    return {w: _font_path(w) for w in FONT_CANDIDATES}
+
+def font_stats() -> dict[str, object]:
+    info = _font.cache_info()
+    return {
+        "resolved": resolved_fonts(),
+        "cached": info.currsize,
+        "max": info.maxsize,
+        "hits": info.hits,
+        "misses": info.misses,
+    }
+
 
 # ---------- Colors / themes
 
@@ -58,6 +91,15 @@ BRANDS: dict[str, Tuple[str, str, str]] = {
     "amber":   ("#92400e", "#111827", "#fcd34d"),
 }
 
+RATIOS = ("square", "portrait", "landscape")
+
+def poster_height(width: int, ratio: str) -> int:
+    if ratio == "portrait":
+        return int(width * 1.25)  # 1080x1350-ish
+    if ratio == "landscape":
+        return int(width * 0.56)
+    return width
+
 def hex_to_rgb(h: str) -> Tuple[int, int, int]:
     h = h.lstrip("#")
     return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))  # type: ignore[return-value]
@@ -71,24 +113,98 @@ def draw_gradient(w: int, h: int, c1: str, c2: str) -> Image.Image:
     mask = Image.linear_gradient("L").resize((w, h)).filter(ImageFilter.GaussianBlur(2))
     return Image.composite(top, a, mask)
 
+_BG_CACHE: Optional[LRUCache[Image.Image]] = None
+
+def gradient_background(w: int, h: int, c1: str, c2: str) -> Image.Image:
+    """
+    Fresh, writable copy of the (w, h, c1, c2) gradient. The blurred gradient is
+    built once per key and kept in a memory-bounded LRU; copying it is a memcpy.
+    """
+    global _BG_CACHE
+    if _BG_CACHE is None:
+        _BG_CACHE = LRUCache(
+            maxsize=256,
+            max_bytes=get_settings().IMAGE_BG_CACHE_MB * 1024 * 1024,
+            sizeof=lambda im: im.width * im.height * len(im.getbands()),
+        )
+    key = f"{w}x{h}:{c1}:{c2}"
+    bg = _BG_CACHE.get(key)
+    if bg is None:
+        bg = draw_gradient(w, h, c1, c2)
+        _BG_CACHE.set(key, bg)
+    return bg.copy()
+
+def prewarm_backgrounds(widths: List[int]) -> int:
+    """Build every brand x ratio background for the given widths; returns how many."""
+    n = 0
+    for w in widths:
+        for ratio in RATIOS:
+            for start, end, _ in BRANDS.values():
+                gradient_background(w, poster_height(w, ratio), start, end)
+                n += 1
+    return n
+
+def background_stats() -> dict[str, object]:
+    return _BG_CACHE.stats() if _BG_CACHE is not None else {}
+
 def rounded_rect(draw: ImageDraw.ImageDraw, xy, radius: int, fill):
     draw.rounded_rectangle(xy, radius=radius, fill=fill)
 
+# ---------- Text measurement
+# Word widths are memoized per (font, text, mode); fonts are themselves memoized,
+# so identity is stable. A line's width is estimated as the sum of its word
+# widths plus spaces; only when that estimate lands within _WRAP_SLACK of the
+# limit (where kerning could tip it) is the whole line measured exactly.
+
+_WRAP_SLACK = 0.03
+
+@lru_cache(maxsize=32768)
+def text_width(font, text: str, mode: str = "L") -> float:
+    return font.getlength(text, mode=mode)
+
 def wrap(draw: ImageDraw.ImageDraw, text: str, font, max_w: int) -> List[str]:
     words = text.strip().split()
     if not words:
         return []
+    mode = draw.fontmode
+    space = text_width(font, " ", mode)
     lines, cur = [], words[0]
+    cur_w = text_width(font, cur, mode)
     for w in words[1:]:
-        trial = cur + " " + w
-        if draw.textlength(trial, font=font) <= max_w:
-            cur = trial
+        word_w = text_width(font, w, mode)
+        est = cur_w + space + word_w
+        if est > max_w * (1 - _WRAP_SLACK) and est <= max_w * (1 + _WRAP_SLACK):
+            est = text_width(font, cur + " " + w, mode)  # near the limit: measure exactly
+        if est <= max_w:
+            cur = cur + " " + w
+            cur_w = est
         else:
             lines.append(cur)
-            cur = w
+            cur, cur_w = w, word_w
     lines.append(cur)
     return lines
 
+def fit_font(
+    draw: ImageDraw.ImageDraw,
+    text: str,
+    weight: str,
+    max_w: int,
+    max_lines: int,
+    max_size: int,
+    min_size: int,
+):
+    """Largest font size in [min_size, max_size] whose wrap of `text` fits in `max_lines`."""
+    lo, hi = min_size, max_size
+    if len(wrap(draw, text, load_font(hi, weight), max_w)) <= max_lines:
+        return load_font(hi, weight)  # common case: no shrinking needed
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if len(wrap(draw, text, load_font(mid, weight), max_w)) <= max_lines:
+            lo = mid
+        else:
+            hi = mid - 1
+    return load_font(lo, weight)
+
 def draw_text_block(draw: ImageDraw.ImageDraw, x: int, y: int, text: str, font, max_w: int, line_h: float, fill=(255,255,255)) -> int:
     lines = wrap(draw, text, font, max_w)
     for i, ln in enumerate(lines):
@@ -110,12 +226,168 @@ class PosterSpec:
     width: int
     height: int
     seed: Optional[int] = None
+    # layout variation used by candidate ranking (None = house layout); the
+    # public `seed` does not change the layout
+    layout_variant: Optional[int] = None
+    # encoding (see encode_image)
+    format: str = "png"  # "png" | "webp" | "jpeg"
+    quality: Optional[int] = None  # webp/jpeg 1-100; profile default if None
+    compress_level: Optional[int] = None  # png 0-9; profile default if None
+    profile: str = "default"  # "default" | "preview"
+
+# Bump whenever a change to render_poster alters the pixels for the same spec,
+# so stale entries in the (possibly on-disk) render cache stop matching.
+RENDER_VERSION = 3  # 2: layout_params variations; 3: long titles auto-shrink
+
+TITLE_MAX_LINES = 4
+
+def spec_key(spec: PosterSpec) -> str:
+    """Stable, process-independent content address for a spec."""
+    return stable_key("poster", RENDER_VERSION, asdict(spec))
+
+_RENDER_CACHE: Optional[TieredCache[bytes]] = None
+
+def render_cache() -> TieredCache[bytes]:
+    global _RENDER_CACHE
+    if _RENDER_CACHE is None:
+        settings = get_settings()
+        _RENDER_CACHE = TieredCache(
+            LRUCache(maxsize=4096, max_bytes=settings.IMAGE_CACHE_MAX_MB * 1024 * 1024),
+            DiskCache(settings.IMAGE_CACHE_DIR) if settings.IMAGE_CACHE_DIR else None,
+        )
+    return _RENDER_CACHE
+
+# key -> spec for images handed out by URL, so an evicted render can be redrawn.
+# Kept in storage (IMAGE_SPECS) so any worker can serve the URL; the LRU only
+# saves a storage round trip for specs this worker has already seen.
+_SPECS: LRUCache[PosterSpec] = LRUCache(maxsize=65536)
+
+def register_spec(spec: PosterSpec) -> str:
+    key = spec_key(spec)
+    if _SPECS.get(key) is None:
+        get_repository(IMAGE_SPECS).add({"id": key, "spec": asdict(spec)})  # False if already stored
+        _SPECS.set(key, spec)
+    return key
+
+def lookup_spec(key: str) -> Optional[PosterSpec]:
+    spec = _SPECS.get(key)
+    if spec is None:
+        doc = get_repository(IMAGE_SPECS).get(key)
+        if doc is None:
+            return None
+        spec = PosterSpec(**doc["spec"])
+        _SPECS.set(key, spec)
+    return spec
+
+def sniff_media_type(img_bytes: bytes) -> str:
+    if img_bytes[:4] == b"RIFF" and img_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    if img_bytes[:2] == b"\xff\xd8":
+        return "image/jpeg"
+    return "image/png"
 
 def poster_bytes(spec: PosterSpec) -> bytes:
-    r = random.Random(spec.seed or (hash(spec.title) & 0xFFFF))
+    """Encoded poster for `spec`, served from the render cache when possible."""
+    cache = render_cache()
+    key = spec_key(spec)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    img_bytes = render_poster(spec)
+    cache.set(key, img_bytes)
+    return img_bytes
+
+@dataclass(frozen=True)
+class LayoutParams:
+    title_scale: float = 0.075   # font size as a fraction of width
+    body_scale: float = 0.042
+    title_leading: float = 1.18  # line height as a multiple of font size
+    body_leading: float = 1.38
+    gap: float = 0.02            # headline -> bullets, as a fraction of height
+
+def layout_params(variant: Optional[int]) -> LayoutParams:
+    """House layout when `variant` is None; a reproducible variation of it otherwise."""
+    if variant is None:
+        return LayoutParams()
+    r = random.Random(variant)
+    return LayoutParams(
+        title_scale=round(r.uniform(0.060, 0.085), 4),
+        body_scale=round(r.uniform(0.036, 0.046), 4),
+        title_leading=round(r.uniform(1.10, 1.25), 3),
+        body_leading=round(r.uniform(1.28, 1.48), 3),
+        gap=round(r.uniform(0.01, 0.04), 3),
+    )
+
+@dataclass
+class LayoutStats:
+    content_top: int
+    text_bottom: int
+    safe_bottom: int       # lowest y text may reach without crowding the footer
+    title_lines: int
+    last_title_words: int
+
+def layout_score(st: LayoutStats) -> float:
+    """Cheap layout heuristic; higher is better, 1.0 is ideal."""
+    usable = max(1, st.safe_bottom - st.content_top)
+    overflow = max(0, st.text_bottom - st.safe_bottom) / usable
+    fill = (min(st.text_bottom, st.safe_bottom) - st.content_top) / usable
+    score = 1.0
+    score -= 4.0 * overflow                       # text running into the footer / off the card
+    score -= abs(fill - 0.6)                      # whitespace balance: neither cramped nor empty
+    score -= 0.1 * max(0, st.title_lines - 3)     # long headlines read poorly
+    if st.title_lines > 1 and st.last_title_words == 1:
+        score -= 0.1                              # widowed last word
+    return score
+
+def score_poster(spec: PosterSpec) -> float:
+    """Lay out (but don't encode) a spec and score it; runs on the render pool."""
+    return layout_score(_draw_poster(spec)[1])
+
+# Encoder settings per profile. "preview" trades bytes for encode speed (editor
+# previews); "default" is tuned for the final asset. PNG optimize=True is a full
+# zlib level-9 search and dominates render time for large gradients.
+ENCODE_PROFILES: dict[str, dict[str, dict]] = {
+    "default": {
+        "png": {"optimize": True},
+        "webp": {"quality": 90, "method": 4},
+        "jpeg": {"quality": 90, "optimize": True, "progressive": True},
+    },
+    "preview": {
+        "png": {"compress_level": 1},
+        "webp": {"quality": 75, "method": 0},
+        "jpeg": {"quality": 80},
+    },
+}
+
+def encode_image(
+    img: Image.Image,
+    format: str = "png",
+    quality: Optional[int] = None,
+    compress_level: Optional[int] = None,
+    profile: str = "default",
+) -> bytes:
+    fmt = format.lower().replace("jpg", "jpeg")
+    params = dict(ENCODE_PROFILES.get(profile, ENCODE_PROFILES["default"]).get(fmt, {}))
+    if fmt == "png" and compress_level is not None:
+        params.pop("optimize", None)  # optimize would force level 9
+        params["compress_level"] = compress_level
+    if fmt in ("webp", "jpeg") and quality is not None:
+        params["quality"] = quality
+    buf = BytesIO()
+    img.save(buf, format={"png": "PNG", "webp": "WEBP", "jpeg": "JPEG"}.get(fmt, "PNG"), **params)
+    return buf.getvalue()
+
+def render_poster(spec: PosterSpec) -> bytes:
+    return encode_image(draw_poster(spec), spec.format, spec.quality, spec.compress_level, spec.profile)
+
+def draw_poster(spec: PosterSpec) -> Image.Image:
+    return _draw_poster(spec)[0]
+
+def _draw_poster(spec: PosterSpec) -> Tuple[Image.Image, LayoutStats]:
+    lp = layout_params(spec.layout_variant)
 
     start, end, accent = BRANDS.get(spec.brand, BRANDS["slate"])
-    bg = draw_gradient(spec.width, spec.height, start, end)
+    bg = gradient_background(spec.width, spec.height, start, end)
     draw = ImageDraw.Draw(bg)
 
     # Card inset for clean margins
@@ -123,15 +395,25 @@ def poster_bytes(spec: PosterSpec) -> bytes:
     card = (pad, pad, spec.width - pad, spec.height - pad)
     rounded_rect(draw, card, radius=int(0.06 * spec.width), fill=(0, 0, 0, 0))  # just masks corners visually
 
-    # Typography
-    title_font = load_font(int(spec.width * 0.075), "bold")
-    body_font  = load_font(int(spec.width * 0.042), "regular")
-    small_font = load_font(int(spec.width * 0.032), "regular")
-
     x0, y0 = card[0] + int(0.07 * spec.width), card[1] + int(0.08 * spec.height)
     max_w = card[2] - x0 - int(0.07 * spec.width)
-    line_h_title = int(title_font.size * 1.18)
-    line_h_body  = int(body_font.size * 1.38)
+    mid_x = spec.width // 2
+
+    # Typography: long headlines shrink (down to 60%) to stay within TITLE_MAX_LINES
+    if spec.template == "split":
+        title_text, title_w = spec.title, mid_x - x0 - 20
+    elif spec.template == "stat":
+        parts = spec.title.split(None, 1)
+        title_text, title_w = (parts[1] if len(parts) > 1 else ""), max_w
+    else:
+        title_text, title_w = spec.title, max_w
+    title_size = int(spec.width * lp.title_scale)
+    title_font = fit_font(draw, title_text, "bold", title_w, TITLE_MAX_LINES, title_size, int(title_size * 0.6))
+    body_font  = load_font(int(spec.width * lp.body_scale), "regular")
+    small_font = load_font(int(spec.width * 0.032), "regular")
+    line_h_title = int(title_font.size * lp.title_leading)
+    line_h_body  = int(body_font.size * lp.body_leading)
+    content_top = y0
 
     # Template variants
     if spec.template == "quote":
@@ -142,9 +424,9 @@ def poster_bytes(spec: PosterSpec) -> bytes:
 
     if spec.template == "split":
         # Title left, bullets right
-        mid_x = spec.width // 2
         # left title
         y = y0
+        title_lines = wrap(draw, spec.title, title_font, mid_x - x0 - 20)
         y = draw_text_block(draw, x0, y, spec.title, title_font, max_w=mid_x - x0 - 20, line_h=line_h_title)
         # right bullets
         bx = mid_x + 20
@@ -154,6 +436,7 @@ def poster_bytes(spec: PosterSpec) -> bytes:
             by = draw_text_block(draw, bx, by, bullet, body_font, max_w=card[2] - bx, line_h=line_h_body)
         # accent bar
         draw.rectangle([mid_x - 4, y0, mid_x, by], fill=hex_to_rgb(accent))
+        y = max(y, by)
     elif spec.template == "stat":
         # Title as number first token
         parts = spec.title.split(None, 1)
@@ -162,30 +445,38 @@ def poster_bytes(spec: PosterSpec) -> bytes:
         big_font = load_font(int(spec.width * 0.18), "bold")
         stroke_text(draw, (x0, y0), num, big_font, fill=(255,255,255))
         y = y0 + int(big_font.size * 0.9)
+        title_lines = wrap(draw, rest, title_font, max_w)
         y = draw_text_block(draw, x0, y + 10, rest, title_font, max_w=max_w, line_h=line_h_title)
         y += 10
         for b in spec.bullets[:4]:
             y = draw_text_block(draw, x0, y, f"• {b}", body_font, max_w=max_w, line_h=line_h_body)
     else:
         # "poster" default: headline + up to 6 bullets
+        title_lines = wrap(draw, spec.title, title_font, max_w)
         y = draw_text_block(draw, x0, y0, spec.title, title_font, max_w=max_w, line_h=line_h_title)
-        y += int(0.02 * spec.height)
+        y += int(lp.gap * spec.height)
         for b in spec.bullets[:6]:
             y = draw_text_block(draw, x0, y, f"• {b}", body_font, max_w=max_w, line_h=line_h_body)
 
     # Footer tag
     footer = "Influence OS — Prototype"
     fw = draw.textlength(footer, font=small_font)
-    draw.text((spec.width - pad - fw, spec.height - pad - small_font.size - 6), footer, font=small_font, fill=(220, 225, 233))
-
-    buf = BytesIO()
-    bg.save(buf, format="PNG", optimize=True)
-    return buf.getvalue()
+    footer_y = spec.height - pad - small_font.size - 6
+    draw.text((spec.width - pad - fw, footer_y), footer, font=small_font, fill=(220, 225, 233))
+
+    stats = LayoutStats(
+        content_top=content_top,
+        text_bottom=y,
+        safe_bottom=footer_y - small_font.size,
+        title_lines=len(title_lines),
+        last_title_words=len(title_lines[-1].split()) if title_lines else 0,
+    )
+    return bg, stats
 
 
 # ---------- Public API used by router
 
-def generate_image(
+def build_spec(
     title: str,
     bullets: Optional[List[str]] = None,
     template: str = "poster",
@@ -193,25 +484,40 @@ def generate_image(
     ratio: str = "square",
     width: int = 1080,
     seed: Optional[int] = None,
-) -> str:
-    """Return data URL (PNG)"""
-    if ratio == "portrait":
-        height = int(width * 1.25)  # 1080x1350-ish
-    elif ratio == "landscape":
-        height = int(width * 0.56)
-    else:
-        height = width
-
-    img_bytes = poster_bytes(
-        PosterSpec(
-            title=title.strip(),
-            bullets=[b.strip() for b in (bullets or []) if b.strip()],
-            template=template,
-            brand=brand,
-            width=width,
-            height=height,
-            seed=seed,
-        )
+    format: str = "png",
+    quality: Optional[int] = None,
+    compress_level: Optional[int] = None,
+    profile: str = "default",
+    layout_variant: Optional[int] = None,
+) -> PosterSpec:
+    return PosterSpec(
+        title=title.strip(),
+        bullets=[b.strip() for b in (bullets or []) if b.strip()],
+        template=template,
+        brand=brand,
+        width=width,
+        height=poster_height(width, ratio),
+        seed=seed,
+        layout_variant=layout_variant,
+        format=format,
+        quality=quality,
+        compress_level=compress_level,
+        profile=profile,
     )
+
+def to_data_url(img_bytes: bytes, media_type: str = "image/png") -> str:
     b64 = base64.b64encode(img_bytes).decode("ascii")
-    return f"data:image/png;base64,{b64}"
+    return f"data:{media_type};base64,{b64}"
+
+def generate_image(
+    title: str,
+    bullets: Optional[List[str]] = None,
+    template: str = "poster",
+    brand: str = "slate",
+    ratio: str = "square",
+    width: int = 1080,
+    seed: Optional[int] = None,
+) -> str:
+    """Return data URL (PNG). Renders inline; routers use render_pool instead."""
+    spec = build_spec(title, bullets, template, brand, ratio, width, seed)
+    return to_data_url(poster_bytes(spec))
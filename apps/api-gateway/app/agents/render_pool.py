@@ -0,0 +1,244 @@
+"""
+Off-loop rendering backend for posters.
+
+Pillow work is CPU-bound; running it in FastAPI's default threadpool makes a
+burst of large posters compete with every other route for the GIL. Routers
+`await render(spec)` instead, which:
+
+  - serves repeats straight from the render cache (image_agent.render_cache),
+  - otherwise runs image_agent.render_poster on a dedicated executor
+    (IMAGE_RENDER_BACKEND = process | thread, IMAGE_RENDER_WORKERS) behind
+    app.executors.BoundedExecutor (IMAGE_RENDER_QUEUE waiting jobs at most),
+  - gives up on a job after IMAGE_RENDER_TIMEOUT_S (504).
+
+`image_response(spec, output)` wraps that for the routers: a JSON data URL, the
+raw image bytes, or a short content-addressed URL served by GET /v1/images/{id}.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
+import asyncio
+import multiprocessing
+import os
+
+from fastapi import Response
+
+from app.config import get_settings
+from app.executors import BoundedExecutor
+from .image_agent import (
+    PosterSpec,
+    background_stats,
+    font_stats,
+    prewarm_backgrounds,
+    register_spec,
+    render_cache,
+    render_poster,
+    resolved_fonts,
+    score_poster,
+    sniff_media_type,
+    spec_key,
+    to_data_url,
+)
+
+__all__ = [
+    "RenderPool",
+    "get_render_pool",
+    "render",
+    "rank_candidates",
+    "image_response",
+    "binary_response",
+    "start_render_pool",
+    "shutdown_render_pool",
+]
+
+T = TypeVar("T")
+
+# Where GET /images/{id} is mounted (routers/images.py under the /v1 sub-app)
+IMAGE_URL_PREFIX = "/v1/images"
+
+
+def _worker_init(widths: List[int]) -> None:
+    # Each worker process has its own font/background caches; fill them up front.
+    resolved_fonts()
+    prewarm_backgrounds(widths)
+
+
+def _worker_stats() -> Dict[str, Any]:
+    return {"pid": os.getpid(), "backgrounds": background_stats(), "fonts": font_stats()}
+
+
+def _with_stats(fn: Callable[..., T], *args: Any) -> Tuple[T, Dict[str, Any]]:
+    # process workers report their cache stats alongside every result, so
+    # nothing has to be sent to them just to read stats
+    return fn(*args), _worker_stats()
+
+
+class RenderPool:
+    def __init__(
+        self,
+        backend: str = "process",
+        workers: int = 2,
+        queue_size: int = 32,
+        timeout: float = 20.0,
+        prewarm_widths: Optional[List[int]] = None,
+    ) -> None:
+        self.backend = backend
+        self._reports: Dict[int, Dict[str, Any]] = {}  # pid -> last stats a worker sent back
+        workers = max(1, workers)
+        executor: Executor
+        if backend == "process":
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                # spawn: never fork a process that is running an event loop and threads
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_worker_init,
+                initargs=(prewarm_widths or [],),
+            )
+            # workers spawn lazily; start them now rather than on the first request
+            # (their first report fills in worker_stats before any render)
+            for _ in range(workers):
+                executor.submit(_worker_stats).add_done_callback(self._record_stats)
+        else:
+            _worker_init(prewarm_widths or [])  # threads share this process's caches
+            executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._jobs = BoundedExecutor(
+            executor,
+            workers,
+            queue_size,
+            busy_detail="Image renderer is busy, retry shortly",
+            timeout=timeout,
+            timeout_detail="Image render timed out",
+        )
+        self._executor = executor
+        self.workers = self._jobs.workers
+        self.capacity = self._jobs.capacity
+        self.timeout = timeout
+
+    def _record_stats(self, fut: Future) -> None:
+        if not fut.cancelled() and fut.exception() is None:
+            report = fut.result()
+            self._reports[report["pid"]] = report
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` on the pool with admission control and a timeout."""
+        if self.backend != "process":
+            return await self._jobs.run(fn, *args)
+        result, report = await self._jobs.run(_with_stats, fn, *args)
+        self._reports[report["pid"]] = report
+        return result
+
+    async def render(self, spec: PosterSpec) -> bytes:
+        cache = render_cache()
+        key = spec_key(spec)
+        hit = cache.get(key)
+        if hit is not None:
+            return hit
+        img_bytes = await self.run(render_poster, spec)
+        cache.set(key, img_bytes)
+        return img_bytes
+
+    def worker_stats(self) -> Dict[str, Any]:
+        """
+        Font / background cache stats from where rendering happens: this
+        process for the thread backend, otherwise the latest report each worker
+        process sent back with a job (no probes, so stats requests never take
+        render capacity). `reporting` can be below `workers` until every worker
+        has run a job.
+        """
+        if self.backend != "process":
+            return {"reporting": 1, "workers": [_worker_stats()]}
+        reports = sorted(self._reports.values(), key=lambda w: w["pid"])
+        return {"reporting": len(reports), "workers": reports}
+
+    def stats(self) -> dict:
+        return {"backend": self.backend, **self._jobs.stats()}
+
+    def shutdown(self) -> None:
+        self._jobs.shutdown()
+
+
+_POOL: Optional[RenderPool] = None
+
+
+def start_render_pool() -> RenderPool:
+    global _POOL
+    if _POOL is None:
+        s = get_settings()
+        _POOL = RenderPool(
+            backend=s.IMAGE_RENDER_BACKEND,
+            workers=s.IMAGE_RENDER_WORKERS,
+            queue_size=s.IMAGE_RENDER_QUEUE,
+            timeout=s.IMAGE_RENDER_TIMEOUT_S,
+            prewarm_widths=[int(w) for w in s.IMAGE_PREWARM_WIDTHS.split(",") if w.strip()],
+        )
+    return _POOL
+
+
+def get_render_pool() -> RenderPool:
+    """The app's pool (created on first use if the lifespan did not start it)."""
+    return _POOL or start_render_pool()
+
+
+def shutdown_render_pool() -> None:
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
+
+
+async def render(spec: PosterSpec) -> bytes:
+    return await get_render_pool().render(spec)
+
+
+async def rank_candidates(spec: PosterSpec, n: int) -> List[Tuple[float, PosterSpec]]:
+    """
+    Lay out `n` layout variations of `spec` on the pool and return them as
+    (score, spec), best first. Candidate 0 is `spec` itself (the house layout
+    unless it already names a layout_variant); only the winners need to be
+    encoded afterwards. At most `workers` candidates are in flight per call,
+    so one request cannot take every admission slot from concurrent ones.
+    """
+    if spec.layout_variant is not None:
+        base = spec.layout_variant
+    else:
+        base = spec.seed if spec.seed is not None else int(spec_key(spec)[:8], 16)
+    candidates = [spec] + [replace(spec, layout_variant=base + k) for k in range(1, n)]
+    pool = get_render_pool()
+    fanout = asyncio.Semaphore(pool.workers)
+
+    async def _score(c: PosterSpec) -> float:
+        async with fanout:
+            return await pool.run(score_poster, c)
+
+    scores = await asyncio.gather(*(_score(c) for c in candidates))
+    return sorted(zip(scores, candidates), key=lambda sc: sc[0], reverse=True)
+
+
+def binary_response(img_bytes: bytes, key: str) -> Response:
+    # content-addressed: the bytes behind a key never change
+    return Response(
+        content=img_bytes,
+        media_type=sniff_media_type(img_bytes),
+        headers={
+            "ETag": f'"{key}"',
+            "Cache-Control": "public, max-age=31536000, immutable",
+        },
+    )
+
+
+async def image_response(spec: PosterSpec, output: str = "data_url") -> Union[Dict[str, Any], Response]:
+    """
+    output = data_url  -> {width, height, data_url}   (base64 inside JSON; legacy default)
+             binary    -> image bytes with ETag / immutable Cache-Control
+             url       -> {width, height, url}        (fetch the bytes from `url`)
+    """
+    img_bytes = await render(spec)
+    if output == "binary":
+        return binary_response(img_bytes, spec_key(spec))
+    if output == "url":
+        key = await asyncio.to_thread(register_spec, spec)  # storage write; may block on SQLite
+        return {"width": spec.width, "height": spec.height, "url": f"{IMAGE_URL_PREFIX}/{key}"}
+    data_url = to_data_url(img_bytes, sniff_media_type(img_bytes))
+    return {"width": spec.width, "height": spec.height, "data_url": data_url}
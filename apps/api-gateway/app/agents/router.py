@@ -1,6 +1,8 @@
 # apps/api-gateway/app/agents/router.py
 from __future__ import annotations
 
+import asyncio
+
 from fastapi import APIRouter, HTTPException, Query
 from pydantic import BaseModel, Field
 from typing import List, Optional, Literal, Dict
@@ -18,7 +20,8 @@ except Exception:  # pragma: no cover - optional
     _generate_text = None  # type: ignore[assignment]
 
 from .research_agent import trend_topics, topic_cards
-from .image_agent import generate_image
+from .image_agent import build_spec
+from .render_pool import image_response, rank_candidates
 
 
 router = APIRouter(prefix="/agents", tags=["agents"])
@@ -51,13 +54,31 @@ class ImgReq(BaseModel):
     ratio: Literal["square", "portrait", "landscape"] = "square"
     width: int = Field(1080, ge=640, le=2000)
     seed: Optional[int] = None
-    # Optional quality knob if your image agent supports variant ranking later
+    # Lay out this many layout variations, score them and return the best
     n_candidates: int = Field(1, ge=1, le=12)
+    layout_variant: Optional[int] = Field(
+        None, description="Reproduce a ranked candidate (its `layout_variant`); default: house layout"
+    )
+    top_k: int = Field(1, ge=1, le=12, description="Also return the k best candidates")
+    output: Literal["data_url", "binary", "url"] = Field(
+        "data_url", description="data_url (JSON) | binary (raw image) | url (GET /v1/images/{id})"
+    )
+    format: Literal["png", "webp", "jpeg"] = "png"
+    quality: Optional[int] = Field(None, ge=1, le=100, description="webp/jpeg quality")
+    compress_level: Optional[int] = Field(None, ge=0, le=9, description="png zlib level")
+    profile: Literal["default", "preview"] = Field(
+        "default", description="preview = fast encode, bigger file (editor previews)"
+    )
 
 class ImgRes(BaseModel):
     width: int
     height: int
-    data_url: str
+    data_url: Optional[str] = None
+    url: Optional[str] = None
+    seed: Optional[int] = None
+    layout_variant: Optional[int] = None
+    score: Optional[float] = None
+    candidates: Optional[List["ImgRes"]] = None
 
 class TopicCardsRes(BaseModel):
     topic: str
@@ -128,9 +149,9 @@ def research_topic_cards(
 
 # -------- Images --------
 
-@router.post("/images/generate", response_model=ImgRes)
-def images_generate(req: ImgReq):
-    data_url = generate_image(
+@router.post("/images/generate", response_model=ImgRes, response_model_exclude_none=True)
+async def images_generate(req: ImgReq):
+    spec = build_spec(
         title=req.title,
         bullets=req.bullets,
         template=req.template,
@@ -138,15 +159,29 @@ def images_generate(req: ImgReq):
         ratio=req.ratio,
         width=req.width,
         seed=req.seed,
+        format=req.format,
+        quality=req.quality,
+        compress_level=req.compress_level,
+        profile=req.profile,
+        layout_variant=req.layout_variant,
     )
-    height = req.width if req.ratio == "square" else (
-        int(req.width * 1.25) if req.ratio == "portrait" else int(req.width * 0.56)
-    )
-    return {"width": req.width, "height": height, "data_url": data_url}
+    if req.n_candidates <= 1:
+        return await image_response(spec, req.output)
+
+    ranked = await rank_candidates(spec, req.n_candidates)
+    top = ranked[: min(req.top_k, len(ranked))]
+    if req.output == "binary":
+        return await image_response(top[0][1], "binary")
+    outs = await asyncio.gather(*(image_response(s, req.output) for _, s in top))
+    items = [
+        {**o, "seed": s.seed, "layout_variant": s.layout_variant, "score": round(score, 4)}
+        for (score, s), o in zip(top, outs)
+    ]
+    return {**items[0], "candidates": items if req.top_k > 1 else None}
 
 # Handy GET for quick manual tests in the browser:
-@router.get("/images/generate", response_model=ImgRes)
-def images_generate_get(
+@router.get("/images/generate", response_model=ImgRes, response_model_exclude_none=True)
+async def images_generate_get(
     title: str = Query(...),
     bullets: Optional[str] = Query(None, description="Comma- or semicolon-separated bullets"),
     template: Literal["poster", "split", "quote", "stat"] = Query("poster"),
@@ -154,16 +189,17 @@ def images_generate_get(
     ratio: Literal["square", "portrait", "landscape"] = Query("square"),
     width: int = Query(1080, ge=640, le=2000),
     seed: Optional[int] = Query(None),
+    output: Literal["data_url", "binary", "url"] = Query("data_url"),
+    format: Literal["png", "webp", "jpeg"] = Query("png"),
+    profile: Literal["default", "preview"] = Query("default"),
 ):
     bl = []
     if bullets:
         # split on commas/semicolons
         parts = [p.strip() for p in bullets.replace(";", ",").split(",")]
         bl = [p for p in parts if p]
-    data_url = generate_image(
-        title=title, bullets=bl, template=template, brand=brand, ratio=ratio, width=width, seed=seed
-    )
-    height = width if ratio == "square" else (
-        int(width * 1.25) if ratio == "portrait" else int(width * 0.56)
+    spec = build_spec(
+        title=title, bullets=bl, template=template, brand=brand, ratio=ratio, width=width, seed=seed,
+        format=format, profile=profile,
     )
-    return {"width": width, "height": height, "data_url": data_url}
+    return await image_response(spec, output)
@@ -1,19 +1,25 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
-from typing import Callable, Iterable, Optional
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+import threading
+import time
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
+from app.cache import LRUCache
 from app.config import Settings, get_settings
 
 security = HTTPBearer(auto_error=True)
 
 
 class JWTPayload(BaseModel):
+    # frozen: verified payloads are shared between requests via the token cache
+    model_config = ConfigDict(frozen=True)
+
     sub: str                     # subject (e.g., user email or id)
     iat: int                     # issued-at (unix seconds)
     exp: int                     # expiration (unix seconds)
@@ -42,16 +48,66 @@ def create_jwt(
     return jwt.encode(payload, settings.JWT_SECRET, algorithm=settings.JWT_ALG)
 
 
+# -------- verified-token cache --------
+# Bearer token -> payload, for tokens whose signature and claims already passed.
+# Entries expire at the token's own `exp`, so nothing is served past expiry.
+# The cache is bound to the (secret, alg) that verified it and is dropped when
+# those change; call invalidate_token_cache() after rotating JWT_SECRET in place.
+
+_token_cache: Optional[LRUCache[JWTPayload]] = None
+_token_cache_key: Optional[Tuple[str, str]] = None
+_token_cache_lock = threading.Lock()
+_token_stats = {"rejected": 0, "invalidations": 0}
+
+
+def _verified_tokens(settings: Settings) -> LRUCache[JWTPayload]:
+    global _token_cache, _token_cache_key
+    key = (settings.JWT_SECRET, settings.JWT_ALG)
+    cache = _token_cache
+    if cache is None or _token_cache_key != key:
+        with _token_cache_lock:
+            if _token_cache is None:
+                _token_cache = LRUCache(maxsize=settings.JWT_CACHE_SIZE)
+            elif _token_cache_key != key:
+                _token_cache.clear()  # secret rotated: nothing verified under the old one survives
+                _token_stats["invalidations"] += 1
+            _token_cache_key = key
+            cache = _token_cache
+    return cache
+
+
+def invalidate_token_cache() -> None:
+    """Forget every verified token (e.g. after JWT_SECRET rotation or a revocation)."""
+    if _token_cache is not None:
+        _token_cache.clear()
+    _token_stats["invalidations"] += 1
+
+
+def token_cache_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = _token_cache.stats() if _token_cache is not None else {}
+    out.update(_token_stats)
+    return out
+
+
 def decode_jwt(token: str, settings: Settings) -> JWTPayload:
     """Decode & validate a JWT, returning the typed payload or raising 401."""
+    cache = _verified_tokens(settings)
+    payload = cache.get(token)
+    if payload is not None:
+        return payload
     try:
         data = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALG])
-        return JWTPayload(**data)
+        payload = JWTPayload(**data)
     except JWTError as e:
+        _token_stats["rejected"] += 1
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token",
         ) from e
+    ttl = payload.exp - time.time()
+    if ttl > 0:
+        cache.set(token, payload, ttl=ttl)
+    return payload
 
 
 async def get_current_user(
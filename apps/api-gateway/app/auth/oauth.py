@@ -10,6 +10,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel
 
 from app.config import Settings, get_settings
+from app.deps import get_linkedin_http
 from app.auth.jwt import create_jwt
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -75,7 +76,7 @@ async def callback(
     code: str = Query(..., description="Authorization code from LinkedIn"),
     code_verifier: str = Query(..., description="The PKCE code_verifier returned by /auth/login"),
     settings: Settings = Depends(get_settings),
-    http: httpx.AsyncClient = Depends(lambda: httpx.AsyncClient(timeout=30)),
+    http: httpx.AsyncClient = Depends(get_linkedin_http),
 ):
     """
     Prototype stub: returns a fake token for development.
@@ -0,0 +1,144 @@
+"""
+Password hashing off the event loop.
+
+bcrypt/argon2 cost ~100-300 ms of CPU per call. Running them inline (or in
+FastAPI's shared threadpool) lets a login storm starve every other route, so
+the users router awaits a PasswordHasher instead:
+
+  - hashes/verifies on a dedicated thread pool (PASSWORD_HASH_WORKERS) behind
+    app.executors.BoundedExecutor (PASSWORD_HASH_QUEUE waiting jobs at most);
+    both backends release the GIL while hashing,
+  - hashes with PASSWORD_SCHEME (bcrypt | argon2) at the configured cost and
+    verifies any scheme it knows; `verify` returns a replacement hash when the
+    stored one was made with other parameters (rehash-on-login),
+  - reports queue depth and timings via `stats()`.
+"""
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from typing import Any, Callable, Optional, Tuple, TypeVar
+
+from passlib.context import CryptContext
+
+from app.config import get_settings
+from app.executors import BoundedExecutor
+
+__all__ = [
+    "PasswordHasher",
+    "get_password_hasher",
+    "start_password_hasher",
+    "shutdown_password_hasher",
+]
+
+T = TypeVar("T")
+
+SCHEMES = ("bcrypt", "argon2")
+
+
+class PasswordHasher:
+    def __init__(
+        self,
+        scheme: str = "bcrypt",
+        bcrypt_rounds: int = 12,
+        argon2_time_cost: int = 3,
+        argon2_memory_kib: int = 65536,
+        workers: int = 2,
+        queue_size: int = 64,
+    ) -> None:
+        if scheme not in SCHEMES:
+            raise ValueError(f"PASSWORD_SCHEME must be one of {SCHEMES}, got {scheme!r}")
+        if scheme == "argon2" and find_spec("argon2") is None:
+            raise RuntimeError("PASSWORD_SCHEME=argon2 needs argon2-cffi (pip install 'influence-api-gateway[argon2]')")
+        self.scheme = scheme
+        # Both schemes stay verifiable; anything but the default (or the default
+        # with other parameters) is flagged for rehash by verify_and_update.
+        self.context = CryptContext(
+            schemes=["argon2", "bcrypt"],
+            default=scheme,
+            deprecated="auto",
+            bcrypt__rounds=bcrypt_rounds,
+            argon2__type="ID",
+            argon2__rounds=argon2_time_cost,
+            argon2__memory_cost=argon2_memory_kib,
+        )
+        self._jobs = BoundedExecutor(
+            ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="pwhash"),
+            workers,
+            queue_size,
+            busy_detail="Too many sign-ins in progress, retry shortly",
+            initial_job_s=0.25,
+        )
+        self.workers = self._jobs.workers
+        self.capacity = self._jobs.capacity
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._jobs.queue_depth
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await self._jobs.run(fn, *args)
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(self.context.hash, password)
+        self.hashed += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns (ok, new_hash). `new_hash` is set when the password matched but
+        `hashed` used another scheme or cost; callers should store it.
+        """
+        try:
+            ok, new_hash = await self._run(self.context.verify_and_update, password, hashed)
+        except ValueError:
+            ok, new_hash = False, None  # unrecognised / malformed stored hash
+        self.verified += 1
+        if new_hash:
+            self.rehashed += 1
+        return ok, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "scheme": self.scheme,
+            **self._jobs.stats(),
+            "hashed": self.hashed,
+            "verified": self.verified,
+            "rehashed": self.rehashed,
+        }
+
+    def shutdown(self) -> None:
+        self._jobs.shutdown()
+
+
+_HASHER: Optional[PasswordHasher] = None
+
+
+def start_password_hasher() -> PasswordHasher:
+    global _HASHER
+    if _HASHER is None:
+        s = get_settings()
+        _HASHER = PasswordHasher(
+            scheme=s.PASSWORD_SCHEME,
+            bcrypt_rounds=s.PASSWORD_BCRYPT_ROUNDS,
+            argon2_time_cost=s.PASSWORD_ARGON2_TIME_COST,
+            argon2_memory_kib=s.PASSWORD_ARGON2_MEMORY_KIB,
+            workers=s.PASSWORD_HASH_WORKERS,
+            queue_size=s.PASSWORD_HASH_QUEUE,
+        )
+    return _HASHER
+
+
+def get_password_hasher() -> PasswordHasher:
+    """FastAPI dependency; falls back to starting the hasher outside the app lifespan (scripts, tests)."""
+    return _HASHER or start_password_hasher()
+
+
+def shutdown_password_hasher() -> None:
+    global _HASHER
+    if _HASHER is not None:
+        _HASHER.shutdown()
+        _HASHER = None
@@ -0,0 +1,198 @@
+"""
+Small in-process caches shared by the routers and agents.
+
+- LRUCache: thread-safe LRU with optional TTL (global or per entry) and an
+  optional byte budget, with hit/miss/eviction counters.
+- DiskCache: one file per key under a directory; survives restarts.
+- TieredCache: memory LRU in front of an optional DiskCache, with
+  (de)serialisers so callers keep working with Python values.
+
+Keys are strings; use `stable_key(...)` to derive one from structured input.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Optional, Tuple, TypeVar
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+__all__ = ["LRUCache", "DiskCache", "TieredCache", "stable_key"]
+
+V = TypeVar("V")
+
+
+def stable_key(*parts: Any) -> str:
+    """Process-independent sha256 hex key for JSON-serialisable parts."""
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class LRUCache(Generic[V]):
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Optional[Callable[[V], int]] = None,
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or (lambda v: len(v) if isinstance(v, (bytes, bytearray)) else 1)  # type: ignore[arg-type]
+        self._data: "OrderedDict[str, Tuple[V, Optional[float], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= time.time():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: V, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        size = self._sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything else; not worth caching
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def pop(self, key: str) -> Optional[V]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            self._drop(key)
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def _drop(self, key: str) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class DiskCache:
+    def __init__(self, directory: str, ttl: Optional[float] = None) -> None:
+        self.directory = directory
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        # two-level fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if self.ttl is not None and os.path.getmtime(path) + self.ttl <= time.time():
+                os.remove(path)
+                raise FileNotFoundError(path)
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # write-then-rename so readers never see a partial file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            pass  # the disk tier is best-effort
+
+    def stats(self) -> Dict[str, Any]:
+        return {"dir": self.directory, "hits": self.hits, "misses": self.misses}
+
+
+class TieredCache(Generic[V]):
+    def __init__(
+        self,
+        memory: LRUCache[V],
+        disk: Optional[DiskCache] = None,
+        dumps: Callable[[V], bytes] = lambda v: v,  # type: ignore[assignment,return-value]
+        loads: Callable[[bytes], V] = lambda b: b,  # type: ignore[assignment,return-value]
+    ) -> None:
+        self.memory = memory
+        self.disk = disk
+        self._dumps = dumps
+        self._loads = loads
+
+    def get(self, key: str) -> Optional[V]:
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        blob = self.disk.get(key)
+        if blob is None:
+            return None
+        try:
+            value = self._loads(blob)
+        except Exception:
+            return None
+        self.memory.set(key, value)  # promote
+        return value
+
+    def set(self, key: str, value: V) -> None:
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, self._dumps(value))
+
+    def stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"memory": self.memory.stats()}
+        if self.disk is not None:
+            out["disk"] = self.disk.stats()
+        return out
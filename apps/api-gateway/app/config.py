@@ -12,10 +12,73 @@ class Settings(BaseSettings):
     # JWT
     JWT_SECRET: str = "change_me"
     JWT_ALG: str = "HS256"
+    JWT_CACHE_SIZE: int = 4096          # verified tokens kept (until their exp); 0 disables
+
+    # Password hashing (see app.auth.passwords)
+    PASSWORD_SCHEME: str = "bcrypt"     # bcrypt | argon2 (argon2id; needs the 'argon2' extra)
+    PASSWORD_BCRYPT_ROUNDS: int = 12    # log2 cost; raising it rehashes users on their next login
+    PASSWORD_ARGON2_TIME_COST: int = 3
+    PASSWORD_ARGON2_MEMORY_KIB: int = 65536
+    PASSWORD_HASH_WORKERS: int = 2      # dedicated hashing threads
+    PASSWORD_HASH_QUEUE: int = 64       # hashes allowed to wait for a thread; beyond that -> 503
+
+    # Storage for calendar / scheduled posts / experiments / users (see app.storage)
+    STORAGE_BACKEND: str = "memory"     # memory (single worker) | sqlite (shareable across workers)
+    STORAGE_SQLITE_PATH: str = "data/influence.db"
+    STORAGE_POOL_SIZE: int = 4          # pooled SQLite connections per worker
+
+    # Scheduled post publishing (see app.publishing)
+    PUBLISH_MAX_CONCURRENCY: int = 8    # publishes in flight per worker
+    PUBLISH_MAX_ATTEMPTS: int = 5       # then the post is marked "failed"
+    PUBLISH_RETRY_BASE_S: float = 2.0   # backoff doubles per attempt, full jitter
+    PUBLISH_RETRY_MAX_S: float = 300.0
+    PUBLISH_LEASE_S: float = 60.0       # claim on a post while publishing (multi-worker safety)
+    PUBLISH_REFILL_S: float = 30.0      # how often / how far ahead due posts are read from storage
+    PUBLISH_LOCAL_FAIL_RATE: float = 0.0  # LocalPublisher: simulated error rate (exercise retries)
+
+    # A/B experiments (see app.experiments)
+    AB_ASSIGNER_TTL_S: float = 2.0      # compiled assignment rules cached per worker
+    AB_COUNTER_SHARDS: int = 16
+    AB_FLUSH_S: float = 2.0             # buffered view/click counts -> storage
+    AB_EVENT_BATCH_MAX: int = 10000     # rows per POST /abtests/events:batch
+    AB_EVENT_DEDUPE_SIZE: int = 200000  # recently seen event ids kept per worker
+    AB_EVENT_DEDUPE_TTL_S: float = 86400.0
+    AB_MSPRT_TAU: float = 0.01          # sequential test: prior scale of the effect (absolute rate difference)
+    AB_CONFIG_DIR: str = os.path.join(os.path.dirname(__file__), "../../..", "ab_experiments/configs")  # "" disables
+    AB_CONFIG_POLL_S: float = 5.0       # mtime poll for hot reload of the YAML experiments
+    AB_BANDIT_INTERVAL_S: float = 60.0  # thompson/ucb arm weights recomputed from counters this often
+    AB_BANDIT_MIN_SHARE: float = 0.05   # traffic floor per arm under bandit allocation
+
+    # Shared upstream HTTP clients (see app.deps.HttpClients)
+    HTTP_TIMEOUT_S: float = 30.0
+    HTTP_CONNECT_TIMEOUT_S: float = 5.0
+    HTTP_MAX_CONNECTIONS: int = 100
+    HTTP_MAX_KEEPALIVE: int = 20
+    HTTP_KEEPALIVE_EXPIRY_S: float = 30.0
+    LINKEDIN_TIMEOUT_S: float = 15.0
 
     # Optional model servers (not required for prototype)
     VLLM_BASE_URL: str = "http://localhost:8001/v1"
     VLLM_MODEL: str = "mistralai/Mistral-7B-Instruct-v0.2"
+    VLLM_TIMEOUT_S: float = 60.0        # per-completion HTTP timeout
+    VLLM_MAX_CONCURRENCY: int = 4       # in-flight completions per request
+    VLLM_DEADLINE_S: float = 45.0       # overall budget for one /content/generate call
+    VLLM_BATCH_MODE: str = "n"          # off | n (one call, n choices; angles not pinned per variant) | structured (one multi-output reply)
+
+    # Content generation cache (exact-key LRU + optional disk tier)
+    CONTENT_CACHE_SIZE: int = 512       # entries; 0 disables
+    CONTENT_CACHE_TTL_S: float = 3600.0
+    CONTENT_CACHE_DIR: str = ""         # empty = memory only
+
+    # Poster render cache (content-addressed by PosterSpec)
+    IMAGE_CACHE_MAX_MB: int = 128       # memory budget for encoded images; 0 disables
+    IMAGE_CACHE_DIR: str = ""           # empty = memory only
+    IMAGE_BG_CACHE_MB: int = 128        # budget for decoded gradient backgrounds
+    IMAGE_PREWARM_WIDTHS: str = "1080"  # comma-separated; every brand x ratio is built at startup
+    IMAGE_RENDER_BACKEND: str = "process"  # process | thread
+    IMAGE_RENDER_WORKERS: int = 2
+    IMAGE_RENDER_QUEUE: int = 32        # jobs allowed to wait for a worker; beyond that -> 503
+    IMAGE_RENDER_TIMEOUT_S: float = 20.0
 
     # OAuth placeholders (optional for prototype)
     LINKEDIN_CLIENT_ID: str = ""
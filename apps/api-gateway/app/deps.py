@@ -1,4 +1,5 @@
-from typing import AsyncGenerator
+from importlib.util import find_spec
+from typing import Dict, Optional
 
 import httpx
 
@@ -6,7 +7,85 @@ import httpx
 from .config import Settings, get_settings
 
 
-async def get_http() -> AsyncGenerator[httpx.AsyncClient, None]:
+class HttpClients:
+    """
+    App-scoped registry of pooled httpx.AsyncClients, one per upstream, so
+    connections (and TLS sessions) are reused across requests. Created in the
+    app lifespan and closed on shutdown; inject clients with the get_* deps below.
+    """
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        # HTTP/2 multiplexing needs the optional `h2` package (pip install httpx[http2])
+        self.http2 = find_spec("h2") is not None
+
+    def _timeout(self, upstream: str) -> httpx.Timeout:
+        s = self._settings
+        total = {
+            "vllm": s.VLLM_TIMEOUT_S,
+            "linkedin": s.LINKEDIN_TIMEOUT_S,
+        }.get(upstream, s.HTTP_TIMEOUT_S)
+        return httpx.Timeout(total, connect=min(total, s.HTTP_CONNECT_TIMEOUT_S))
+
+    def get(self, upstream: str = "default") -> httpx.AsyncClient:
+        client = self._clients.get(upstream)
+        if client is None or client.is_closed:
+            s = self._settings
+            client = httpx.AsyncClient(
+                timeout=self._timeout(upstream),
+                limits=httpx.Limits(
+                    max_connections=s.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=s.HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=s.HTTP_KEEPALIVE_EXPIRY_S,
+                ),
+                http2=self.http2,
+            )
+            self._clients[upstream] = client
+        return client
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def stats(self) -> Dict[str, object]:
+        return {"http2": self.http2, "open": sorted(k for k, c in self._clients.items() if not c.is_closed)}
+
+
+_clients: Optional[HttpClients] = None
+
+
+def start_http_clients() -> HttpClients:
+    global _clients
+    if _clients is None:
+        _clients = HttpClients(get_settings())
+    return _clients
+
+
+async def close_http_clients() -> None:
+    """Close pooled clients (called on app shutdown)."""
+    global _clients
+    if _clients is not None:
+        await _clients.aclose()
+        _clients = None
+
+
+def http_clients() -> HttpClients:
+    # lazily start if used outside the app lifespan (scripts, tests)
+    return _clients or start_http_clients()
+
+
+def get_http() -> httpx.AsyncClient:
     """Shared Async HTTP client (use as a FastAPI dependency)."""
-    async with httpx.AsyncClient(timeout=30) as client:
-        yield client
+    return http_clients().get("default")
+
+
+def get_llm_client() -> httpx.AsyncClient:
+    """Pooled client for model-server (vLLM) calls."""
+    return http_clients().get("vllm")
+
+
+def get_linkedin_http() -> httpx.AsyncClient:
+    """Pooled client for LinkedIn API / OAuth calls."""
+    return http_clients().get("linkedin")
@@ -0,0 +1,112 @@
+"""
+Admission-controlled executor shared by the CPU-bound off-loop pools
+(poster rendering, password hashing).
+
+`BoundedExecutor.run(fn, *args)` submits to a concurrent.futures executor
+but admits at most workers + queue_size jobs at once; beyond that it answers
+503 with a Retry-After estimated from an EWMA of job time. A job's slot is
+released when the job really finishes (executor callback), not when the
+awaiting request goes away, so cancelled or timed-out callers cannot leak
+capacity.
+"""
+from __future__ import annotations
+
+from concurrent.futures import Executor, Future
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import math
+import threading
+import time
+
+from fastapi import HTTPException
+
+__all__ = ["BoundedExecutor"]
+
+T = TypeVar("T")
+
+
+class BoundedExecutor:
+    def __init__(
+        self,
+        executor: Executor,
+        workers: int,
+        queue_size: int,
+        busy_detail: str = "Server is busy, retry shortly",
+        timeout: Optional[float] = None,
+        timeout_detail: str = "Job timed out",
+        initial_job_s: float = 0.1,
+    ) -> None:
+        self.executor = executor
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.busy_detail = busy_detail
+        self.timeout = timeout
+        self.timeout_detail = timeout_detail
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.avg_s = initial_job_s  # EWMA of job time, used for Retry-After
+        self.max_queue_depth = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Jobs admitted but still waiting for a worker."""
+        return max(0, self.inflight - self.workers)
+
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.avg_s * self.capacity / self.workers))
+
+    def _release(self, started: float, _fut: Optional[Future]) -> None:
+        # runs on the executor's callback thread once the job really finishes
+        with self._lock:
+            self.inflight -= 1
+            self.avg_s = 0.8 * self.avg_s + 0.2 * (time.monotonic() - started)
+        self._slots.release()
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run `fn(*args)` on the executor with admission control (and the timeout, if set)."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail=self.busy_detail,
+                headers={"Retry-After": str(self.retry_after())},
+            )
+        with self._lock:
+            self.inflight += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        started = time.monotonic()
+        try:
+            cf = self.executor.submit(fn, *args)
+        except Exception:
+            self._release(started, None)
+            raise
+        cf.add_done_callback(lambda f: self._release(started, f))
+        try:
+            result = await asyncio.wait_for(asyncio.wrap_future(cf), self.timeout)
+        except asyncio.TimeoutError:
+            # a queued job is dropped; a running one finishes and frees its slot later
+            cf.cancel()
+            self.timeouts += 1
+            raise HTTPException(status_code=504, detail=self.timeout_detail)
+        self.completed += 1
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "inflight": self.inflight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_job_s": round(self.avg_s, 4),
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,231 @@
+"""
+A/B experiment engine used by routers/abtests.py.
+
+- assignment: experiments compile to immutable `Assigner`s (64-bit blake2b
+  bucketing, exposure percentage, N-arm weighted splits). Compiled assigners
+  are cached for AB_ASSIGNER_TTL_S, so /assign does not touch storage per call.
+- counters: views/clicks go to thread-sharded in-memory counters; a
+  lifespan task flushes them every AB_FLUSH_S with one storage update per
+  experiment.
+- events: bulk event rows (JSON array / NDJSON) are deduplicated by event id
+  and aggregated before one storage update per experiment.
+- stats: results (lift, intervals, sequential p-values, posteriors, SRM)
+  straight from those counters.
+- configs: experiments defined in ab_experiments/configs/*.yaml compile into
+  an immutable table that is hot-swapped on file change and consulted before
+  storage; each one is also mirrored into storage for counters and results.
+- bandit: experiments with allocation "thompson" / "ucb" get their split
+  recomputed from the counters every AB_BANDIT_INTERVAL_S and assign from
+  precomputed alias tables.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional
+import logging
+import time
+
+from app.cache import LRUCache
+from app.config import get_settings
+from app.storage import EXPERIMENTS, Doc, get_repository
+from .assignment import Assigner, build_alias, compile_assigner, hash64
+from .bandit import ALLOCATIONS, BanditReweigher, bandit_weights
+from .configs import ConfigRegistry, ConfigTable, ExperimentConfig, parse_config
+from .counters import CounterFlusher, Deltas, ShardedCounters
+from .events import EventDeduper, EventRow, aggregate_events, parse_events
+from .stats import experiment_results, srm_check
+
+__all__ = [
+    "Assigner",
+    "compile_assigner",
+    "build_alias",
+    "hash64",
+    "ALLOCATIONS",
+    "BanditReweigher",
+    "bandit_weights",
+    "get_bandits",
+    "ConfigRegistry",
+    "ConfigTable",
+    "ExperimentConfig",
+    "parse_config",
+    "config_registry",
+    "ShardedCounters",
+    "CounterFlusher",
+    "Deltas",
+    "EventRow",
+    "EventDeduper",
+    "parse_events",
+    "aggregate_events",
+    "apply_deltas",
+    "experiment_results",
+    "srm_check",
+    "get_event_deduper",
+    "arm_weights",
+    "get_assigner",
+    "invalidate_assigner",
+    "get_counters",
+    "merged_metrics",
+    "start_experiments",
+    "stop_experiments",
+]
+
+_ASSIGNERS: Optional[LRUCache[Assigner]] = None
+_COUNTERS: Optional[ShardedCounters] = None
+_FLUSHER: Optional[CounterFlusher] = None
+_DEDUPER: Optional[EventDeduper] = None
+_REGISTRY: Optional[ConfigRegistry] = None
+_BANDITS: Optional[BanditReweigher] = None
+
+log = logging.getLogger(__name__)
+
+
+def arm_weights(doc: Doc) -> Dict[str, float]:
+    """Arm -> weight for a stored experiment (equal split unless weights are set)."""
+    arms = list(doc.get("variants") or ("A", "B"))
+    weights = doc.get("weights") or {}
+    return {a: float(weights.get(a, 1.0)) for a in arms}
+
+
+def _assigners() -> LRUCache[Assigner]:
+    global _ASSIGNERS
+    if _ASSIGNERS is None:
+        _ASSIGNERS = LRUCache(maxsize=4096, ttl=get_settings().AB_ASSIGNER_TTL_S)
+    return _ASSIGNERS
+
+
+def _sync_configs(table: ConfigTable) -> None:
+    """Mirror file-defined experiments into storage (keeping their metrics) so results/events work."""
+    repo = get_repository(EXPERIMENTS)
+    for cfg in table.configs.values():
+        fields = cfg.to_doc()
+        if repo.update(cfg.id, lambda doc: {**doc, **fields}) is None:
+            arms = list(cfg.variants)
+            doc = {
+                **fields,
+                "created_at": time.time(),
+                "metrics": {"views": {a: 0 for a in arms}, "clicks": {a: 0 for a in arms}},
+            }
+            if not repo.add(doc):  # another worker created it first
+                repo.update(cfg.id, lambda doc: {**doc, **fields})
+        invalidate_assigner(cfg.id)
+    if _BANDITS is not None:
+        _BANDITS.recompute()  # a file may have started or stopped a bandit experiment
+    log.info("experiment configs loaded: %s", ", ".join(sorted(table.configs)) or "none")
+
+
+def config_registry() -> ConfigRegistry:
+    """Registry of YAML-defined experiments (loaded on first use)."""
+    global _REGISTRY
+    if _REGISTRY is None:
+        s = get_settings()
+        registry = ConfigRegistry(s.AB_CONFIG_DIR, on_change=_sync_configs, poll_s=s.AB_CONFIG_POLL_S)
+        if s.AB_CONFIG_DIR:
+            registry.reload()
+        _REGISTRY = registry
+    return _REGISTRY
+
+
+def _running_bandits() -> list:
+    return [
+        doc for doc in get_repository(EXPERIMENTS).find(status="running")
+        if (doc.get("allocation") or "fixed") != "fixed"
+    ]
+
+
+def get_bandits() -> BanditReweigher:
+    global _BANDITS
+    if _BANDITS is None:
+        s = get_settings()
+        _BANDITS = BanditReweigher(_running_bandits, s.AB_BANDIT_INTERVAL_S, s.AB_BANDIT_MIN_SHARE)
+    return _BANDITS
+
+
+def get_assigner(exp_id: str) -> Optional[Assigner]:
+    """Compiled assigner for `exp_id` (None if there is no such experiment)."""
+    assigner = config_registry().table.assigners.get(exp_id) or _stored_assigner(exp_id)
+    if assigner is None or not assigner.running or _BANDITS is None:
+        return assigner
+    # bandit split from the last recompute, if this is a bandit experiment
+    return _BANDITS.assigners.get(exp_id, assigner)
+
+
+def _stored_assigner(exp_id: str) -> Optional[Assigner]:
+    cache = _assigners()
+    assigner = cache.get(exp_id)
+    if assigner is None:
+        doc = get_repository(EXPERIMENTS).get(exp_id)
+        if doc is None:
+            return None
+        assigner = compile_assigner(
+            exp_id,
+            arm_weights(doc),
+            exposure_percent=doc.get("exposure_percent", 100.0),
+            running=doc.get("status") == "running",
+        )
+        cache.set(exp_id, assigner)
+    return assigner
+
+
+def invalidate_assigner(exp_id: str) -> None:
+    # other workers pick the change up within AB_ASSIGNER_TTL_S
+    _assigners().pop(exp_id)
+
+
+def get_counters() -> ShardedCounters:
+    global _COUNTERS
+    if _COUNTERS is None:
+        _COUNTERS = ShardedCounters(get_settings().AB_COUNTER_SHARDS)
+    return _COUNTERS
+
+
+def merged_metrics(doc: Doc) -> Dict[str, Dict[str, int]]:
+    """Stored metrics plus counts not flushed yet."""
+    metrics = {m: dict(v) for m, v in (doc.get("metrics") or {}).items()}
+    for metric, by_variant in get_counters().pending(doc["id"]).items():
+        row = metrics.setdefault(metric, {})
+        for variant, n in by_variant.items():
+            row[variant] = row.get(variant, 0) + n
+    return metrics
+
+
+def get_event_deduper() -> EventDeduper:
+    global _DEDUPER
+    if _DEDUPER is None:
+        s = get_settings()
+        _DEDUPER = EventDeduper(maxsize=s.AB_EVENT_DEDUPE_SIZE, ttl=s.AB_EVENT_DEDUPE_TTL_S)
+    return _DEDUPER
+
+
+def apply_deltas(exp_id: str, deltas: Dict[str, Dict[str, int]]) -> bool:
+    """Add counts to a stored experiment in one atomic update; False if it does not exist."""
+    def _apply(doc: Doc) -> Doc:
+        metrics = doc.setdefault("metrics", {})
+        for metric, by_variant in deltas.items():
+            row = metrics.setdefault(metric, {})
+            for variant, n in by_variant.items():
+                row[variant] = row.get(variant, 0) + n
+        return doc
+
+    return get_repository(EXPERIMENTS).update(exp_id, _apply) is not None
+
+
+def start_experiments() -> CounterFlusher:
+    global _FLUSHER
+    registry = config_registry()
+    if registry.directory:
+        registry.start()
+    get_bandits().start()
+    if _FLUSHER is None:
+        _FLUSHER = CounterFlusher(get_counters(), apply_deltas, interval=get_settings().AB_FLUSH_S)
+        _FLUSHER.start()
+    return _FLUSHER
+
+
+async def stop_experiments() -> None:
+    global _FLUSHER
+    if _REGISTRY is not None:
+        await _REGISTRY.stop()
+    if _BANDITS is not None:
+        await _BANDITS.stop()
+    if _FLUSHER is not None:
+        await _FLUSHER.stop()
+        _FLUSHER = None
@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import List, Mapping, Optional, Tuple
+
+__all__ = ["Assigner", "compile_assigner", "build_alias", "hash64"]
+
+_SPACE = 1 << 32  # each half of the 64-bit hash is one 32-bit uniform draw
+
+
+def hash64(salt: bytes, unit_id: str) -> int:
+    """Fast, process-independent 64-bit hash of `unit_id` keyed by `salt`."""
+    return int.from_bytes(blake2b(unit_id.encode("utf-8"), digest_size=8, key=salt).digest(), "big")
+
+
+@dataclass(frozen=True)
+class Assigner:
+    """
+    A compiled, immutable assignment rule for one experiment. The high 32 bits
+    of the unit's hash decide exposure, the low 32 bits pick the arm, so the
+    two decisions are independent and stable for a given (experiment, unit).
+    """
+
+    exp_id: str
+    running: bool
+    salt: bytes
+    exposure_cut: int               # exposed iff high32 < exposure_cut
+    arms: Tuple[str, ...]
+    cuts: Tuple[int, ...]           # cumulative upper bounds over [0, 2^32)
+    # Vose alias table (bandit allocation): column i keeps arm i below prob[i], else alias[i]
+    alias_prob: Tuple[int, ...] = ()
+    alias: Tuple[int, ...] = ()
+
+    def assign(self, unit_id: str) -> Optional[str]:
+        """Arm for `unit_id`, or None when it falls outside the exposure percentage."""
+        h = hash64(self.salt, unit_id)
+        if (h >> 32) >= self.exposure_cut:
+            return None
+        if self.alias:
+            # low32 * n: the integer part picks a column, the fraction is the coin flip
+            x = (h & 0xFFFFFFFF) * len(self.arms)
+            i = x >> 32
+            return self.arms[i if (x & 0xFFFFFFFF) < self.alias_prob[i] else self.alias[i]]
+        return self.arms[bisect_right(self.cuts, h & 0xFFFFFFFF)]
+
+
+def build_alias(weights: List[float]) -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    """Vose's alias method: O(n) build, O(1) draw. Probabilities are scaled to 2^32."""
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [w * n / total for w in weights]
+    prob = [_SPACE] * n
+    alias = list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s] = int(scaled[s] * _SPACE)
+        alias[s] = l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    # leftovers are 1.0 up to float rounding: always keep their own arm
+    return tuple(prob), tuple(alias)
+
+
+def compile_assigner(
+    exp_id: str,
+    weights: Mapping[str, float],
+    exposure_percent: float = 100.0,
+    running: bool = True,
+    alias: bool = False,
+) -> Assigner:
+    """
+    Turn arm weights (any positive scale) and an exposure % into an Assigner.
+    `alias=True` draws arms from a Vose alias table instead of the cut list
+    (constant time for any number of arms; used for bandit allocation).
+    """
+    arms = tuple(weights)
+    total = float(sum(max(0.0, w) for w in weights.values()))
+    if total <= 0:
+        raise ValueError(f"experiment {exp_id} has no arm with a positive weight")
+    cuts, acc = [], 0.0
+    for a in arms:
+        # a zero-weight arm gets an empty interval: it stays valid but is never drawn
+        acc += max(0.0, weights[a])
+        cuts.append(int(_SPACE * acc / total))
+    cuts[-1] = _SPACE  # no gap at the top from float rounding
+    pct = min(100.0, max(0.0, exposure_percent))
+    alias_prob, alias_idx = build_alias([max(0.0, weights[a]) for a in arms]) if alias else ((), ())
+    return Assigner(
+        exp_id=exp_id,
+        running=running,
+        salt=blake2b(exp_id.encode("utf-8"), digest_size=16).digest(),
+        exposure_cut=int(_SPACE * pct / 100.0),
+        arms=arms,
+        cuts=tuple(cuts),
+        alias_prob=alias_prob,
+        alias=alias_idx,
+    )
@@ -0,0 +1,156 @@
+"""
+Bandit allocation for experiments with `allocation` = "thompson" or "ucb".
+
+Every AB_BANDIT_INTERVAL_S a lifespan task reads the running bandit
+experiments' stored goal-metric counters (clicks / views for ctr), turns
+them into arm weights and compiles alias-table Assigners into a new
+immutable table that replaces the old one in a single assignment. /assign
+only does a dict read and a hash; nothing is recomputed per request.
+
+Weights are a pure function of the stored counters (Thompson draws are
+seeded from them), so every worker computes the same split. Each arm keeps
+at least AB_BANDIT_MIN_SHARE of traffic so a slow starter can recover.
+"""
+from __future__ import annotations
+
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+import asyncio
+import logging
+import math
+import random
+
+from app.cache import stable_key
+from .assignment import Assigner, compile_assigner
+from .stats import metric_counters
+
+__all__ = ["ALLOCATIONS", "thompson_weights", "ucb_weights", "bandit_weights", "BanditReweigher"]
+
+log = logging.getLogger(__name__)
+
+ALLOCATIONS = ("fixed", "thompson", "ucb")
+
+_DRAWS = 2000  # Monte Carlo draws per Thompson recomputation
+
+
+def _with_floor(weights: Dict[str, float], min_share: float) -> Dict[str, float]:
+    """Normalise to 1 and give every arm at least `min_share` (capped at an equal split)."""
+    floor = min(min_share, 1.0 / len(weights))
+    total = sum(weights.values())
+    spare = 1.0 - floor * len(weights)
+    return {a: floor + spare * (w / total if total > 0 else 1.0 / len(weights)) for a, w in weights.items()}
+
+
+def thompson_weights(
+    successes: Mapping[str, int],
+    trials: Mapping[str, int],
+    arms: Sequence[str],
+    min_share: float = 0.05,
+    seed: Any = None,
+) -> Dict[str, float]:
+    """Share of traffic = posterior probability that the arm is best (Beta(1+s, 1+f) per arm)."""
+    rng = random.Random(seed)
+    params = [(1 + successes.get(a, 0), 1 + max(0, trials.get(a, 0) - successes.get(a, 0))) for a in arms]
+    wins = [0] * len(arms)
+    for _ in range(_DRAWS):
+        draws = [rng.betavariate(a, b) for a, b in params]
+        wins[draws.index(max(draws))] += 1
+    return _with_floor({a: w / _DRAWS for a, w in zip(arms, wins)}, min_share)
+
+
+def ucb_weights(
+    successes: Mapping[str, int],
+    trials: Mapping[str, int],
+    arms: Sequence[str],
+    min_share: float = 0.05,
+) -> Dict[str, float]:
+    """UCB1: the arm(s) with the highest upper bound get all traffic above the floor."""
+    n_total = sum(trials.get(a, 0) for a in arms)
+    scores: Dict[str, float] = {}
+    for a in arms:
+        n = trials.get(a, 0)
+        if n == 0:
+            scores[a] = math.inf  # unplayed arms first
+        else:
+            rate = min(1.0, successes.get(a, 0) / n)
+            scores[a] = rate + math.sqrt(2.0 * math.log(max(n_total, 1)) / n)
+    best = max(scores.values())
+    return _with_floor({a: 1.0 if scores[a] == best else 0.0 for a in arms}, min_share)
+
+
+def bandit_weights(doc: Mapping[str, Any], min_share: float = 0.05) -> Optional[Dict[str, float]]:
+    """Current bandit split for a stored experiment; None for fixed allocation."""
+    mode = doc.get("allocation") or "fixed"
+    if mode == "fixed":
+        return None
+    arms = list(doc.get("variants") or ("A", "B"))
+    goal = doc.get("goal_metric") or str(doc.get("goal") or "ctr").strip().lower()
+    num, den = metric_counters(goal)
+    metrics = doc.get("metrics") or {}
+    successes, trials = metrics.get(num, {}), metrics.get(den, {})
+    if mode == "ucb":
+        return ucb_weights(successes, trials, arms, min_share)
+    seed = stable_key(doc["id"], [(a, successes.get(a, 0), trials.get(a, 0)) for a in arms])
+    return thompson_weights(successes, trials, arms, min_share, seed=seed)
+
+
+class BanditReweigher:
+    """Periodically recompiles alias-table assigners for running bandit experiments."""
+
+    def __init__(
+        self,
+        load: Callable[[], List[Dict[str, Any]]],
+        interval: float = 60.0,
+        min_share: float = 0.05,
+    ) -> None:
+        self._load = load
+        self.interval = interval
+        self.min_share = min_share
+        self.assigners: Mapping[str, Assigner] = MappingProxyType({})  # replaced wholesale
+        self.weights: Mapping[str, Dict[str, float]] = MappingProxyType({})
+        self.recomputes = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def recompute(self) -> None:
+        assigners: Dict[str, Assigner] = {}
+        weights: Dict[str, Dict[str, float]] = {}
+        for doc in self._load():
+            try:
+                w = bandit_weights(doc, self.min_share)
+                if w is None:
+                    continue
+                assigners[doc["id"]] = compile_assigner(
+                    doc["id"], w, doc.get("exposure_percent", 100.0), running=True, alias=True
+                )
+                weights[doc["id"]] = w
+            except Exception:
+                log.exception("bandit weights for %s failed", doc.get("id"))
+        self.weights = MappingProxyType(weights)
+        self.assigners = MappingProxyType(assigners)
+        self.recomputes += 1
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.recompute)
+            except Exception:
+                log.exception("bandit recompute failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_s": self.interval,
+            "min_share": self.min_share,
+            "recomputes": self.recomputes,
+            "weights": {k: dict(v) for k, v in self.weights.items()},
+        }
@@ -0,0 +1,231 @@
+"""
+Experiments defined as YAML files (ab_experiments/configs/*.yaml).
+
+The files compile into an immutable `ConfigTable` (experiment id -> config
+and compiled Assigner). `ConfigRegistry.table` is swapped for a new table by
+a single reference assignment when a file changes, so readers never lock:
+an assignment is one dict read plus one hash.
+
+A lifespan task polls the directory's (name, mtime, size) signature every
+AB_CONFIG_POLL_S; a file that fails to parse keeps its previous version.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+import asyncio
+import glob
+import logging
+import os
+
+import yaml
+
+from .assignment import Assigner, compile_assigner
+from .bandit import ALLOCATIONS
+
+__all__ = ["ExperimentConfig", "ConfigTable", "ConfigRegistry", "parse_config"]
+
+log = logging.getLogger(__name__)
+
+# assignment.method values the engine implements: blake2b(exp salt, unit id)
+# bucketing into weighted cuts (or alias tables for bandits), see assignment.py
+ASSIGNMENT_METHODS = ("hash",)
+
+# YAML status -> API status
+_STATUS = {"draft": "created", "created": "created", "running": "running", "stopped": "stopped"}
+
+Signature = Tuple[Tuple[str, int, int], ...]
+
+
+@dataclass(frozen=True)
+class ExperimentConfig:
+    id: str
+    name: str
+    source: str                          # file name under the config directory
+    status: str                          # created | running | stopped
+    goal_metric: str
+    secondary_metrics: Tuple[str, ...]
+    variants: Mapping[str, Any]          # arm -> payload (as written in the file)
+    weights: Mapping[str, float]
+    exposure_percent: float
+    description: str = ""
+    assignment_method: str = "hash"
+    allocation: str = "fixed"           # fixed | thompson | ucb
+    raw: Mapping[str, Any] = field(default_factory=dict, compare=False, repr=False)
+
+    def to_doc(self) -> Dict[str, Any]:
+        """Fields an Experiment document takes from this file (metrics excluded)."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "goal": self.goal_metric,
+            "goal_metric": self.goal_metric,
+            "secondary_metrics": list(self.secondary_metrics),
+            "variants": dict(self.variants),
+            "weights": dict(self.weights),
+            "exposure_percent": self.exposure_percent,
+            "status": self.status,
+            "allocation": self.allocation,
+            "source": self.source,
+        }
+
+
+def parse_config(data: Mapping[str, Any], source: str) -> ExperimentConfig:
+    """Validate one YAML document; raises ValueError with a readable message."""
+    if not isinstance(data, Mapping):
+        raise ValueError("top level must be a mapping")
+    exp_id = data.get("id")
+    if not exp_id or not isinstance(exp_id, str):
+        raise ValueError("'id' is required")
+    variants = data.get("variants")
+    if not isinstance(variants, Mapping) or len(variants) < 2:
+        raise ValueError("'variants' must map at least two arm names to payloads")
+    weights: Dict[str, float] = {}
+    for arm, payload in variants.items():
+        w = payload.get("weight", 1.0) if isinstance(payload, Mapping) else 1.0
+        if not isinstance(w, (int, float)) or w < 0:
+            raise ValueError(f"variant {arm!r}: 'weight' must be a non-negative number")
+        weights[str(arm)] = float(w)
+    if not any(weights.values()):
+        raise ValueError("at least one variant needs a positive weight")
+    status = _STATUS.get(str(data.get("status", "draft")).lower())
+    if status is None:
+        raise ValueError(f"unknown status {data.get('status')!r} (draft | running | stopped)")
+    goal = str(data.get("goal_metric") or (data.get("success") or {}).get("primary") or "").strip().lower()
+    if not goal:
+        raise ValueError("'goal_metric' is required")
+    # image_style.yaml lists every metric under `metrics`, goal included
+    secondary = data.get("secondary_metrics") or data.get("metrics") or []
+    exposure = float((data.get("exposure") or {}).get("percent", 100))
+    method = str((data.get("assignment") or {}).get("method") or "hash").lower()
+    if method not in ASSIGNMENT_METHODS:
+        raise ValueError(f"unsupported assignment.method {method!r} ({' | '.join(ASSIGNMENT_METHODS)})")
+    allocation = str(data.get("allocation") or (data.get("assignment") or {}).get("allocation") or "fixed").lower()
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"unknown allocation {allocation!r} ({' | '.join(ALLOCATIONS)})")
+    return ExperimentConfig(
+        id=exp_id,
+        name=str(data.get("name") or exp_id),
+        source=source,
+        status=status,
+        goal_metric=goal,
+        secondary_metrics=tuple(m.strip().lower() for m in secondary if m.strip().lower() != goal),
+        variants=MappingProxyType({str(k): v for k, v in variants.items()}),
+        weights=MappingProxyType(weights),
+        exposure_percent=min(100.0, max(0.0, exposure)),
+        description=str(data.get("description") or ""),
+        assignment_method=method,
+        allocation=allocation,
+        raw=MappingProxyType(dict(data)),
+    )
+
+
+@dataclass(frozen=True)
+class ConfigTable:
+    configs: Mapping[str, ExperimentConfig]
+    assigners: Mapping[str, Assigner]
+    signature: Signature = ()
+
+    @classmethod
+    def build(cls, configs: Dict[str, ExperimentConfig], signature: Signature = ()) -> "ConfigTable":
+        assigners = {
+            c.id: compile_assigner(c.id, c.weights, c.exposure_percent, running=c.status == "running")
+            for c in configs.values()
+        }
+        return cls(MappingProxyType(dict(configs)), MappingProxyType(assigners), signature)
+
+
+EMPTY_TABLE = ConfigTable.build({})
+
+
+class ConfigRegistry:
+    def __init__(
+        self,
+        directory: str,
+        on_change: Optional[Callable[[ConfigTable], None]] = None,
+        poll_s: float = 5.0,
+    ) -> None:
+        self.directory = directory
+        self.on_change = on_change
+        self.poll_s = poll_s
+        self.table: ConfigTable = EMPTY_TABLE  # replaced wholesale, never mutated
+        self._by_file: Dict[str, ExperimentConfig] = {}
+        self.reloads = 0
+        self.errors: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _signature(self) -> Signature:
+        out: List[Tuple[str, int, int]] = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.y*ml"))):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue  # removed between glob and stat
+            out.append((os.path.basename(path), st.st_mtime_ns, st.st_size))
+        return tuple(out)
+
+    def reload(self, force: bool = False) -> bool:
+        """Rebuild the table if any file changed; returns True when a new table was swapped in."""
+        sig = self._signature()
+        if not force and sig == self.table.signature:
+            return False
+        old_mtimes = {name: (mtime, size) for name, mtime, size in self.table.signature}
+        by_file: Dict[str, ExperimentConfig] = {}
+        for name, mtime, size in sig:
+            previous = self._by_file.get(name)
+            if previous is not None and old_mtimes.get(name) == (mtime, size) and not force:
+                by_file[name] = previous
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    by_file[name] = parse_config(yaml.safe_load(f), name)
+                self.errors.pop(name, None)
+            except (OSError, ValueError, yaml.YAMLError) as e:
+                self.errors[name] = str(e)
+                log.warning("experiment config %s not loaded: %s", name, e)
+                if previous is not None:
+                    by_file[name] = previous
+        configs: Dict[str, ExperimentConfig] = {}
+        for name, cfg in by_file.items():
+            if cfg.id in configs:
+                self.errors[name] = f"duplicate experiment id {cfg.id!r} (also in {configs[cfg.id].source})"
+                continue
+            configs[cfg.id] = cfg
+        table = ConfigTable.build(configs, sig)
+        self._by_file = by_file
+        self.table = table  # atomic swap: readers see the old or the new table, never a mix
+        self.reloads += 1
+        if self.on_change is not None:
+            try:
+                self.on_change(table)
+            except Exception:
+                log.exception("experiment config change hook failed")
+        return True
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.poll_s)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception:
+                log.exception("experiment config reload failed")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": self.directory,
+            "experiments": sorted(self.table.configs),
+            "files": [name for name, _, _ in self.table.signature],
+            "reloads": self.reloads,
+            "errors": dict(self.errors),
+        }
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import logging
+import threading
+
+__all__ = ["ShardedCounters", "CounterFlusher", "Deltas"]
+
+log = logging.getLogger(__name__)
+
+Key = Tuple[str, str, str]                    # (exp_id, metric, variant)
+Deltas = Dict[str, Dict[str, Dict[str, int]]]  # exp_id -> metric -> variant -> count
+
+
+class _Shard:
+    __slots__ = ("lock", "data")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.data: Dict[Key, int] = {}
+
+
+class ShardedCounters:
+    """
+    Write-optimised event counters. Each thread increments its own shard (its
+    lock is practically uncontended), and a flusher drains every shard
+    periodically and writes one update per experiment to storage.
+    """
+
+    def __init__(self, shards: int = 16) -> None:
+        self._shards: List[_Shard] = [_Shard() for _ in range(max(1, shards))]
+        self._next = itertools.count()  # next() is atomic under the GIL
+        self._local = threading.local()
+
+    def _shard(self) -> _Shard:
+        idx = getattr(self._local, "idx", None)
+        if idx is None:
+            idx = self._local.idx = next(self._next) % len(self._shards)
+        return self._shards[idx]
+
+    def add(self, exp_id: str, metric: str, variant: str, n: int = 1) -> None:
+        shard = self._shard()
+        key = (exp_id, metric, variant)
+        with shard.lock:
+            shard.data[key] = shard.data.get(key, 0) + n
+
+    def add_many(self, deltas: Deltas) -> None:
+        shard = self._shard()
+        with shard.lock:
+            for exp_id, metrics in deltas.items():
+                for metric, by_variant in metrics.items():
+                    for variant, n in by_variant.items():
+                        key = (exp_id, metric, variant)
+                        shard.data[key] = shard.data.get(key, 0) + n
+
+    def drain(self) -> Deltas:
+        """Take (and reset) everything counted since the last drain."""
+        out: Deltas = {}
+        for shard in self._shards:
+            with shard.lock:
+                data, shard.data = shard.data, {}
+            for (exp_id, metric, variant), n in data.items():
+                by_variant = out.setdefault(exp_id, {}).setdefault(metric, {})
+                by_variant[variant] = by_variant.get(variant, 0) + n
+        return out
+
+    def pending(self, exp_id: str) -> Dict[str, Dict[str, int]]:
+        """Counts for `exp_id` not yet flushed (to overlay on stored metrics)."""
+        out: Dict[str, Dict[str, int]] = {}
+        for shard in self._shards:
+            with shard.lock:
+                items = [(k, n) for k, n in shard.data.items() if k[0] == exp_id]
+            for (_, metric, variant), n in items:
+                by_variant = out.setdefault(metric, {})
+                by_variant[variant] = by_variant.get(variant, 0) + n
+        return out
+
+
+class CounterFlusher:
+    """Asyncio task that drains `counters` every `interval` seconds into `write`."""
+
+    def __init__(
+        self,
+        counters: ShardedCounters,
+        write: Callable[[str, Dict[str, Dict[str, int]]], None],
+        interval: float = 2.0,
+    ) -> None:
+        self.counters = counters
+        self.write = write
+        self.interval = interval
+        self.flushes = 0
+        self.errors = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def flush(self) -> int:
+        """Write every pending delta (one write per experiment); returns experiments written."""
+        written = 0
+        for exp_id, metrics in self.counters.drain().items():
+            try:
+                self.write(exp_id, metrics)
+                written += 1
+            except Exception:
+                self.errors += 1
+                log.exception("counter flush for %s failed; keeping the deltas", exp_id)
+                self.counters.add_many({exp_id: metrics})
+        self.flushes += 1
+        return written
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.to_thread(self.flush)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self.flush)  # don't lose the last interval
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import json
+import threading
+
+from pydantic import BaseModel, Field, ValidationError
+
+from app.cache import LRUCache, stable_key
+from .counters import Deltas
+
+__all__ = ["EventRow", "EventDeduper", "parse_events", "aggregate_events", "metric_for"]
+
+# event name -> metric counter it feeds; anything else is counted under its own name
+_METRICS = {
+    "view": "views",
+    "impression": "views",
+    "click": "clicks",
+    "save": "saves",
+    "comment": "comments",
+    "share": "shares",
+    "swipe_through": "swipe_throughs",
+}
+
+
+def metric_for(event: str) -> str:
+    return _METRICS.get(event, event)
+
+
+class EventRow(BaseModel):
+    exp_id: str
+    variant: str
+    event: str = Field(..., examples=["view", "click", "save"])
+    user_id: Optional[str] = None
+    ts: Optional[Union[float, str]] = None
+    event_id: Optional[str] = Field(None, description="Client id used to drop duplicate deliveries")
+
+    def dedupe_key(self) -> Optional[str]:
+        if self.event_id:
+            return self.event_id
+        if self.user_id is not None and self.ts is not None:
+            # no client id: identical (who, what, when) rows are the same event
+            return stable_key(self.exp_id, self.variant, self.event, self.user_id, self.ts)
+        return None
+
+
+class EventDeduper:
+    """Remembers recently seen event ids (per worker) so redelivered batches count once."""
+
+    def __init__(self, maxsize: int = 200_000, ttl: Optional[float] = 86400.0) -> None:
+        self._seen: LRUCache[bool] = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def first_seen(self, key: str) -> bool:
+        with self._lock:
+            if self._seen.get(key):
+                return False
+            self._seen.set(key, True)
+            return True
+
+    def forget(self, keys: Iterable[str]) -> None:
+        """Un-see `keys` (their write failed) so a retried batch counts them."""
+        with self._lock:
+            for key in keys:
+                self._seen.pop(key)
+
+
+def parse_events(body: bytes) -> Tuple[List[EventRow], List[Dict[str, Any]]]:
+    """
+    Parse a JSON array or NDJSON body into rows. Returns (rows, errors); each
+    error is {"row": index, "error": message}. Raises ValueError if the body
+    is not JSON / NDJSON at all.
+    """
+    text = body.decode("utf-8").strip()
+    raw: Iterable[Any]
+    if text.startswith("["):
+        raw = json.loads(text)
+    else:
+        raw = [json.loads(line) for line in text.splitlines() if line.strip()]
+    rows: List[EventRow] = []
+    errors: List[Dict[str, Any]] = []
+    for i, item in enumerate(raw):
+        try:
+            rows.append(EventRow.model_validate(item))
+        except ValidationError as e:
+            errors.append({"row": i, "error": e.errors(include_url=False)[0]["msg"]})
+    return rows, errors
+
+
+def aggregate_events(
+    rows: Iterable[EventRow], deduper: Optional[EventDeduper] = None
+) -> Tuple[Deltas, int, Dict[str, List[str]]]:
+    """
+    Sum rows into exp_id -> metric -> variant counts. Returns (deltas,
+    duplicates, keys): `keys` lists the dedupe keys marked seen per
+    experiment, to hand back to `deduper.forget` if that experiment's write fails.
+    """
+    deltas: Deltas = {}
+    duplicates = 0
+    keys: Dict[str, List[str]] = {}
+    batch_seen = set()
+    for row in rows:
+        key = row.dedupe_key()
+        if key is not None:
+            if key in batch_seen or (deduper is not None and not deduper.first_seen(key)):
+                duplicates += 1
+                continue
+            batch_seen.add(key)
+            keys.setdefault(row.exp_id, []).append(key)
+        by_variant = deltas.setdefault(row.exp_id, {}).setdefault(metric_for(row.event), {})
+        by_variant[row.variant] = by_variant.get(row.variant, 0) + 1
+    return deltas, duplicates, keys
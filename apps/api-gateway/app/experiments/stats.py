@@ -0,0 +1,237 @@
+"""
+Experiment results from running counters.
+
+Every metric here is a rate (events / views), so each arm's sufficient
+statistics are two integers the counters already maintain: the O(1)-per-event
+increments are the whole update, and a results call costs O(arms x metrics)
+no matter how many events were seen.
+
+Per metric and arm: rate with a Wilson interval, absolute and relative lift
+vs the control arm (normal / delta-method intervals), a mixture-SPRT
+always-valid p-value (safe to peek at on every dashboard refresh), and the
+Beta-posterior probability of beating control. Per experiment: a chi-square
+sample-ratio-mismatch check of views against the configured split.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple
+import math
+
+__all__ = ["ArmCounts", "metric_counters", "experiment_results", "srm_check", "chi2_sf", "normal_cdf"]
+
+Counters = Mapping[str, Mapping[str, int]]  # counter -> variant -> count
+
+DENOMINATOR = "views"
+
+# metric name -> counter holding its numerator (denominator is always views)
+_NUMERATORS = {
+    "ctr": "clicks",
+    "click_through_rate": "clicks",
+    "swipe_through_rate": "swipe_throughs",
+    "save_rate": "saves",
+    "comment_rate": "comments",
+    "share_rate": "shares",
+}
+
+Z95 = 1.959963984540054
+
+
+def metric_counters(metric: str) -> Tuple[str, str]:
+    """(numerator counter, denominator counter) for a metric name such as 'ctr' or 'saves'."""
+    m = metric.strip().lower()
+    return _NUMERATORS.get(m, m), DENOMINATOR
+
+
+def normal_cdf(x: float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2.0))
+
+
+def _gamma_q(a: float, x: float) -> float:
+    """Regularised upper incomplete gamma Q(a, x) (series / continued fraction)."""
+    if x <= 0:
+        return 1.0
+    gln = math.lgamma(a)
+    if x < a + 1:
+        term = total = 1.0 / a
+        ap = a
+        for _ in range(500):
+            ap += 1
+            term *= x / ap
+            total += term
+            if abs(term) < abs(total) * 1e-14:
+                break
+        return max(0.0, 1.0 - total * math.exp(-x + a * math.log(x) - gln))
+    b = x + 1 - a
+    c = 1e300
+    d = 1 / b
+    h = d
+    for i in range(1, 500):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = 1e-300 if abs(d) < 1e-300 else d
+        c = b + an / c
+        c = 1e-300 if abs(c) < 1e-300 else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-14:
+            break
+    return math.exp(-x + a * math.log(x) - gln) * h
+
+
+def chi2_sf(x: float, df: int) -> float:
+    """P(X >= x) for a chi-square variable with `df` degrees of freedom."""
+    return _gamma_q(df / 2.0, x / 2.0)
+
+
+@dataclass(frozen=True)
+class ArmCounts:
+    successes: int
+    trials: int
+
+    def __post_init__(self) -> None:
+        # events can outrun views (clicks posted without an /assign, click-only
+        # batches, unflushed view counters); a rate above 1 is meaningless
+        object.__setattr__(self, "trials", max(0, self.trials))
+        object.__setattr__(self, "successes", min(max(0, self.successes), self.trials))
+
+    @property
+    def rate(self) -> float:
+        return self.successes / self.trials if self.trials else 0.0
+
+    @property
+    def var(self) -> float:
+        """Variance of the rate estimate."""
+        if not self.trials:
+            return math.inf
+        p = self.rate
+        return max(p * (1 - p), 1e-12) / self.trials
+
+    def wilson(self, z: float = Z95) -> Tuple[float, float]:
+        n = self.trials
+        if not n:
+            return 0.0, 1.0
+        p = self.rate
+        denom = 1 + z * z / n
+        centre = (p + z * z / (2 * n)) / denom
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+        return max(0.0, centre - half), min(1.0, centre + half)
+
+
+def _msprt_p(diff: float, var: float, tau: float) -> float:
+    """
+    Mixture-SPRT always-valid p-value for H0: diff = 0 with a N(0, tau^2)
+    mixing distribution over the effect (normal approximation).
+    """
+    if not math.isfinite(var) or var <= 0:
+        return 1.0
+    t2 = tau * tau
+    log_lr = 0.5 * math.log(var / (var + t2)) + diff * diff * t2 / (2 * var * (var + t2))
+    return 1.0 if log_lr <= 0 else min(1.0, math.exp(-log_lr))
+
+
+def _beta_posterior(arm: ArmCounts) -> Dict[str, float]:
+    """Beta(1 + successes, 1 + failures) posterior of the arm's rate."""
+    a = 1 + arm.successes
+    b = 1 + arm.trials - arm.successes
+    return {"alpha": a, "beta": b, "mean": a / (a + b), "var": a * b / ((a + b) ** 2 * (a + b + 1))}
+
+
+def _compare(arm: ArmCounts, control: ArmCounts, z: float, tau: float) -> Dict[str, Any]:
+    diff = arm.rate - control.rate
+    var = arm.var + control.var
+    out: Dict[str, Any] = {"abs_lift": diff, "abs_lift_ci": None, "rel_lift": None, "rel_lift_ci": None}
+    if math.isfinite(var):
+        se = math.sqrt(var)
+        out["abs_lift_ci"] = (diff - z * se, diff + z * se)
+    if control.rate > 0 and arm.rate > 0:
+        # delta method on log(rate ratio)
+        log_rr = math.log(arm.rate / control.rate)
+        se_log = math.sqrt(arm.var / arm.rate ** 2 + control.var / control.rate ** 2)
+        out["rel_lift"] = math.exp(log_rr) - 1
+        out["rel_lift_ci"] = (math.exp(log_rr - z * se_log) - 1, math.exp(log_rr + z * se_log) - 1)
+    out["p_value_sequential"] = _msprt_p(diff, var, tau)
+    # P(rate_arm > rate_control) under the Beta posteriors (normal approximation)
+    pa, pc = _beta_posterior(arm), _beta_posterior(control)
+    out["prob_beats_control"] = normal_cdf((pa["mean"] - pc["mean"]) / math.sqrt(pa["var"] + pc["var"]))
+    return out
+
+
+def srm_check(
+    views: Mapping[str, int],
+    weights: Mapping[str, float],
+    threshold: float = 0.001,
+) -> Dict[str, Any]:
+    """Chi-square test of observed views per arm against the intended split."""
+    arms = [a for a in weights if weights[a] > 0]
+    total_w = sum(weights[a] for a in arms)
+    n = sum(views.get(a, 0) for a in arms)
+    if len(arms) < 2 or n == 0:
+        return {"chi2": 0.0, "p_value": 1.0, "mismatch": False, "expected": {}}
+    expected = {a: n * weights[a] / total_w for a in arms}
+    chi2 = sum((views.get(a, 0) - e) ** 2 / e for a, e in expected.items())
+    p = chi2_sf(chi2, len(arms) - 1)
+    return {"chi2": chi2, "p_value": p, "mismatch": p < threshold, "expected": expected}
+
+
+def experiment_results(
+    counters: Counters,
+    arms: Sequence[str],
+    metrics: Sequence[str],
+    weights: Optional[Mapping[str, float]] = None,
+    control: Optional[str] = None,
+    alpha: float = 0.05,
+    tau: float = 0.01,
+) -> Dict[str, Any]:
+    """
+    Results for `metrics` (the first is the goal metric). `control` defaults
+    to the first arm; `weights` (intended split) enables the SRM check.
+    """
+    control = control or arms[0]
+    z = Z95 if alpha == 0.05 else _z_for(alpha)
+    views = counters.get(DENOMINATOR, {})
+    out_metrics: Dict[str, Any] = {}
+    for metric in metrics:
+        num, den = metric_counters(metric)
+        counts = {
+            a: ArmCounts(counters.get(num, {}).get(a, 0), counters.get(den, {}).get(a, 0))
+            for a in arms
+        }
+        ctrl = counts[control]
+        per_arm: Dict[str, Any] = {}
+        for a in arms:
+            c = counts[a]
+            row: Dict[str, Any] = {
+                "successes": c.successes,
+                "trials": c.trials,
+                "rate": c.rate,
+                "ci": c.wilson(z),
+                "posterior": _beta_posterior(c),
+            }
+            if a != control:
+                row.update(_compare(c, ctrl, z, tau))
+            per_arm[a] = row
+        out_metrics[metric] = {"numerator": num, "denominator": den, "arms": per_arm}
+    return {
+        "control": control,
+        "alpha": alpha,
+        "goal_metric": metrics[0] if metrics else None,
+        "metrics": out_metrics,
+        "srm": srm_check(views, weights) if weights else None,
+        "views": {a: views.get(a, 0) for a in arms},
+    }
+
+
+def _z_for(alpha: float) -> float:
+    """Two-sided normal quantile for `alpha` (bisection on normal_cdf)."""
+    target = 1 - alpha / 2
+    lo, hi = 0.0, 10.0
+    for _ in range(80):
+        mid = (lo + hi) / 2
+        if normal_cdf(mid) < target:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
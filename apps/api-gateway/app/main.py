@@ -1,11 +1,20 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse, Response
 
 from app.config import get_settings, Settings
+from app.deps import close_http_clients, start_http_clients
+from app.agents import router as agents_router
+from app.agents.render_pool import shutdown_render_pool, start_render_pool
 from app.auth import oauth as oauth_router
+from app.auth.passwords import shutdown_password_hasher, start_password_hasher
+from app.experiments import start_experiments, stop_experiments
+from app.publishing import start_dispatcher, stop_dispatcher
+from app.storage import close_storage, start_storage
 
 # Feature routers
 from app.routers import (
@@ -29,6 +38,27 @@ from app.routers import (
 )
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup: storage, pooled upstream HTTP clients, password hashing threads,
+    # poster render workers (they resolve fonts and prewarm backgrounds), the
+    # scheduled-post dispatcher, the A/B counter flusher.
+    # Shutdown: stop the workers, flush counters and release pooled connections.
+    start_storage()
+    start_http_clients()
+    start_password_hasher()
+    start_render_pool()
+    start_dispatcher()
+    start_experiments()
+    yield
+    await stop_experiments()
+    await stop_dispatcher()
+    shutdown_render_pool()
+    shutdown_password_hasher()
+    await close_http_clients()
+    close_storage()
+
+
 def create_app() -> FastAPI:
     """
     Root ASGI app. Hosts a minimal /health and mounts the versioned API at /v1.
@@ -42,6 +72,7 @@ def create_app() -> FastAPI:
         docs_url=None,        # use versioned docs at /v1/docs
         redoc_url=None,
         openapi_url=None,
+        lifespan=lifespan,
     )
 
     # ---------- CORS ----------
@@ -52,6 +83,8 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        # paged lists (GET /v1/calendar) return the next page token in this header
+        expose_headers=["X-Next-Cursor"],
     )
 
     # ---------- Root health ----------
@@ -109,6 +142,9 @@ def create_app() -> FastAPI:
     v1.include_router(growth.router)
     v1.include_router(export_router.router)
 
+    # Agent endpoints (drafting, research, ranked poster candidates)
+    v1.include_router(agents_router.router)
+
     # Mount under /v1
     app.mount("/v1", v1)
 
@@ -0,0 +1,325 @@
+"""
+Publishing of scheduled LinkedIn posts.
+
+`Dispatcher` is an asyncio task (started in the app lifespan) that keeps a
+min-heap of (due time, post id) and sleeps until the earliest one, so pending
+posts are never polled one by one:
+
+  - posts enter the heap when scheduled (`notify`) and from a periodic refill
+    that reads only posts due within the next PUBLISH_REFILL_S window through
+    the storage status/date index (picks up posts written by other workers and
+    recovers after restarts),
+  - at most PUBLISH_MAX_CONCURRENCY posts are in flight at once (due posts
+    beyond that stay in the heap until a slot frees up),
+  - a post is claimed with a lease before publishing, so two workers sharing
+    a SQLite store never publish it twice,
+  - failures retry with full-jitter exponential backoff up to
+    PUBLISH_MAX_ATTEMPTS, then the post is marked "failed",
+  - every post carries an idempotency key the publisher uses to turn a retried
+    call into a no-op.
+
+`LocalPublisher` stands in for the LinkedIn API (it behaves like
+POST /linkedin/publish: a fake post id, optionally failing at random).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Protocol, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from uuid import uuid4
+
+from app.config import get_settings
+from app.storage import SCHEDULED_POSTS, Doc, Repository, get_repository
+
+__all__ = [
+    "Publisher",
+    "LocalPublisher",
+    "PublishError",
+    "Dispatcher",
+    "get_publisher",
+    "get_dispatcher",
+    "start_dispatcher",
+    "stop_dispatcher",
+]
+
+log = logging.getLogger(__name__)
+
+
+class PublishError(Exception):
+    """A publish attempt failed; the dispatcher retries it."""
+
+
+class Publisher(Protocol):
+    async def publish(self, post: Doc, idempotency_key: str) -> str:
+        """Publish `post` and return the network's post id."""
+        ...
+
+
+class LocalPublisher:
+    """Prototype publisher: fake post ids, deduplicated by idempotency key."""
+
+    def __init__(self, fail_rate: float = 0.0, latency_s: float = 0.0, max_keys: int = 100_000) -> None:
+        self.fail_rate = fail_rate
+        self.latency_s = latency_s
+        self.max_keys = max_keys
+        self._published: Dict[str, str] = {}  # idempotency key -> post id (insertion ordered)
+        self._lock = threading.Lock()
+
+    async def publish(self, post: Doc, idempotency_key: str) -> str:
+        with self._lock:
+            done = self._published.get(idempotency_key)
+        if done is not None:
+            return done
+        if self.latency_s:
+            await asyncio.sleep(self.latency_s)
+        if self.fail_rate and random.random() < self.fail_rate:
+            raise PublishError("simulated LinkedIn error")
+        with self._lock:
+            post_id = self._published.setdefault(idempotency_key, f"li_{uuid4().hex[:8]}")
+            while len(self._published) > self.max_keys:
+                self._published.pop(next(iter(self._published)))
+        return post_id
+
+
+def _epoch(iso: str) -> float:
+    return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _due(doc: Doc) -> float:
+    """When a post should next be attempted (its slot, or its retry time)."""
+    return max(_epoch(doc["scheduled_at"]), doc.get("next_attempt_at") or 0.0)
+
+
+class Dispatcher:
+    def __init__(
+        self,
+        publisher: Publisher,
+        repo: Repository,
+        max_concurrency: int = 8,
+        max_attempts: int = 5,
+        retry_base_s: float = 2.0,
+        retry_max_s: float = 300.0,
+        lease_s: float = 60.0,
+        refill_s: float = 30.0,
+    ) -> None:
+        self.publisher = publisher
+        self.repo = repo
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base_s = retry_base_s
+        self.retry_max_s = retry_max_s
+        self.lease_s = lease_s
+        self.refill_s = refill_s
+        self._heap: List[Tuple[float, int, str]] = []
+        self._queued: Dict[str, float] = {}  # post id -> due time of its live heap entry
+        self._seq = itertools.count()
+        self.max_concurrency = max(1, max_concurrency)
+        self._wake = asyncio.Event()
+        self._tasks: Set[asyncio.Task] = set()
+        self._runner: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.retried = 0
+        self.failed = 0
+
+    # ---------- queue ----------
+    def _push(self, post_id: str, due: float) -> None:
+        if self._queued.get(post_id) == due:
+            return
+        # a superseded entry stays in the heap and is skipped when popped
+        self._queued[post_id] = due
+        heapq.heappush(self._heap, (due, next(self._seq), post_id))
+        if self._heap[0][2] == post_id:
+            self._wake.set()  # new earliest deadline
+
+    def notify(self, doc: Doc) -> None:
+        """Queue a scheduled post; safe to call from any thread."""
+        if self._loop is None or doc.get("status") != "scheduled":
+            return
+        self._loop.call_soon_threadsafe(self._push, doc["id"], _due(doc))
+
+    async def _refill(self) -> None:
+        horizon = _iso(time.time() + self.refill_s + 1)
+        docs = await asyncio.to_thread(self.repo.find, status="scheduled", end=horizon)
+        for doc in docs:
+            self._push(doc["id"], _due(doc))
+
+    # ---------- loop ----------
+    async def _run(self) -> None:
+        next_refill = 0.0
+        while True:
+            now = time.time()
+            if now >= next_refill:
+                try:
+                    await self._refill()
+                except Exception:
+                    log.exception("scheduled post refill failed")
+                next_refill = now + self.refill_s
+            # due posts beyond max_concurrency wait in the heap, not as parked tasks
+            while self._heap and self._heap[0][0] <= now and len(self._tasks) < self.max_concurrency:
+                due, _, post_id = heapq.heappop(self._heap)
+                if self._queued.get(post_id) != due:
+                    continue  # superseded
+                del self._queued[post_id]
+                task = asyncio.create_task(self._publish(post_id))
+                self._tasks.add(task)
+                task.add_done_callback(self._task_done)
+            wait = next_refill - time.time()
+            if self._heap and len(self._tasks) < self.max_concurrency:
+                wait = min(wait, self._heap[0][0] - time.time())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), max(0.0, wait))
+            except asyncio.TimeoutError:
+                pass
+
+    def _task_done(self, task: asyncio.Task) -> None:
+        self._tasks.discard(task)
+        self._wake.set()  # a slot is free for the next due post
+
+    # ---------- publish ----------
+    def _claim(self, post_id: str, token: str, now: float) -> Optional[Doc]:
+        def _take(doc: Doc) -> Optional[Doc]:
+            if doc.get("status") != "scheduled" or _due(doc) > now:
+                return None
+            if (doc.get("lease_until") or 0.0) > now:
+                return None  # another worker has it
+            doc["lease_until"] = now + self.lease_s
+            doc["lease_token"] = token
+            return doc
+
+        doc = self.repo.update(post_id, _take)
+        return doc if doc is not None and doc.get("lease_token") == token else None
+
+    async def _publish(self, post_id: str) -> None:
+        token = uuid4().hex
+        doc = await asyncio.to_thread(self._claim, post_id, token, time.time())
+        if doc is None:
+            return
+        key = doc.get("idempotency_key") or post_id
+        try:
+            li_id = await self.publisher.publish(doc, key)
+        except Exception as e:
+            await asyncio.to_thread(self._record_failure, post_id, token, repr(e))
+            return
+        await asyncio.to_thread(self._record_success, post_id, token, li_id)
+
+    def _record_success(self, post_id: str, token: str, li_id: str) -> None:
+        def _done(doc: Doc) -> Optional[Doc]:
+            if doc.get("lease_token") != token:
+                return None
+            doc.update(
+                status="published",
+                post_id=li_id,
+                published_at=_iso(time.time()),
+                attempts=doc.get("attempts", 0) + 1,
+                lease_until=None,
+                lease_token=None,
+            )
+            return doc
+
+        self.repo.update(post_id, _done)
+        self.published += 1
+
+    def _record_failure(self, post_id: str, token: str, error: str) -> None:
+        outcome = None
+
+        def _fail(doc: Doc) -> Optional[Doc]:
+            nonlocal outcome
+            if doc.get("lease_token") != token:
+                return None
+            attempts = doc.get("attempts", 0) + 1
+            doc.update(attempts=attempts, last_error=error, lease_until=None, lease_token=None)
+            if attempts >= self.max_attempts:
+                doc["status"] = "failed"
+                outcome = "failed"
+            else:
+                # full jitter: spreads retries of a burst that failed together
+                cap = min(self.retry_max_s, self.retry_base_s * 2 ** (attempts - 1))
+                doc["next_attempt_at"] = time.time() + random.uniform(0, cap)
+                outcome = "retry"
+            return doc
+
+        doc = self.repo.update(post_id, _fail)
+        if outcome == "retry" and doc is not None:
+            self.retried += 1
+            self.notify(doc)
+        elif outcome == "failed":
+            self.failed += 1
+            log.warning("giving up on scheduled post %s: %s", post_id, error)
+
+    # ---------- lifecycle ----------
+    def start(self) -> None:
+        if self._runner is None:
+            self._loop = asyncio.get_running_loop()
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # in-flight posts keep their lease; whoever runs next retries them after it expires
+        tasks = [t for t in (self._runner, *self._tasks) if t is not None]
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._runner = None
+        self._loop = None
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._queued),
+            "next_due": _iso(self._heap[0][0]) if self._heap else None,
+            "inflight": len(self._tasks),
+            "published": self.published,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+_PUBLISHER: Optional[LocalPublisher] = None
+_DISPATCHER: Optional[Dispatcher] = None
+
+
+def get_publisher() -> Publisher:
+    global _PUBLISHER
+    if _PUBLISHER is None:
+        s = get_settings()
+        _PUBLISHER = LocalPublisher(fail_rate=s.PUBLISH_LOCAL_FAIL_RATE)
+    return _PUBLISHER
+
+
+def get_dispatcher() -> Optional[Dispatcher]:
+    """The running dispatcher, or None outside the app lifespan."""
+    return _DISPATCHER
+
+
+def start_dispatcher() -> Dispatcher:
+    global _DISPATCHER
+    if _DISPATCHER is None:
+        s = get_settings()
+        _DISPATCHER = Dispatcher(
+            get_publisher(),
+            get_repository(SCHEDULED_POSTS),
+            max_concurrency=s.PUBLISH_MAX_CONCURRENCY,
+            max_attempts=s.PUBLISH_MAX_ATTEMPTS,
+            retry_base_s=s.PUBLISH_RETRY_BASE_S,
+            retry_max_s=s.PUBLISH_RETRY_MAX_S,
+            lease_s=s.PUBLISH_LEASE_S,
+            refill_s=s.PUBLISH_REFILL_S,
+        )
+        _DISPATCHER.start()
+    return _DISPATCHER
+
+
+async def stop_dispatcher() -> None:
+    global _DISPATCHER
+    if _DISPATCHER is not None:
+        await _DISPATCHER.stop()
+        _DISPATCHER = None
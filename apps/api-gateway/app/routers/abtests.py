@@ -1,30 +1,83 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, HTTPException, Query
-from pydantic import BaseModel, Field
-from typing import Dict, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field, model_validator
+from typing import Any, Callable, Dict, List, Literal, Optional
 from uuid import uuid4
-import hashlib
+import logging
 import time
 
+from app.config import get_settings
+from app.experiments import (
+    aggregate_events,
+    apply_deltas,
+    arm_weights,
+    config_registry,
+    get_bandits,
+    experiment_results,
+    get_assigner,
+    get_counters,
+    get_event_deduper,
+    invalidate_assigner,
+    merged_metrics,
+    parse_events,
+)
+from app.storage import EXPERIMENTS, Repository, get_repository
+
 router = APIRouter(prefix="/abtests", tags=["abtests"])
+log = logging.getLogger(__name__)
 
 Status = Literal["created", "running", "stopped"]
+Allocation = Literal["fixed", "thompson", "ucb"]
 
 class CreateExp(BaseModel):
     name: str = Field(..., examples=["headline-variants"])
     goal: str = Field(..., examples=["CTR"])
-    a: str = Field(..., description="Variant A payload (e.g., headline text)")
-    b: str = Field(..., description="Variant B payload")
+    a: Optional[str] = Field(None, description="Variant A payload (e.g., headline text)")
+    b: Optional[str] = Field(None, description="Variant B payload")
+    variants: Optional[Dict[str, str]] = Field(
+        None, description="N-arm alternative to a/b: arm name -> payload"
+    )
+    weights: Optional[Dict[str, float]] = Field(
+        None, description="Traffic split per arm (any positive scale); equal when omitted"
+    )
+    exposure_percent: float = Field(100.0, ge=0, le=100, description="% of units that enter the experiment")
+    goal_metric: Optional[str] = Field(None, examples=["ctr"], description="Defaults to `goal`")
+    secondary_metrics: List[str] = Field(default_factory=list, examples=[["saves", "comments"]])
+    allocation: Allocation = Field(
+        "fixed", description="'thompson' / 'ucb' shift traffic toward the best arm on the goal metric"
+    )
+
+    @model_validator(mode="after")
+    def _arms(self) -> "CreateExp":
+        if not self.variants and (self.a is None or self.b is None):
+            raise ValueError("Provide both 'a' and 'b', or 'variants'")
+        if self.variants is not None and len(self.variants) < 2:
+            raise ValueError("An experiment needs at least two variants")
+        arms = self.variants or {"A": "", "B": ""}
+        if self.weights is not None:
+            if set(self.weights) != set(arms):
+                raise ValueError("'weights' must name exactly the experiment's variants")
+            if any(w < 0 for w in self.weights.values()) or not any(w > 0 for w in self.weights.values()):
+                raise ValueError("'weights' must be non-negative with at least one positive")
+        return self
 
 class Experiment(BaseModel):
     id: str
     name: str
     goal: str
-    a: str
-    b: str
+    a: Optional[str] = None
+    b: Optional[str] = None
+    variants: Dict[str, Any] = Field(default_factory=dict)  # arm -> payload
+    weights: Optional[Dict[str, float]] = None
+    exposure_percent: float = 100.0
+    goal_metric: Optional[str] = None
+    secondary_metrics: List[str] = Field(default_factory=list)
+    allocation: Allocation = "fixed"
     status: Status = "created"
     created_at: float
+    source: Optional[str] = Field(None, description="Config file the experiment is defined in, if any")
     # very simple counters for demo/preview
     metrics: Dict[str, Dict[str, int]] = Field(
         default_factory=lambda: {
@@ -33,47 +86,191 @@ class Experiment(BaseModel):
         }
     )
 
-# In-memory store for the prototype
-_DB: Dict[str, Experiment] = {}
+    @model_validator(mode="after")
+    def _legacy_ab(self) -> "Experiment":
+        # experiments stored before N-arm support only have a/b
+        if not self.variants and self.a is not None and self.b is not None:
+            self.variants = {"A": self.a, "B": self.b}
+        return self
+
+def _store() -> Repository:
+    return get_repository(EXPERIMENTS)
 
 def _get(exp_id: str) -> Experiment:
-    exp = _DB.get(exp_id)
-    if not exp:
+    doc = _store().get(exp_id)
+    if not doc:
         raise HTTPException(404, "Experiment not found")
-    return exp
+    doc["metrics"] = merged_metrics(doc)
+    return Experiment(**doc)
+
+def _update(exp_id: str, fn: Callable[[Experiment], None]) -> Experiment:
+    """Apply `fn` to the stored experiment atomically (safe across workers)."""
+    cfg = config_registry().table.configs.get(exp_id)
+    if cfg is not None:
+        raise HTTPException(409, f"Experiment is defined in {cfg.source}; change its status there")
+    def _apply(doc: dict) -> dict:
+        exp = Experiment(**doc)
+        fn(exp)
+        return exp.model_dump()
+    doc = _store().update(exp_id, _apply)
+    if not doc:
+        raise HTTPException(404, "Experiment not found")
+    invalidate_assigner(exp_id)
+    doc["metrics"] = merged_metrics(doc)
+    return Experiment(**doc)
 
 @router.post("", response_model=Experiment)
 def create_exp(payload: CreateExp):
     exp_id = uuid4().hex
+    if payload.variants:
+        variants = {k.strip(): v.strip() for k, v in payload.variants.items()}
+        a = b = None
+    else:
+        a, b = payload.a.strip(), payload.b.strip()  # type: ignore[union-attr]
+        variants = {"A": a, "B": b}
     exp = Experiment(
         id=exp_id,
         name=payload.name.strip(),
         goal=payload.goal.strip(),
-        a=payload.a.strip(),
-        b=payload.b.strip(),
+        a=a,
+        b=b,
+        variants=variants,
+        weights={k.strip(): w for k, w in payload.weights.items()} if payload.weights else None,
+        exposure_percent=payload.exposure_percent,
+        goal_metric=(payload.goal_metric or payload.goal).strip().lower(),
+        secondary_metrics=[m.strip().lower() for m in payload.secondary_metrics],
+        allocation=payload.allocation,
         status="created",
         created_at=time.time(),
+        metrics={"views": {v: 0 for v in variants}, "clicks": {v: 0 for v in variants}},
     )
-    _DB[exp_id] = exp
+    _store().put(exp.model_dump())
     return exp
 
+class BatchRes(BaseModel):
+    ok: bool = True
+    accepted: int
+    duplicates: int
+    rejected: int
+    experiments: int
+    errors: List[Dict[str, Any]] = Field(default_factory=list, description="First few rejected rows")
+
+def _ingest(body: bytes) -> BatchRes:
+    try:
+        rows, errors = parse_events(body)
+    except ValueError as e:  # includes JSON decode errors
+        raise HTTPException(400, f"Body must be a JSON array or NDJSON: {e}")
+    if len(rows) + len(errors) > get_settings().AB_EVENT_BATCH_MAX:
+        raise HTTPException(413, f"At most {get_settings().AB_EVENT_BATCH_MAX} events per batch")
+    valid = []
+    for row in rows:
+        assigner = get_assigner(row.exp_id)
+        if assigner is None:
+            errors.append({"event_id": row.event_id, "error": f"Unknown experiment: {row.exp_id}"})
+        elif row.variant not in assigner.arms:
+            errors.append({"event_id": row.event_id, "error": f"Unknown variant: {row.variant}"})
+        else:
+            valid.append(row)
+    deduper = get_event_deduper()
+    deltas, duplicates, keys = aggregate_events(valid, deduper)
+    accepted = len(valid) - duplicates
+    rejected = len(errors)  # rows; an experiment dropped below adds all of its rows
+    pending = list(deltas)
+    # ids are only kept as "seen" once their counts are stored, so a client
+    # retrying after a failed write is not told its events were duplicates
+    while pending:
+        exp_id = pending[0]
+        try:
+            written = apply_deltas(exp_id, deltas[exp_id])  # one write per experiment
+        except Exception:
+            for left in pending:
+                deduper.forget(keys.get(left, ()))
+            log.exception("event batch write failed for %s", exp_id)
+            raise HTTPException(
+                503, "Could not record events, retry the batch", headers={"Retry-After": "1"}
+            )
+        pending.pop(0)
+        if not written:  # deleted since validation
+            deduper.forget(keys.get(exp_id, ()))
+            rows_lost = sum(n for by_variant in deltas[exp_id].values() for n in by_variant.values())
+            accepted -= rows_lost
+            rejected += rows_lost
+            errors.append({"exp_id": exp_id, "rows": rows_lost, "error": f"Unknown experiment: {exp_id}"})
+    return BatchRes(
+        accepted=accepted,
+        duplicates=duplicates,
+        rejected=rejected,
+        experiments=len(deltas),
+        errors=errors[:20],
+    )
+
+@router.post("/events:batch", response_model=BatchRes)
+async def ingest_events(request: Request):
+    """
+    Bulk views/clicks/other events. Body: a JSON array or NDJSON of
+    {exp_id, variant, event, user_id?, ts?, event_id?}. Rows repeating an
+    event_id (or, without one, the same exp/variant/event/user/ts) count once.
+    On 503 retry the same batch: rows that were not stored are not treated
+    as duplicates.
+    """
+    body = await request.body()
+    return await run_in_threadpool(_ingest, body)
+
+@router.get("/configs/stats")
+def config_stats():
+    """YAML-defined experiments currently loaded, reload count and per-file errors."""
+    return config_registry().stats()
+
+@router.get("/bandits/stats")
+def bandit_stats():
+    """Current thompson/ucb splits of running bandit experiments."""
+    return get_bandits().stats()
+
 @router.get("/{exp_id}", response_model=Experiment)
 def get_exp(exp_id: str):
     return _get(exp_id)
 
+@router.get("/{exp_id}/results")
+def results(
+    exp_id: str,
+    control: Optional[str] = Query(None, description="Baseline arm (default: the first one)"),
+    alpha: float = Query(0.05, gt=0, lt=0.5, description="1 - confidence level for intervals"),
+):
+    """
+    Per-arm rates, lift vs control with intervals, always-valid sequential
+    p-values, Beta posteriors and a sample-ratio-mismatch check, for the goal
+    metric followed by the secondary metrics. Computed from the running counters.
+    Bandit experiments skip the SRM check (their split moves on purpose) and
+    report the current split under `allocation`.
+    """
+    exp = _get(exp_id)
+    arms = list(exp.variants)
+    if control is not None and control not in arms:
+        raise HTTPException(422, f"Unknown variant: {control}")
+    goal = exp.goal_metric or exp.goal.strip().lower()
+    metrics = [goal] + [m for m in exp.secondary_metrics if m != goal]
+    out = experiment_results(
+        exp.metrics,
+        arms,
+        metrics,
+        weights=arm_weights(exp.model_dump()) if exp.allocation == "fixed" else None,
+        control=control,
+        alpha=alpha,
+        tau=get_settings().AB_MSPRT_TAU,
+    )
+    allocation = {"mode": exp.allocation, "weights": get_bandits().weights.get(exp_id)}
+    return {"experiment_id": exp_id, "status": exp.status, "allocation": allocation, **out}
+
 @router.post("/{exp_id}/start", response_model=Experiment)
 def start_exp(exp_id: str):
-    exp = _get(exp_id)
-    exp.status = "running"
-    _DB[exp_id] = exp
+    exp = _update(exp_id, lambda exp: setattr(exp, "status", "running"))
+    if exp.allocation != "fixed":
+        get_bandits().recompute()  # other workers pick it up on their next AB_BANDIT_INTERVAL_S tick
     return exp
 
 @router.post("/{exp_id}/stop", response_model=Experiment)
 def stop_exp(exp_id: str):
-    exp = _get(exp_id)
-    exp.status = "stopped"
-    _DB[exp_id] = exp
-    return exp
+    return _update(exp_id, lambda exp: setattr(exp, "status", "stopped"))
 
 @router.get("/{exp_id}/assign")
 def assign_variant(
@@ -81,20 +278,26 @@ def assign_variant(
     user_id: Optional[str] = Query(None, description="Stable assignment key"),
 ):
     """
-    Deterministic 50/50 split by user_id; random-ish if none provided.
+    Deterministic weighted split by user_id (random-ish if none provided).
+    `variant` is null when the user falls outside the exposure percentage.
     """
-    exp = _get(exp_id)
-    if exp.status != "running":
+    assigner = get_assigner(exp_id)
+    if assigner is None:
+        raise HTTPException(404, "Experiment not found")
+    if not assigner.running:
         raise HTTPException(400, "Experiment is not running")
-    key = user_id or uuid4().hex
-    h = hashlib.sha256(key.encode("utf-8")).hexdigest()
-    variant = "A" if int(h, 16) % 2 == 0 else "B"
-    # bump a naive view counter for demo purposes
-    exp.metrics["views"][variant] += 1
+    variant = assigner.assign(user_id or uuid4().hex)
+    if variant is not None:
+        # views are buffered and flushed to storage in batches
+        get_counters().add(exp_id, "views", variant)
     return {"experiment_id": exp_id, "variant": variant}
 
 @router.post("/{exp_id}/click")
-def click(exp_id: str, variant: Literal["A", "B"]):
-    exp = _get(exp_id)
-    exp.metrics["clicks"][variant] += 1
-    return {"ok": True, "metrics": exp.metrics}
+def click(exp_id: str, variant: str):
+    assigner = get_assigner(exp_id)
+    if assigner is None:
+        raise HTTPException(404, "Experiment not found")
+    if variant not in assigner.arms:
+        raise HTTPException(422, f"Unknown variant: {variant}")
+    get_counters().add(exp_id, "clicks", variant)
+    return {"ok": True, "metrics": _get(exp_id).metrics}
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, Body, Query
+from fastapi import APIRouter, HTTPException, Body, Query, Response
 from pydantic import BaseModel
 from typing import List, Literal, Optional
 from uuid import uuid4
-from datetime import datetime
+from datetime import datetime, timedelta
+
+from app.storage import CALENDAR, Repository, decode_cursor, encode_cursor, get_repository
 
 router = APIRouter(prefix="/calendar", tags=["calendar"])
 
@@ -18,7 +20,8 @@ class CreateItemReq(BaseModel):
     date: str
     title: str
 
-_DB: List[Item] = []
+def _store() -> Repository:
+    return get_repository(CALENDAR)
 
 def _to_iso_date(s: str) -> str:
     """Accept a few common formats and return YYYY-MM-DD."""
@@ -37,8 +40,33 @@ def _to_iso_date(s: str) -> str:
     raise HTTPException(422, f"Invalid date format: {s}. Use YYYY-MM-DD or dd/MM/YYYY.")
 
 @router.get("", response_model=List[Item])
-def list_items():
-    return _DB
+def list_items(
+    response: Response,
+    date_from: Optional[str] = Query(None, alias="from", description="First day (inclusive)"),
+    date_to: Optional[str] = Query(None, alias="to", description="Last day (inclusive)"),
+    status: Optional[Status] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit for every match"),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+):
+    """
+    Items ordered by date. With `limit`, a full page sets the X-Next-Cursor
+    header; pass it back as `cursor` for the next page.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(422, "Invalid cursor")
+    start = _to_iso_date(date_from) if date_from else None
+    end = None
+    if date_to:
+        # `to` is inclusive; the store takes a half-open range
+        end = (datetime.strptime(_to_iso_date(date_to), "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    docs = _store().find(status=status, start=start, end=end, after=after, limit=limit)
+    if limit is not None and len(docs) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(CALENDAR, docs[-1])
+    return [Item(**d) for d in docs]
 
 @router.post("", response_model=Item)
 def create_item(
@@ -61,22 +89,18 @@ def create_item(
         title=title.strip(),
         status="draft",
     )
-    _DB.append(it)
+    _store().put(it.model_dump())
     return it
 
 @router.put("/{item_id}", response_model=Item)
 def update_item(item_id: str, item: Item):
-    for i, it in enumerate(_DB):
-        if it.id == item_id:
-            # normalize date on update too
-            item.date = _to_iso_date(item.date)
-            _DB[i] = item
-            return item
-    raise HTTPException(404, "Not found")
+    # normalize date on update too; the path decides which item this is
+    item.date = _to_iso_date(item.date)
+    item.id = item_id
+    if _store().update(item_id, lambda _: item.model_dump()) is None:
+        raise HTTPException(404, "Not found")
+    return item
 
 @router.delete("/{item_id}")
 def delete_item(item_id: str):
-    global _DB
-    before = len(_DB)
-    _DB = [it for it in _DB if it.id != item_id]
-    return {"ok": len(_DB) < before}
+    return {"ok": _store().delete(item_id)}
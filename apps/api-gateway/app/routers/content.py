@@ -1,12 +1,22 @@
 from __future__ import annotations
 
-from typing import Literal, List, Optional
-from fastapi import APIRouter
+from typing import AsyncIterator, Iterator, Literal, List, Optional
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+import asyncio
+import json
 import os
 import random
+import re
 import textwrap
 
+import httpx
+
+from app.cache import DiskCache, LRUCache, TieredCache, stable_key
+from app.config import get_settings
+from app.deps import get_llm_client
+
 router = APIRouter(prefix="/content", tags=["content"])
 
 PostType = Literal["text", "article", "carousel", "poll"]
@@ -86,22 +96,7 @@ def _pad_to_range(text: str, length: PostLength, r: random.Random) -> str:
 
 # -------- Optional OSS LLM (vLLM) path
 
-def _llm_generate(req: GenReq, i: int) -> Optional[str]:
-    """
-    If VLLM_BASE_URL is set and httpx is available, ask an OSS model (e.g. Llama 3.1 8B).
-    Uses OpenAI-compatible /v1/chat/completions (common in vLLM).
-    Returns a string on success, or None to fall back to template generation.
-    """
-    base = os.getenv("VLLM_BASE_URL")
-    if not base:
-        return None
-
-    try:
-        import httpx  # optional dep; if missing we fall back
-    except Exception:
-        return None
-
-    model = os.getenv("VLLM_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct")
+def _llm_messages(req: GenReq, i: int) -> list[dict]:
     sys = (
         f"You are an assistant that writes high-signal LinkedIn content in the brand voice: "
         f"{req.brand_voice}. Write in {req.language}. Avoid fluff; prefer concrete tips."
@@ -113,20 +108,32 @@ def _llm_generate(req: GenReq, i: int) -> Optional[str]:
         f"If type=carousel, provide 7 short slides prefixed 'Slide N:'. "
         f"If type=poll, provide a question and 4 options."
     )
+    return [
+        {"role": "system", "content": sys},
+        {"role": "user", "content": prompt},
+    ]
+
+async def _llm_generate(client: httpx.AsyncClient, req: GenReq, i: int) -> Optional[str]:
+    """
+    If VLLM_BASE_URL is set, ask an OSS model (e.g. Llama 3.1 8B) for variant `i`.
+    Uses OpenAI-compatible /v1/chat/completions (common in vLLM) over the shared
+    pooled client. Returns a string on success, or None to fall back to templates.
+    """
+    base = os.getenv("VLLM_BASE_URL")
+    if not base:
+        return None
+
+    model = os.getenv("VLLM_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct")
     try:
-        with httpx.Client(timeout=60) as client:
-            resp = client.post(
-                f"{base.rstrip('/')}/v1/chat/completions",
-                json={
-                    "model": model,
-                    "temperature": 0.9,
-                    "top_p": 0.95,
-                    "messages": [
-                        {"role": "system", "content": sys},
-                        {"role": "user", "content": prompt},
-                    ],
-                },
-            )
+        resp = await client.post(
+            f"{base.rstrip('/')}/v1/chat/completions",
+            json={
+                "model": model,
+                "temperature": 0.9,
+                "top_p": 0.95,
+                "messages": _llm_messages(req, i),
+            },
+        )
         if resp.status_code >= 400:
             return None
         data = resp.json()
@@ -140,6 +147,120 @@ def _llm_generate(req: GenReq, i: int) -> Optional[str]:
     except Exception:
         return None
 
+_VARIANT_MARKER = re.compile(r"^\s*=+\s*VARIANT\s+\d+\s*=+\s*$", re.IGNORECASE | re.MULTILINE)
+
+def _llm_batch_messages(req: GenReq, mode: str) -> list[dict]:
+    msgs = _llm_messages(req, 0)
+    angles = [ANGLES[i % len(ANGLES)] for i in range(req.n_variants)]
+    if mode == "structured":
+        listing = "\n".join(f"{k + 1}. {a}" for k, a in enumerate(angles))
+        msgs[1]["content"] = (
+            f"Create {req.n_variants} distinct {req.type} posts about '{req.topic}', "
+            f"one per angle:\n{listing}\n"
+            f"Length of each: {req.length}. "
+            f"Start each post with a line '=== VARIANT N ===' (N = its number) and "
+            f"return nothing else. "
+            f"If type=carousel, provide 7 short slides prefixed 'Slide N:'. "
+            f"If type=poll, provide a question and 4 options."
+        )
+    else:
+        # "n": identical prompt, vLLM samples n completions off one shared prefill.
+        # One prompt cannot carry a per-index angle, so the model picks one per
+        # completion; use "structured" when variant i must follow ANGLES[i].
+        msgs[1]["content"] = (
+            f"Create a {req.type} about '{req.topic}'. Pick one of these angles and "
+            f"commit to it: {', '.join(angles)}. "
+            f"Length: {req.length}. Return only the content. "
+            f"If type=carousel, provide 7 short slides prefixed 'Slide N:'. "
+            f"If type=poll, provide a question and 4 options."
+        )
+    return msgs
+
+def _split_variants(text: str) -> List[str]:
+    parts = _VARIANT_MARKER.split(text)
+    # anything before the first marker is preamble, not a variant
+    return [p.strip() for p in parts[1:] if p.strip()]
+
+async def _llm_generate_batch(client: httpx.AsyncClient, req: GenReq, mode: str) -> List[str]:
+    """
+    Ask for all variants in one OpenAI-compatible call, either with `n=` (one
+    choice per variant) or with a structured multi-output prompt split on
+    '=== VARIANT N ===' markers. Lets vLLM share the prefill across variants.
+    Returns whatever variants came back (possibly fewer than requested, or none).
+    """
+    base = os.getenv("VLLM_BASE_URL")
+    if not base:
+        return []
+
+    model = os.getenv("VLLM_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct")
+    body = {
+        "model": model,
+        "temperature": 0.9,
+        "top_p": 0.95,
+        "messages": _llm_batch_messages(req, mode),
+    }
+    if mode == "n":
+        body["n"] = req.n_variants
+    try:
+        resp = await client.post(f"{base.rstrip('/')}/v1/chat/completions", json=body)
+        if resp.status_code >= 400:
+            return []
+        choices = resp.json().get("choices") or []
+        texts = [
+            (c.get("message") or {}).get("content", "").strip()
+            for c in choices
+        ]
+        if mode == "structured":
+            return _split_variants(texts[0]) if texts else []
+        return [t for t in texts if t]
+    except Exception:
+        return []
+
+async def _llm_stream(
+    client: httpx.AsyncClient, req: GenReq, i: int, out: "asyncio.Queue[tuple]"
+) -> Optional[str]:
+    """
+    Streaming flavour of `_llm_generate`: sends `stream=true` and forwards each
+    token delta to `out` as ("delta", i, text). Returns the full text, or None.
+    """
+    base = os.getenv("VLLM_BASE_URL")
+    if not base:
+        return None
+
+    model = os.getenv("VLLM_MODEL", "meta-llama/Meta-Llama-3.1-8B-Instruct")
+    parts: List[str] = []
+    try:
+        async with client.stream(
+            "POST",
+            f"{base.rstrip('/')}/v1/chat/completions",
+            json={
+                "model": model,
+                "temperature": 0.9,
+                "top_p": 0.95,
+                "stream": True,
+                "messages": _llm_messages(req, i),
+            },
+        ) as resp:
+            if resp.status_code >= 400:
+                return None
+            async for line in resp.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                payload = line[5:].strip()
+                if payload == "[DONE]":
+                    break
+                delta = (
+                    (json.loads(payload).get("choices") or [{}])[0]
+                    .get("delta", {})
+                    .get("content")
+                )
+                if delta:
+                    parts.append(delta)
+                    await out.put(("delta", i, delta))
+        return "".join(parts).strip() or None
+    except Exception:
+        return None
+
 # -------- Template-based generator (no model needed)
 
 def _gen_text(req: GenReq, r: random.Random, i: int) -> str:
@@ -223,39 +344,224 @@ def _gen_poll(req: GenReq, r: random.Random, i: int) -> str:
 
 # -------- Main orchestration
 
-def _template_generate(req: GenReq) -> List[str]:
+def _iter_templates(req: GenReq) -> Iterator[str]:
+    # variants share one rng, so they are produced in order
     r = _rng(req.topic + req.brand_voice + req.length)
-    out: List[str] = []
     for i in range(req.n_variants):
         if req.type == "text":
-            out.append(_gen_text(req, r, i))
+            yield _gen_text(req, r, i)
         elif req.type == "article":
-            out.append(_gen_article(req, r, i))
+            yield _gen_article(req, r, i)
         elif req.type == "carousel":
-            out.append(_gen_carousel(req, r, i))
+            yield _gen_carousel(req, r, i)
         elif req.type == "poll":
-            out.append(_gen_poll(req, r, i))
-    return out
+            yield _gen_poll(req, r, i)
+
+def _template_generate(req: GenReq) -> List[str]:
+    return list(_iter_templates(req))
+
+async def _fan_out(
+    client: httpx.AsyncClient, req: GenReq, slots: List[int], timeout: float
+) -> dict[int, str]:
+    """One completion per slot, concurrently (bounded by VLLM_MAX_CONCURRENCY)."""
+    sem = asyncio.Semaphore(max(1, get_settings().VLLM_MAX_CONCURRENCY))
+
+    async def _slot(i: int) -> Optional[str]:
+        async with sem:
+            return await _llm_generate(client, req, i)
 
-def _hybrid_generate(req: GenReq) -> List[str]:
+    tasks = {i: asyncio.create_task(_slot(i)) for i in slots}
+    done, pending = await asyncio.wait(tasks.values(), timeout=max(0.0, timeout))
+    for t in pending:
+        t.cancel()
+    return {
+        i: t.result()
+        for i, t in tasks.items()
+        if t in done and t.exception() is None and t.result()
+    }
+
+async def _hybrid_generate(req: GenReq, client: httpx.AsyncClient) -> tuple[List[str], bool]:
     """
-    Try OSS LLM for each variant; on failure, fall back to templates.
+    Get variants from the OSS LLM within an overall VLLM_DEADLINE_S budget:
+      1) batched: one call for all variants (VLLM_BATCH_MODE = n | structured),
+      2) single-request fallback: one call per still-missing slot, concurrently,
+      3) template variant for any slot that is still empty.
+    Returns (variants, complete) where `complete` is False if any slot fell back.
+    Latency tracks the slowest single completion rather than the sum of them.
     Set VLLM_BASE_URL (and optionally VLLM_MODEL) to enable.
     """
-    results: List[str] = []
-    for i in range(req.n_variants):
-        content = _llm_generate(req, i)
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.VLLM_DEADLINE_S
+
+    results: List[Optional[str]] = [None] * req.n_variants
+    mode = settings.VLLM_BATCH_MODE
+    if mode in ("n", "structured") and req.n_variants > 1:
+        try:
+            batch = await asyncio.wait_for(
+                _llm_generate_batch(client, req, mode), timeout=settings.VLLM_DEADLINE_S
+            )
+        except asyncio.TimeoutError:
+            batch = []
+        for i, content in enumerate(batch[: req.n_variants]):
+            results[i] = content
+
+    missing = [i for i, c in enumerate(results) if not c]
+    if missing:
+        got = await _fan_out(client, req, missing, deadline - loop.time())
+        for i, content in got.items():
+            results[i] = content
+
+    fallback: Optional[List[str]] = None
+    for i, content in enumerate(results):
         if not content:
             # fallback to template for this slot only
-            content = _template_generate(GenReq(**{**req.dict(), "n_variants": 1}))[0]
-        results.append(content)
-    return results
+            if fallback is None:
+                fallback = _template_generate(req)
+            results[i] = fallback[i]
+    return results, fallback is None  # type: ignore[return-value]
+
+# -------- Generation cache
+
+_CACHE: Optional[TieredCache[List[str]]] = None
+
+def _gen_cache() -> TieredCache[List[str]]:
+    global _CACHE
+    if _CACHE is None:
+        settings = get_settings()
+        _CACHE = TieredCache(
+            LRUCache(maxsize=settings.CONTENT_CACHE_SIZE, ttl=settings.CONTENT_CACHE_TTL_S),
+            DiskCache(settings.CONTENT_CACHE_DIR, ttl=settings.CONTENT_CACHE_TTL_S)
+            if settings.CONTENT_CACHE_DIR else None,
+            dumps=lambda v: json.dumps(v, ensure_ascii=False).encode("utf-8"),
+            loads=lambda b: json.loads(b.decode("utf-8")),
+        )
+    return _CACHE
+
+def _cache_key(req: GenReq) -> str:
+    # LLM and template outputs differ, so the backend is part of the key; so is
+    # the batch mode, since `n` does not pin one angle per variant index
+    if os.getenv("VLLM_BASE_URL"):
+        backend = f'{os.getenv("VLLM_MODEL", "llm")}/{get_settings().VLLM_BATCH_MODE}'
+    else:
+        backend = "template"
+    return stable_key(
+        "content/v1", backend, req.type, req.topic, req.brand_voice,
+        req.language, req.length, req.n_variants,
+    )
 
 @router.post("/generate", response_model=GenRes)
-def generate(req: GenReq):
+async def generate(
+    req: GenReq,
+    cache: bool = Query(True, description="Set false to bypass the cache (the fresh result is still stored)"),
+    client: httpx.AsyncClient = Depends(get_llm_client),
+):
+    key = _cache_key(req)
+    if cache:
+        hit = _gen_cache().get(key)
+        if hit is not None:
+            return {"variants": hit}
+
     # OSS LLM path if configured, else pure templates (still diverse)
     if os.getenv("VLLM_BASE_URL"):
-        variants = _hybrid_generate(req)
+        variants, complete = await _hybrid_generate(req, client)
     else:
-        variants = _template_generate(req)
+        variants, complete = _template_generate(req), True
+    if complete:
+        # don't pin template fallbacks from a flaky model server for a whole TTL
+        _gen_cache().set(key, variants)
     return {"variants": variants}
+
+@router.get("/cache/stats")
+def cache_stats():
+    return _gen_cache().stats()
+
+# -------- Streaming (Server-Sent Events)
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _stream_events(
+    req: GenReq, client: httpx.AsyncClient, use_cache: bool = True
+) -> AsyncIterator[str]:
+    """
+    Event protocol:
+      delta   {index, text}              token delta from the model (LLM path only)
+      variant {index, content, source}   final text for a slot; authoritative, replaces
+                                         any deltas seen for that index
+      done    {n_variants}
+    """
+    key = _cache_key(req)
+    hit = _gen_cache().get(key) if use_cache else None
+    if hit is not None:
+        for i, content in enumerate(hit):
+            yield _sse("variant", {"index": i, "content": content, "source": "cache"})
+        yield _sse("done", {"n_variants": req.n_variants})
+        return
+
+    if not os.getenv("VLLM_BASE_URL"):
+        variants: List[str] = []
+        for i, content in enumerate(_iter_templates(req)):
+            variants.append(content)
+            yield _sse("variant", {"index": i, "content": content, "source": "template"})
+        _gen_cache().set(key, variants)
+        yield _sse("done", {"n_variants": req.n_variants})
+        return
+
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.VLLM_DEADLINE_S
+    sem = asyncio.Semaphore(max(1, settings.VLLM_MAX_CONCURRENCY))
+    queue: asyncio.Queue[tuple] = asyncio.Queue()
+
+    async def _slot(i: int) -> None:
+        async with sem:
+            content = await _llm_stream(client, req, i, queue)
+        await queue.put(("variant", i, content))
+
+    tasks = [asyncio.create_task(_slot(i)) for i in range(req.n_variants)]
+    remaining = set(range(req.n_variants))
+    fallback: Optional[List[str]] = None
+    final: List[Optional[str]] = [None] * req.n_variants
+    try:
+        while remaining:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                kind, i, payload = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if kind == "delta":
+                yield _sse("delta", {"index": i, "text": payload})
+                continue
+            remaining.discard(i)
+            if payload:
+                final[i] = payload
+                yield _sse("variant", {"index": i, "content": payload, "source": "llm"})
+            else:
+                fallback = fallback or _template_generate(req)
+                yield _sse("variant", {"index": i, "content": fallback[i], "source": "template"})
+        # slots that missed the deadline fall back to templates
+        for i in sorted(remaining):
+            fallback = fallback or _template_generate(req)
+            yield _sse("variant", {"index": i, "content": fallback[i], "source": "template"})
+        if fallback is None:
+            _gen_cache().set(key, final)  # type: ignore[arg-type]
+        yield _sse("done", {"n_variants": req.n_variants})
+    finally:
+        for t in tasks:
+            t.cancel()
+
+@router.post("/generate/stream")
+async def generate_stream(
+    req: GenReq,
+    cache: bool = Query(True, description="Set false to bypass the cache (the fresh result is still stored)"),
+    client: httpx.AsyncClient = Depends(get_llm_client),
+):
+    """Same input as /generate, but streams each variant as soon as it is ready."""
+    return StreamingResponse(
+        _stream_events(req, client, use_cache=cache),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
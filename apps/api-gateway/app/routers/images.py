@@ -1,14 +1,22 @@
 from __future__ import annotations
-from fastapi import APIRouter, Query
+import asyncio
+import io
+import zipfile
+
+from fastapi import APIRouter, Header, HTTPException, Path, Query, Response
 from pydantic import BaseModel, Field
 from typing import List, Literal, Optional
 
-from app.agents.image_agent import generate_image
+from app.agents.image_agent import PosterSpec, build_spec, lookup_spec, render_cache, spec_key
+from app.agents.render_pool import binary_response, get_render_pool, image_response, render
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 Template = Literal["poster", "split", "quote", "stat"]
 Ratio = Literal["square", "portrait", "landscape"]
+Output = Literal["data_url", "binary", "url"]
+Format = Literal["png", "webp", "jpeg"]
+Profile = Literal["default", "preview"]
 
 class ImageReq(BaseModel):
     title: str = Field(..., examples=["AI + community building tips"])
@@ -18,15 +26,30 @@ class ImageReq(BaseModel):
     ratio: Ratio = "square"
     width: int = Field(default=1080, ge=640, le=2000)
     seed: Optional[int] = None
+    output: Output = Field(default="data_url", description="data_url (JSON) | binary (raw image) | url (GET /v1/images/{id})")
+    format: Format = "png"
+    quality: Optional[int] = Field(default=None, ge=1, le=100, description="webp/jpeg quality")
+    compress_level: Optional[int] = Field(default=None, ge=0, le=9, description="png zlib level")
+    profile: Profile = Field(default="default", description="preview = fast encode, bigger file (editor previews)")
 
 class ImageRes(BaseModel):
     width: int
     height: int
-    data_url: str
+    data_url: Optional[str] = None
+    url: Optional[str] = None
+
+class BatchReq(BaseModel):
+    items: List[ImageReq] = Field(..., min_length=1, max_length=20)
+    # per-item `output` is ignored in a batch
+    output: Literal["zip", "url", "data_url"] = Field(
+        default="zip", description="zip (one archive) | url (list of GET /v1/images/{id}) | data_url (list)"
+    )
+
+class BatchRes(BaseModel):
+    items: List[ImageRes]
 
-@router.post("/generate", response_model=ImageRes)
-def generate(req: ImageReq):
-    data_url = generate_image(
+def _spec_for(req: ImageReq) -> PosterSpec:
+    return build_spec(
         title=req.title,
         bullets=req.bullets,
         template=req.template,
@@ -34,13 +57,52 @@ def generate(req: ImageReq):
         ratio=req.ratio,
         width=req.width,
         seed=req.seed,
+        format=req.format,
+        quality=req.quality,
+        compress_level=req.compress_level,
+        profile=req.profile,
+    )
+
+@router.post("/generate", response_model=ImageRes, response_model_exclude_none=True)
+async def generate(req: ImageReq):
+    return await image_response(_spec_for(req), req.output)
+
+@router.post("/generate/batch", response_model=BatchRes, response_model_exclude_none=True)
+async def generate_batch(req: BatchReq):
+    """
+    Render a whole carousel in one call. Items render in parallel on the render
+    pool (whose workers keep backgrounds and fonts warm), and identical slides
+    are drawn once.
+    """
+    specs = [_spec_for(it) for it in req.items]
+    unique = {spec_key(s): s for s in specs}
+    # at most `workers` renders in flight per batch, so one carousel cannot take
+    # every admission slot (and 503 itself or a concurrent batch halfway through)
+    fanout = asyncio.Semaphore(get_render_pool().workers)
+
+    async def _one(s: PosterSpec):
+        async with fanout:
+            return await (render(s) if req.output == "zip" else image_response(s, req.output))
+
+    out = dict(zip(unique, await asyncio.gather(*(_one(s) for s in unique.values()))))
+    if req.output != "zip":
+        return {"items": [out[spec_key(s)] for s in specs]}
+
+    buf = io.BytesIO()
+    # images are already compressed; store them as-is
+    with zipfile.ZipFile(buf, "w", compression=zipfile.ZIP_STORED) as zf:
+        for i, s in enumerate(specs, start=1):
+            ext = "jpg" if s.format == "jpeg" else s.format
+            zf.writestr(f"{i:02d}-{s.template}.{ext}", out[spec_key(s)])
+    return Response(
+        content=buf.getvalue(),
+        media_type="application/zip",
+        headers={"Content-Disposition": "attachment; filename=images.zip"},
     )
-    h = req.width if req.ratio == "square" else (int(req.width * 1.25) if req.ratio == "portrait" else int(req.width * 0.56))
-    return {"width": req.width, "height": h, "data_url": data_url}
 
 # Handy GET for quick tests in browser: /v1/images/generate?title=Hello&template=quote
-@router.get("/generate", response_model=ImageRes)
-def generate_get(
+@router.get("/generate", response_model=ImageRes, response_model_exclude_none=True)
+async def generate_get(
     title: str = Query(...),
     bullets: Optional[str] = Query(None, description="Comma-separated"),
     template: Template = Query("poster"),
@@ -48,8 +110,54 @@ def generate_get(
     ratio: Ratio = Query("square"),
     width: int = Query(1080, ge=640, le=2000),
     seed: Optional[int] = Query(None),
+    output: Output = Query("data_url"),
+    format: Format = Query("png"),
+    profile: Profile = Query("default"),
 ):
     bl = [b.strip() for b in (bullets.split(",") if bullets else []) if b.strip()]
-    data_url = generate_image(title=title, bullets=bl, template=template, brand=brand, ratio=ratio, width=width, seed=seed)
-    h = width if ratio == "square" else (int(width * 1.25) if ratio == "portrait" else int(width * 0.56))
-    return {"width": width, "height": h, "data_url": data_url}
+    spec = build_spec(
+        title=title, bullets=bl, template=template, brand=brand, ratio=ratio, width=width, seed=seed,
+        format=format, profile=profile,
+    )
+    return await image_response(spec, output)
+
+@router.get("/cache/stats")
+async def cache_stats():
+    """Render cache (this process), renderer pool, and background caches of each render worker."""
+    pool = get_render_pool()
+    workers = pool.worker_stats()
+    return {
+        **render_cache().stats(),
+        "renderer": pool.stats(),
+        "workers_reporting": workers["reporting"],
+        "backgrounds": [{"pid": w["pid"], **w["backgrounds"]} for w in workers["workers"]],
+    }
+
+@router.get("/fonts")
+async def fonts():
+    """Font cache of each render worker (the fonts that matter are the ones renders use)."""
+    workers = get_render_pool().worker_stats()
+    return {
+        "workers_reporting": workers["reporting"],
+        "workers": [{"pid": w["pid"], **w["fonts"]} for w in workers["workers"]],
+    }
+
+# Keep last: the catch-all segment must not shadow the routes above.
+@router.get("/{image_id}", response_class=Response)
+async def get_image(
+    image_id: str = Path(..., pattern="^[0-9a-f]{64}$"),
+    if_none_match: Optional[str] = Header(None),
+):
+    """Serve a render handed out by `output=url`, by its content hash."""
+    if if_none_match and f'"{image_id}"' in if_none_match:
+        return Response(
+            status_code=304,
+            headers={"ETag": f'"{image_id}"', "Cache-Control": "public, max-age=31536000, immutable"},
+        )
+    img_bytes = render_cache().get(image_id)
+    if img_bytes is None:
+        spec = await asyncio.to_thread(lookup_spec, image_id)  # storage read; may block on SQLite
+        if spec is None:
+            raise HTTPException(404, "Unknown image id")
+        img_bytes = await render(spec)
+    return binary_response(img_bytes, image_id)
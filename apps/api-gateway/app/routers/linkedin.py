@@ -1,16 +1,34 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from pydantic import BaseModel
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional
+from datetime import datetime, timezone
 from uuid import uuid4
 
 from app.auth.jwt import get_current_user, JWTPayload
+from app.publishing import PublishError, Publisher, get_dispatcher, get_publisher
+from app.storage import SCHEDULED_POSTS, Repository, decode_cursor, encode_cursor, get_repository
 
 router = APIRouter(prefix="/linkedin", tags=["linkedin"])
 
-# In-memory scheduled posts for prototype
-_SCHEDULED: Dict[str, Dict] = {}
+
+def _store() -> Repository:
+    return get_repository(SCHEDULED_POSTS)
+
+
+def _to_utc_iso(s: str) -> str:
+    """
+    Normalise an ISO timestamp to UTC 'YYYY-MM-DDTHH:MM:SSZ' (naive = UTC) so
+    stored values sort chronologically as strings.
+    """
+    try:
+        dt = datetime.fromisoformat(s.strip())
+    except ValueError:
+        raise HTTPException(422, f"Invalid timestamp: {s}. Use ISO 8601, e.g. 2025-01-31T09:00:00Z.")
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
 class ScheduleReq(BaseModel):
@@ -27,30 +45,82 @@ class PublishReq(BaseModel):
 @router.post("/schedule")
 def schedule_post(req: ScheduleReq, user: JWTPayload = Depends(get_current_user)):
     pid = str(uuid4())
-    _SCHEDULED[pid] = {
+    doc = _store().put({
         "id": pid,
         "user": user.sub,
-        "scheduled_at": req.scheduled_at,
+        "scheduled_at": _to_utc_iso(req.scheduled_at),
         "text": req.text,
         "media_urls": req.media_urls or [],
         "status": "scheduled",
-    }
+        "idempotency_key": uuid4().hex,  # the dispatcher's retries publish at most once
+        "attempts": 0,
+    })
+    dispatcher = get_dispatcher()
+    if dispatcher is not None:
+        dispatcher.notify(doc)
     return {"ok": True, "scheduled_id": pid}
 
 
 @router.get("/scheduled")
-def list_scheduled(user: JWTPayload = Depends(get_current_user)):
-    items = [v for v in _SCHEDULED.values() if v["user"] == user.sub]
-    return {"ok": True, "items": items}
+def list_scheduled(
+    user: JWTPayload = Depends(get_current_user),
+    start: Optional[str] = Query(None, alias="from", description="ISO timestamp (inclusive)"),
+    end: Optional[str] = Query(None, alias="to", description="ISO timestamp (exclusive)"),
+    status: Optional[Literal["scheduled", "published", "failed"]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000, description="Page size; omit for every match"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+):
+    """The caller's posts ordered by scheduled_at (served from the per-user index)."""
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(422, "Invalid cursor")
+    items = _store().find(
+        user=user.sub,
+        status=status,
+        start=_to_utc_iso(start) if start else None,
+        end=_to_utc_iso(end) if end else None,
+        after=after,
+        limit=limit,
+    )
+    next_cursor = None
+    if limit is not None and len(items) == limit:
+        next_cursor = encode_cursor(SCHEDULED_POSTS, items[-1])
+    return {"ok": True, "items": items, "next_cursor": next_cursor}
+
+
+@router.get("/scheduled/next")
+def next_due(user: JWTPayload = Depends(get_current_user)):
+    """The caller's earliest still-scheduled post (overdue ones first), or null."""
+    items = _store().find(user=user.sub, status="scheduled", limit=1)
+    return {"ok": True, "item": items[0] if items else None}
 
 
 @router.post("/publish")
-def publish_now(req: PublishReq, user: JWTPayload = Depends(get_current_user)):
-    # Prototype: pretend publish succeeded and return a fake post id
-    post_id = f"li_{uuid4().hex[:8]}"
+async def publish_now(
+    req: PublishReq,
+    user: JWTPayload = Depends(get_current_user),
+    publisher: Publisher = Depends(get_publisher),
+    idempotency_key: Optional[str] = Header(None, description="Repeat a request safely: same key, same post"),
+):
+    # Prototype: LocalPublisher pretends publish succeeded and returns a fake post id
+    post = {"user": user.sub, "text": req.text, "media_urls": req.media_urls or []}
+    try:
+        post_id = await publisher.publish(post, f"{user.sub}:{idempotency_key or uuid4().hex}")
+    except PublishError as e:
+        raise HTTPException(502, f"Publish failed: {e}")
     return {"ok": True, "post_id": post_id, "status": "published"}
 
 
+@router.get("/dispatcher/stats")
+def dispatcher_stats():
+    """Scheduled-post dispatcher: pending/in-flight posts and outcome counters."""
+    dispatcher = get_dispatcher()
+    return dispatcher.stats() if dispatcher is not None else {"running": False}
+
+
 @router.get("/metrics")
 def get_metrics(user: JWTPayload = Depends(get_current_user)):
     # Prototype stub metrics
@@ -1,16 +1,20 @@
 from __future__ import annotations
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
-from passlib.hash import bcrypt
 
-from app.auth.jwt import create_jwt, get_current_user, JWTPayload
+from app.auth.jwt import create_jwt, get_current_user, token_cache_stats, JWTPayload
+from app.auth.passwords import PasswordHasher, get_password_hasher
 from app.config import get_settings, Settings
+from app.storage import USERS, Repository, get_repository
 
 router = APIRouter(prefix="/users", tags=["users"])
 
-# In-memory user store for prototype
-_USERS: dict[str, str] = {}  # email -> bcrypt hash
+
+def _store() -> Repository:
+    # {"id": email, "password_hash": bcrypt or argon2id hash}
+    return get_repository(USERS)
 
 
 class SignupReq(BaseModel):
@@ -29,19 +33,36 @@ class TokenRes(BaseModel):
 
 
 @router.post("/signup", response_model=TokenRes)
-def signup(req: SignupReq, settings: Settings = Depends(get_settings)):
-    if req.email in _USERS:
+async def signup(
+    req: SignupReq,
+    settings: Settings = Depends(get_settings),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+):
+    # storage calls can block (pooled SQLite connections, write locks): keep them off the loop
+    if await run_in_threadpool(_store().get, req.email) is not None:
+        raise HTTPException(status_code=400, detail="User already exists")
+    hashed = await hasher.hash(req.password)
+    if not await run_in_threadpool(_store().add, {"id": req.email, "password_hash": hashed}):  # lost a race while hashing
         raise HTTPException(status_code=400, detail="User already exists")
-    _USERS[req.email] = bcrypt.hash(req.password)
     token = create_jwt(sub=req.email, role="user", ttl_minutes=120, settings=settings)
     return TokenRes(access_token=token)
 
 
 @router.post("/login", response_model=TokenRes)
-def login(req: LoginReq, settings: Settings = Depends(get_settings)):
-    hashed = _USERS.get(req.email)
-    if not hashed or not bcrypt.verify(req.password, hashed):
+async def login(
+    req: LoginReq,
+    settings: Settings = Depends(get_settings),
+    hasher: PasswordHasher = Depends(get_password_hasher),
+):
+    user = await run_in_threadpool(_store().get, req.email)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    ok, new_hash = await hasher.verify(req.password, user["password_hash"])
+    if not ok:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        # scheme/cost changed since signup
+        await run_in_threadpool(_store().update, req.email, lambda u: {**u, "password_hash": new_hash})
     token = create_jwt(sub=req.email, role="user", ttl_minutes=120, settings=settings)
     return TokenRes(access_token=token)
 
@@ -49,3 +70,15 @@ def login(req: LoginReq, settings: Settings = Depends(get_settings)):
 @router.get("/me")
 def me(user: JWTPayload = Depends(get_current_user)):
     return {"email": user.sub, "role": user.role}
+
+
+@router.get("/hash/stats")
+def hash_stats(hasher: PasswordHasher = Depends(get_password_hasher)):
+    """Password hasher queue depth and counters."""
+    return hasher.stats()
+
+
+@router.get("/token-cache/stats")
+def token_stats():
+    """Verified-token cache counters (hits/misses/evictions/rejected/invalidations)."""
+    return token_cache_stats()
@@ -0,0 +1,104 @@
+"""
+Repository layer for the gateway's state (calendar, scheduled posts,
+experiments, users, specs behind image URLs).
+
+STORAGE_BACKEND selects the implementation:
+  - memory: per-process dicts (prototype default; single worker only),
+  - sqlite: one WAL-mode database file (STORAGE_SQLITE_PATH) with pooled
+    connections, shareable by several uvicorn workers.
+
+Routers ask for a collection with `get_repository(CALENDAR)` etc.; the
+lifespan opens the store on startup and closes it on shutdown.
+"""
+from __future__ import annotations
+
+from typing import Dict, Optional
+import threading
+
+from app.config import get_settings
+from .base import Collection, Doc, Repository, decode_cursor, encode_cursor
+from .memory import MemoryRepository
+from .sqlite import SQLitePool, SQLiteRepository
+
+__all__ = [
+    "Collection",
+    "Doc",
+    "Repository",
+    "MemoryRepository",
+    "SQLiteRepository",
+    "encode_cursor",
+    "decode_cursor",
+    "CALENDAR",
+    "SCHEDULED_POSTS",
+    "EXPERIMENTS",
+    "USERS",
+    "IMAGE_SPECS",
+    "get_repository",
+    "start_storage",
+    "close_storage",
+]
+
+CALENDAR = Collection("calendar", user_field="user", date_field="date", status_field="status")
+SCHEDULED_POSTS = Collection("scheduled_posts", user_field="user", date_field="scheduled_at", status_field="status")
+EXPERIMENTS = Collection("experiments", status_field="status")
+USERS = Collection("users")
+IMAGE_SPECS = Collection("image_specs")  # content hash -> PosterSpec fields
+
+
+class Store:
+    def __init__(self, backend: str = "memory", sqlite_path: str = "", pool_size: int = 4) -> None:
+        if backend not in ("memory", "sqlite"):
+            raise ValueError(f"STORAGE_BACKEND must be memory or sqlite, got {backend!r}")
+        self.backend = backend
+        self._pool = SQLitePool(sqlite_path, size=pool_size) if backend == "sqlite" else None
+        self._repos: Dict[str, Repository] = {}
+        self._lock = threading.Lock()
+
+    def repository(self, collection: Collection) -> Repository:
+        repo = self._repos.get(collection.name)
+        if repo is None:
+            with self._lock:
+                repo = self._repos.get(collection.name)
+                if repo is None:
+                    if self._pool is not None:
+                        repo = SQLiteRepository(collection, self._pool)
+                    else:
+                        repo = MemoryRepository(collection)
+                    self._repos[collection.name] = repo
+        return repo
+
+    def close(self) -> None:
+        for repo in self._repos.values():
+            repo.close()
+        if self._pool is not None:
+            self._pool.close()
+
+
+_STORE: Optional[Store] = None
+_STORE_LOCK = threading.Lock()
+
+
+def start_storage() -> Store:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            s = get_settings()
+            _STORE = Store(
+                backend=s.STORAGE_BACKEND,
+                sqlite_path=s.STORAGE_SQLITE_PATH,
+                pool_size=s.STORAGE_POOL_SIZE,
+            )
+        return _STORE
+
+
+def get_repository(collection: Collection) -> Repository:
+    """Repository for `collection` (opens the store on first use if the lifespan did not)."""
+    return (_STORE or start_storage()).repository(collection)
+
+
+def close_storage() -> None:
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is not None:
+            _STORE.close()
+            _STORE = None
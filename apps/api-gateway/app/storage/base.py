@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import base64
+import json
+
+Doc = Dict[str, Any]
+
+
+@dataclass(frozen=True)
+class Collection:
+    """
+    A named set of JSON documents keyed by their "id" field.
+
+    The *_field names say which document fields are indexed: documents are
+    filtered by user/status and ordered by (date, id). Date values are compared
+    as strings, so store ISO dates/timestamps there.
+    """
+
+    name: str
+    user_field: Optional[str] = None
+    date_field: Optional[str] = None
+    status_field: Optional[str] = None
+
+    def index_values(self, doc: Doc) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        def _get(field: Optional[str]) -> Optional[str]:
+            if field is None or doc.get(field) is None:
+                return None
+            return str(doc[field])
+
+        return _get(self.user_field), _get(self.date_field), _get(self.status_field)
+
+
+class Repository(ABC):
+    """
+    Storage for one Collection. Implementations must be safe to call from
+    several threads (sync routes run in FastAPI's threadpool) and return copies,
+    so callers may mutate what they get back.
+    """
+
+    def __init__(self, collection: Collection) -> None:
+        self.collection = collection
+
+    @abstractmethod
+    def get(self, doc_id: str) -> Optional[Doc]:
+        ...
+
+    @abstractmethod
+    def put(self, doc: Doc) -> Doc:
+        """Insert or replace `doc` (keyed by doc["id"])."""
+
+    @abstractmethod
+    def add(self, doc: Doc) -> bool:
+        """Insert `doc` only if its id is new; False if it already exists."""
+
+    @abstractmethod
+    def update(self, doc_id: str, fn: Callable[[Doc], Optional[Doc]]) -> Optional[Doc]:
+        """
+        Atomically read-modify-write one document. `fn` gets a copy and returns
+        the new document (or None to leave it unchanged); its "id" is always
+        reset to `doc_id`. Returns the stored document, or None if `doc_id`
+        does not exist.
+        """
+
+    @abstractmethod
+    def delete(self, doc_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def find(
+        self,
+        *,
+        user: Optional[str] = None,
+        status: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Doc]:
+        """
+        Documents ordered by (date, id), optionally filtered by user/status and
+        the half-open date range [start, end). `after` is a (date, id) cursor:
+        only documents strictly after it are returned.
+        """
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    def close(self) -> None:
+        pass
+
+
+def encode_cursor(collection: Collection, doc: Doc) -> str:
+    """Opaque page cursor pointing just past `doc` in find() order."""
+    key = [collection.index_values(doc)[1] or "", doc["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, doc_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(date, str) or not isinstance(doc_id, str):
+        raise ValueError("invalid cursor")
+    return date, doc_id
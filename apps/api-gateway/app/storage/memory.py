@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from copy import deepcopy
+from typing import Callable, Dict, List, Optional, Tuple
+import threading
+
+from .base import Collection, Doc, Repository
+
+
+Key = Tuple[str, str]  # (date, id): the order find() returns documents in
+Slot = Tuple[Optional[str], Optional[str]]  # (user, status); None = any
+Entry = Tuple[Optional[str], Optional[str], Key]  # (user, status, key)
+
+
+class MemoryRepository(Repository):
+    """
+    Process-local store (the prototype default); lost on restart, not shared
+    between workers. Documents live in an id map plus (date, id)-sorted key
+    lists -- one overall and one per user, per status and per (user, status) --
+    so a filtered date range or cursor is found by bisection in the list that
+    already holds only matching documents.
+    """
+
+    def __init__(self, collection: Collection) -> None:
+        super().__init__(collection)
+        self._docs: Dict[str, Doc] = {}
+        self._index: Dict[Slot, List[Key]] = {(None, None): []}
+        self._entries: Dict[str, Entry] = {}
+        self._lock = threading.RLock()
+
+    def _entry(self, doc: Doc) -> Entry:
+        user, date, status = self.collection.index_values(doc)
+        return user, status, (date or "", doc["id"])
+
+    @staticmethod
+    def _slots(user: Optional[str], status: Optional[str]) -> List[Slot]:
+        slots: List[Slot] = [(None, None)]
+        if user is not None:
+            slots.append((user, None))
+        if status is not None:
+            slots.append((None, status))
+        if user is not None and status is not None:
+            slots.append((user, status))
+        return slots
+
+    def _store(self, doc: Doc) -> None:
+        doc_id = doc["id"]
+        entry = self._entry(doc)
+        old = self._entries.get(doc_id)
+        if old != entry:
+            if old is not None:
+                self._unindex(old)
+            user, status, key = entry
+            for slot in self._slots(user, status):
+                insort(self._index.setdefault(slot, []), key)
+            self._entries[doc_id] = entry
+        self._docs[doc_id] = deepcopy(doc)
+
+    def _unindex(self, entry: Entry) -> None:
+        user, status, key = entry
+        for slot in self._slots(user, status):
+            order = self._index[slot]
+            i = bisect_left(order, key)
+            if i < len(order) and order[i] == key:
+                del order[i]
+            if not order and slot != (None, None):
+                del self._index[slot]
+
+    def get(self, doc_id: str) -> Optional[Doc]:
+        with self._lock:
+            doc = self._docs.get(doc_id)
+            return deepcopy(doc) if doc is not None else None
+
+    def put(self, doc: Doc) -> Doc:
+        with self._lock:
+            self._store(doc)
+        return doc
+
+    def add(self, doc: Doc) -> bool:
+        with self._lock:
+            if doc["id"] in self._docs:
+                return False
+            self._store(doc)
+            return True
+
+    def update(self, doc_id: str, fn: Callable[[Doc], Optional[Doc]]) -> Optional[Doc]:
+        with self._lock:
+            current = self._docs.get(doc_id)
+            if current is None:
+                return None
+            new = fn(deepcopy(current))
+            if new is None:
+                return deepcopy(current)
+            new["id"] = doc_id  # the id is the key: fn must not move the document
+            self._store(new)
+            return new
+
+    def delete(self, doc_id: str) -> bool:
+        with self._lock:
+            if self._docs.pop(doc_id, None) is None:
+                return False
+            self._unindex(self._entries.pop(doc_id))
+            return True
+
+    def find(
+        self,
+        *,
+        user: Optional[str] = None,
+        status: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Doc]:
+        with self._lock:
+            order = self._index.get((user, status), [])
+            lo = bisect_left(order, (start, "")) if start is not None else 0
+            if after is not None:
+                lo = max(lo, bisect_right(order, after))
+            hi = bisect_left(order, (end, "")) if end is not None else len(order)
+            if limit is not None:
+                hi = min(hi, lo + limit)
+            return [deepcopy(self._docs[key[1]]) for key in order[lo:hi]]
+
+    def count(self) -> int:
+        return len(self._docs)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional, Tuple
+import json
+import os
+import queue
+import sqlite3
+import threading
+
+from .base import Collection, Doc, Repository
+
+
+class SQLitePool:
+    """
+    Fixed-size pool of connections to one database file in WAL mode, so readers
+    never block the writer and several uvicorn workers can share the file.
+    """
+
+    def __init__(self, path: str, size: int = 4, busy_timeout_ms: int = 5000) -> None:
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.size = max(1, size)
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        for _ in range(self.size):
+            conn = sqlite3.connect(
+                path,
+                timeout=busy_timeout_ms / 1000,
+                isolation_level=None,  # autocommit; transactions are explicit
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; safe with WAL
+            conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+            self._all.append(conn)
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        # IMMEDIATE takes the write lock up front: no upgrade deadlocks between workers
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def close(self) -> None:
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
+
+
+class SQLiteRepository(Repository):
+    """
+    One table per collection: the JSON document plus indexed user/date/status
+    columns (by user+date, user+status+date, date, status+date).
+    """
+
+    _schema_lock = threading.Lock()
+
+    def __init__(self, collection: Collection, pool: SQLitePool) -> None:
+        super().__init__(collection)
+        self.pool = pool
+        self.table = collection.name
+        with self._schema_lock, pool.transaction() as conn:
+            t = self.table
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {t} ("
+                " id TEXT PRIMARY KEY,"
+                " user TEXT,"
+                " date TEXT NOT NULL DEFAULT '',"
+                " status TEXT,"
+                " doc TEXT NOT NULL)"
+            )
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_user_date ON {t} (user, date, id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_user_status_date ON {t} (user, status, date, id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_date ON {t} (date, id)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_status_date ON {t} (status, date, id)")
+
+    def _row(self, doc: Doc) -> Tuple[str, Optional[str], str, Optional[str], str]:
+        user, date, status = self.collection.index_values(doc)
+        return doc["id"], user, date or "", status, json.dumps(doc, separators=(",", ":"))
+
+    def get(self, doc_id: str) -> Optional[Doc]:
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (doc_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, doc: Doc) -> Doc:
+        with self.pool.connection() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (id, user, date, status, doc) VALUES (?, ?, ?, ?, ?)",
+                self._row(doc),
+            )
+        return doc
+
+    def add(self, doc: Doc) -> bool:
+        with self.pool.connection() as conn:
+            cur = conn.execute(
+                f"INSERT OR IGNORE INTO {self.table} (id, user, date, status, doc) VALUES (?, ?, ?, ?, ?)",
+                self._row(doc),
+            )
+        return cur.rowcount == 1
+
+    def update(self, doc_id: str, fn: Callable[[Doc], Optional[Doc]]) -> Optional[Doc]:
+        with self.pool.transaction() as conn:
+            row = conn.execute(f"SELECT doc FROM {self.table} WHERE id = ?", (doc_id,)).fetchone()
+            if row is None:
+                return None
+            current = json.loads(row[0])
+            new = fn(json.loads(row[0]))
+            if new is None:
+                return current
+            new["id"] = doc_id  # keep the primary key and the stored doc in step
+            conn.execute(
+                f"UPDATE {self.table} SET user = ?, date = ?, status = ?, doc = ? WHERE id = ?",
+                self._row(new)[1:] + (doc_id,),
+            )
+            return new
+
+    def delete(self, doc_id: str) -> bool:
+        with self.pool.connection() as conn:
+            cur = conn.execute(f"DELETE FROM {self.table} WHERE id = ?", (doc_id,))
+        return cur.rowcount > 0
+
+    def find(
+        self,
+        *,
+        user: Optional[str] = None,
+        status: Optional[str] = None,
+        start: Optional[str] = None,
+        end: Optional[str] = None,
+        after: Optional[Tuple[str, str]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Doc]:
+        where, args = [], []  # type: ignore[var-annotated]
+        if user is not None:
+            where.append("user = ?")
+            args.append(user)
+        if status is not None:
+            where.append("status = ?")
+            args.append(status)
+        if start is not None:
+            where.append("date >= ?")
+            args.append(start)
+        if end is not None:
+            where.append("date < ?")
+            args.append(end)
+        if after is not None:
+            where.append("(date, id) > (?, ?)")
+            args.extend(after)
+        sql = f"SELECT doc FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY date, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, args).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
@@ -0,0 +1,43 @@
+"""
+Shared fixtures. The environment is pinned before `app` is imported so the
+suite does not depend on a local .env, a model server or spare CPUs:
+thread render backend, memory storage, no YAML experiments, cheap bcrypt.
+"""
+from __future__ import annotations
+
+import os
+
+os.environ["ENV_FILE"] = os.devnull
+os.environ.pop("VLLM_BASE_URL", None)
+os.environ.update(
+    IMAGE_RENDER_BACKEND="thread",
+    IMAGE_PREWARM_WIDTHS="",
+    STORAGE_BACKEND="memory",
+    AB_CONFIG_DIR="",
+    PASSWORD_BCRYPT_ROUNDS="4",
+    JWT_SECRET="test-secret",
+)
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import get_settings
+from app.main import app
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def settings():
+    """The live Settings; use `monkeypatch.setattr(settings, NAME, value)` to override."""
+    return get_settings()
+
+
+@pytest.fixture
+def client():
+    # the lifespan opens (and on exit drops) the memory store, pools and background tasks
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+from collections import Counter
+import threading
+
+import pytest
+
+from app.experiments import (
+    CounterFlusher,
+    ShardedCounters,
+    apply_deltas,
+    compile_assigner,
+    get_counters,
+    hash64,
+)
+from app.storage import EXPERIMENTS, get_repository
+
+USERS = [f"user-{i}" for i in range(20000)]
+
+
+def test_assignment_is_deterministic_and_salted_per_experiment():
+    a = compile_assigner("exp-a", {"A": 1, "B": 1})
+    again = compile_assigner("exp-a", {"A": 1, "B": 1})
+    other = compile_assigner("exp-b", {"A": 1, "B": 1})
+    assert [a.assign(u) for u in USERS[:500]] == [again.assign(u) for u in USERS[:500]]
+    assert [a.assign(u) for u in USERS[:500]] != [other.assign(u) for u in USERS[:500]]
+    assert hash64(b"salt", "u") == hash64(b"salt", "u") != hash64(b"other", "u")
+
+
+def test_weighted_split_matches_weights():
+    assigner = compile_assigner("split", {"A": 1, "B": 2, "C": 7})
+    counts = Counter(assigner.assign(u) for u in USERS)
+    for arm, share in {"A": 0.1, "B": 0.2, "C": 0.7}.items():
+        assert counts[arm] / len(USERS) == pytest.approx(share, abs=0.015)
+
+
+def test_exposure_and_zero_weight_arms():
+    assigner = compile_assigner("exposure", {"A": 1, "B": 1, "off": 0}, exposure_percent=30)
+    counts = Counter(assigner.assign(u) for u in USERS)
+    assert counts[None] / len(USERS) == pytest.approx(0.7, abs=0.015)
+    assert counts["off"] == 0
+    assert "off" in assigner.arms
+    # raising exposure keeps everyone already exposed in the same arm
+    wider = compile_assigner("exposure", {"A": 1, "B": 1, "off": 0}, exposure_percent=60)
+    assert all(wider.assign(u) == v for u, v in ((u, assigner.assign(u)) for u in USERS[:2000]) if v)
+    with pytest.raises(ValueError):
+        compile_assigner("dead", {"A": 0, "B": 0})
+
+
+def test_sharded_counters_drain_across_threads():
+    counters = ShardedCounters(shards=4)
+
+    def bump():
+        for _ in range(1000):
+            counters.add("e", "views", "A")
+        counters.add_many({"e": {"clicks": {"B": 5}}})
+
+    threads = [threading.Thread(target=bump) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counters.pending("e") == {"views": {"A": 8000}, "clicks": {"B": 40}}
+    assert counters.drain() == {"e": {"views": {"A": 8000}, "clicks": {"B": 40}}}
+    assert counters.drain() == {}
+
+
+def test_failed_flush_keeps_the_deltas():
+    counters = ShardedCounters()
+    stored = {}
+    fail = [True]
+
+    def write(exp_id, metrics):
+        if fail[0]:
+            raise OSError("disk full")
+        stored[exp_id] = metrics
+
+    flusher = CounterFlusher(counters, write)
+    counters.add("e", "views", "A", 3)
+    assert flusher.flush() == 0 and flusher.errors == 1
+    fail[0] = False
+    assert flusher.flush() == 1
+    assert stored == {"e": {"views": {"A": 3}}}
+
+
+def test_assign_endpoint_buffers_views_and_flushes(client):
+    exp = client.post(
+        "/v1/abtests", json={"name": "assign", "goal": "ctr", "variants": {"A": "x", "B": "y"}, "weights": {"A": 3, "B": 1}}
+    ).json()
+    assert client.get(f"/v1/abtests/{exp['id']}/assign", params={"user_id": "u"}).status_code == 400  # not running
+    client.post(f"/v1/abtests/{exp['id']}/start")
+    seen = Counter(
+        client.get(f"/v1/abtests/{exp['id']}/assign", params={"user_id": f"u{i}"}).json()["variant"] for i in range(400)
+    )
+    assert seen["A"] > seen["B"] > 0
+    def assign_u7():
+        return client.get(f"/v1/abtests/{exp['id']}/assign", params={"user_id": "u7"}).json()["variant"]
+
+    again = assign_u7()
+    assert assign_u7() == again
+    seen[again] += 2
+    # counted in memory first and visible right away, then written in one update per experiment
+    assert client.get(f"/v1/abtests/{exp['id']}").json()["metrics"]["views"] == dict(seen)
+    deltas = get_counters().drain()
+    for exp_id, metrics in deltas.items():
+        apply_deltas(exp_id, metrics)
+    assert sum(get_repository(EXPERIMENTS).get(exp["id"])["metrics"]["views"].values()) == 402
+    assert client.get("/v1/abtests/missing/assign").status_code == 404
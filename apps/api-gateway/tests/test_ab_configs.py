@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+from app import experiments
+from app.experiments import ConfigRegistry, parse_config
+
+CONFIGS = Path(__file__).resolve().parents[3] / "ab_experiments" / "configs"
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    for path in CONFIGS.glob("*.yaml"):
+        shutil.copy(path, tmp_path / path.name)
+    return tmp_path
+
+
+def rewrite(path, old, new):
+    path.write_text(path.read_text().replace(old, new))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # coarse-mtime filesystems
+
+
+def test_shipped_configs_parse(config_dir):
+    registry = ConfigRegistry(str(config_dir))
+    assert registry.reload() is True
+    cfgs = registry.table.configs
+    assert sorted(cfgs) == ["exp_headline_variants_v1", "exp_image_style_v1"]
+    headline = cfgs["exp_headline_variants_v1"]
+    assert headline.status == "created" and headline.goal_metric == "ctr"
+    assert headline.secondary_metrics == ("saves", "comments") and headline.allocation == "fixed"
+    assert headline.assignment_method == "hash"
+    style = cfgs["exp_image_style_v1"]
+    assert style.secondary_metrics == ("saves", "comments")  # goal dropped from `metrics`
+    assert set(style.weights) == {"minimal", "gradient"}
+    assert not registry.table.assigners["exp_image_style_v1"].running
+    assert registry.errors == {}
+
+
+def test_parse_config_validation():
+    base = {"id": "x", "goal_metric": "ctr", "variants": {"A": {}, "B": {"weight": 3}}}
+    assert dict(parse_config(base, "x.yaml").weights) == {"A": 1.0, "B": 3.0}
+    for broken in (
+        {**base, "id": None},
+        {**base, "variants": {"A": {}}},
+        {**base, "variants": {"A": {"weight": -1}, "B": {}}},
+        {**base, "status": "paused"},
+        {**base, "goal_metric": ""},
+        {**base, "allocation": "greedy"},
+        {**base, "assignment": {"method": "deterministic_sha256_mod2"}},
+        ["not", "a", "mapping"],
+    ):
+        with pytest.raises(ValueError):
+            parse_config(broken, "x.yaml")
+
+
+def test_reload_swaps_only_on_change(config_dir):
+    changes = []
+    registry = ConfigRegistry(str(config_dir), on_change=changes.append)
+    registry.reload()
+    before = registry.table
+    assert registry.reload() is False and registry.table is before
+    rewrite(config_dir / "headline_variants.yaml", "status: draft", "status: running")
+    assert registry.reload() is True
+    assert registry.table.configs["exp_headline_variants_v1"].status == "running"
+    assert registry.table.assigners["exp_headline_variants_v1"].running
+    # the untouched file's parsed config is reused
+    assert registry.table.configs["exp_image_style_v1"] is before.configs["exp_image_style_v1"]
+    assert before.configs["exp_headline_variants_v1"].status == "created"  # old table never mutated
+    assert changes == [before, registry.table]
+
+
+def test_broken_file_keeps_previous_version(config_dir):
+    registry = ConfigRegistry(str(config_dir))
+    registry.reload()
+    path = config_dir / "headline_variants.yaml"
+    rewrite(path, "goal_metric: ctr", "goal_metric: [unclosed")
+    assert registry.reload() is True
+    assert registry.table.configs["exp_headline_variants_v1"].goal_metric == "ctr"
+    assert "headline_variants.yaml" in registry.stats()["errors"]
+    rewrite(path, "goal_metric: [unclosed", "goal_metric: saves")
+    registry.reload()
+    assert registry.table.configs["exp_headline_variants_v1"].goal_metric == "saves"
+    assert registry.errors == {}
+
+
+def test_duplicate_ids_and_removed_files(config_dir):
+    shutil.copy(config_dir / "image_style.yaml", config_dir / "zz_copy.yaml")
+    registry = ConfigRegistry(str(config_dir))
+    registry.reload()
+    assert "duplicate experiment id" in registry.errors["zz_copy.yaml"]
+    assert registry.table.configs["exp_image_style_v1"].source == "image_style.yaml"
+    (config_dir / "image_style.yaml").unlink()
+    (config_dir / "zz_copy.yaml").unlink()
+    registry.reload()
+    assert sorted(registry.table.configs) == ["exp_headline_variants_v1"]
+
+
+@pytest.mark.anyio
+async def test_watcher_picks_up_edits(config_dir):
+    registry = ConfigRegistry(str(config_dir), poll_s=0.02)
+    registry.reload()
+    registry.start()
+    try:
+        rewrite(config_dir / "image_style.yaml", "status: draft", "status: stopped")
+        for _ in range(200):
+            if registry.table.configs["exp_image_style_v1"].status == "stopped":
+                break
+            await asyncio.sleep(0.01)
+        assert registry.table.configs["exp_image_style_v1"].status == "stopped"
+    finally:
+        await registry.stop()
+
+
+def test_config_experiments_through_the_api(client, config_dir, monkeypatch):
+    rewrite(config_dir / "headline_variants.yaml", "status: draft", "status: running")
+    registry = ConfigRegistry(str(config_dir), on_change=experiments._sync_configs)
+    monkeypatch.setattr(experiments, "_REGISTRY", registry)
+    registry.reload()
+    exp = client.get("/v1/abtests/exp_headline_variants_v1").json()
+    assert exp["status"] == "running" and exp["source"] == "headline_variants.yaml"
+    assert client.get("/v1/abtests/exp_headline_variants_v1/assign", params={"user_id": "u"}).json()["variant"] in ("A", "B")
+    assert client.post("/v1/abtests/exp_headline_variants_v1/stop").status_code == 409
+    assert client.get("/v1/abtests/configs/stats").json()["experiments"] == sorted(registry.table.configs)
+
+    # stopping it in the file keeps its counters and flips the API view
+    client.post("/v1/abtests/exp_headline_variants_v1/click", params={"variant": "A"})
+    rewrite(config_dir / "headline_variants.yaml", "status: running", "status: stopped")
+    registry.reload()
+    exp = client.get("/v1/abtests/exp_headline_variants_v1").json()
+    assert exp["status"] == "stopped" and exp["metrics"]["clicks"]["A"] == 1
+    assert client.get("/v1/abtests/exp_headline_variants_v1/assign").status_code == 400
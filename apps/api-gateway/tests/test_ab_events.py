@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+from uuid import uuid4
+
+import pytest
+
+from app.experiments import EventDeduper, aggregate_events, parse_events
+from app.routers import abtests
+
+
+def new_exp(client, **extra):
+    body = {"name": "events", "goal": "ctr", "a": "x", "b": "y", **extra}
+    return client.post("/v1/abtests", json=body).json()["id"]
+
+
+def rows(exp_id, n, event="click", variant="A", prefix=None):
+    prefix = prefix or uuid4().hex
+    return [{"exp_id": exp_id, "variant": variant, "event": event, "event_id": f"{prefix}-{i}"} for i in range(n)]
+
+
+def post(client, events, ndjson=False):
+    body = "\n".join(json.dumps(e) for e in events) if ndjson else json.dumps(events)
+    return client.post("/v1/abtests/events:batch", content=body)
+
+
+def views(client, exp_id):
+    return client.get(f"/v1/abtests/{exp_id}").json()["metrics"]
+
+
+def test_parse_and_aggregate():
+    body = b'{"exp_id":"e","variant":"A","event":"impression","event_id":"1"}\n\n{"exp_id":"e","variant":"A","event":"save","event_id":"1"}\n{"variant":"A"}'
+    parsed, errors = parse_events(body)
+    assert len(parsed) == 2 and errors[0]["row"] == 2
+    deltas, dupes, keys = aggregate_events(parsed, EventDeduper())
+    assert deltas == {"e": {"views": {"A": 1}}} and dupes == 1 and keys == {"e": ["1"]}
+    with pytest.raises(ValueError):
+        parse_events(b"not json")
+    # without an event_id, identical (user, ts) rows are one event; without either they all count
+    anon = [{"exp_id": "e", "variant": "A", "event": "click"}] * 2
+    timed = [{"exp_id": "e", "variant": "A", "event": "click", "user_id": "u", "ts": 1}] * 2
+    assert aggregate_events(parse_events(json.dumps(anon + timed).encode())[0])[0] == {"e": {"clicks": {"A": 3}}}
+
+
+def test_json_and_ndjson_batches_count_once(client):
+    exp_id = new_exp(client)
+    batch = rows(exp_id, 5) + rows(exp_id, 3, event="view", variant="B")
+    r = post(client, batch + batch[:2]).json()
+    assert (r["accepted"], r["duplicates"], r["rejected"], r["experiments"]) == (8, 2, 0, 1)
+    again = post(client, batch, ndjson=True).json()  # redelivered
+    assert again["accepted"] == 0 and again["duplicates"] == 8
+    metrics = views(client, exp_id)
+    assert metrics["clicks"]["A"] == 5 and metrics["views"]["B"] == 3
+
+
+def test_unknown_experiment_and_variant_are_rejected(client):
+    exp_id = new_exp(client)
+    batch = rows(exp_id, 1) + rows("nope", 1) + rows(exp_id, 1, variant="Z") + [{"exp_id": exp_id}]
+    r = post(client, batch).json()
+    assert r["accepted"] == 1 and r["rejected"] == 3
+    assert {e.get("error") for e in r["errors"]} >= {"Unknown experiment: nope", "Unknown variant: Z"}
+    assert client.post("/v1/abtests/events:batch", content=b"{oops").status_code == 400
+
+
+def test_batch_size_limit(client, settings, monkeypatch):
+    monkeypatch.setattr(settings, "AB_EVENT_BATCH_MAX", 3)
+    assert post(client, rows(new_exp(client), 4)).status_code == 413
+
+
+def test_failed_write_is_not_deduplicated_on_retry(client, monkeypatch):
+    first, second = new_exp(client), new_exp(client)
+    batch = rows(first, 2) + rows(second, 3)
+    real = abtests.apply_deltas
+
+    def flaky(exp_id, deltas):
+        if exp_id == second:
+            raise OSError("database is locked")
+        return real(exp_id, deltas)
+
+    monkeypatch.setattr(abtests, "apply_deltas", flaky)
+    r = post(client, batch)
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+    monkeypatch.setattr(abtests, "apply_deltas", real)
+    retry = post(client, batch).json()
+    assert retry["accepted"] == 3 and retry["duplicates"] == 2  # only the rows already stored are duplicates
+    assert views(client, first)["clicks"]["A"] == 2
+    assert views(client, second)["clicks"]["A"] == 3
+
+
+def test_experiment_deleted_before_write_counts_every_row_rejected(client, monkeypatch):
+    exp_id = new_exp(client)
+    real = abtests.apply_deltas
+    monkeypatch.setattr(abtests, "apply_deltas", lambda e, d: False if e == exp_id else real(e, d))
+    batch = rows(exp_id, 4) + rows(exp_id, 1, variant="Z")
+    r = post(client, batch).json()
+    assert (r["accepted"], r["duplicates"], r["rejected"]) == (0, 0, 5)
+    assert r["accepted"] + r["duplicates"] + r["rejected"] == len(batch)
+    assert {"exp_id": exp_id, "rows": 4, "error": f"Unknown experiment: {exp_id}"} in r["errors"]
+    monkeypatch.setattr(abtests, "apply_deltas", real)
+    assert post(client, batch).json()["accepted"] == 4  # the lost rows were not remembered as seen
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+import math
+from uuid import uuid4
+
+import pytest
+
+from app.experiments import experiment_results, srm_check
+from app.experiments.stats import ArmCounts, _z_for, chi2_sf, metric_counters, normal_cdf
+
+
+@pytest.mark.parametrize("x", [0.01, 0.5, 1.0, 3.841459, 10.0, 30.0])
+def test_chi2_sf_one_dof_matches_closed_form(x):
+    assert chi2_sf(x, 1) == pytest.approx(math.erfc(math.sqrt(x / 2)), rel=1e-9)
+
+
+def test_chi2_sf_known_values():
+    assert chi2_sf(2.0, 2) == pytest.approx(math.exp(-1), rel=1e-9)
+    assert chi2_sf(5.991465, 2) == pytest.approx(0.05, rel=1e-5)
+    assert chi2_sf(7.814728, 3) == pytest.approx(0.05, rel=1e-5)
+    assert chi2_sf(0.0, 4) == 1.0
+
+
+def test_normal_quantiles_and_wilson():
+    assert normal_cdf(1.959963984540054) == pytest.approx(0.975)
+    assert _z_for(0.10) == pytest.approx(1.644854, rel=1e-5)
+    lo, hi = ArmCounts(8, 10).wilson()
+    assert (lo, hi) == (pytest.approx(0.4902, abs=1e-4), pytest.approx(0.9433, abs=1e-4))
+    assert ArmCounts(0, 0).wilson() == (0.0, 1.0)
+    assert metric_counters("CTR") == ("clicks", "views")
+    assert metric_counters("saves") == ("saves", "views")
+
+
+def test_srm_flags_a_broken_split():
+    assert not srm_check({"A": 5030, "B": 4970}, {"A": 1, "B": 1})["mismatch"]
+    broken = srm_check({"A": 5300, "B": 4700}, {"A": 1, "B": 1})
+    assert broken["mismatch"] and broken["p_value"] < 1e-6
+    weighted = srm_check({"A": 2500, "B": 7500}, {"A": 1, "B": 3, "off": 0})
+    assert not weighted["mismatch"] and weighted["expected"] == {"A": 2500.0, "B": 7500.0}
+    assert srm_check({}, {"A": 1, "B": 1})["p_value"] == 1.0
+
+
+def test_experiment_results_lift_and_sequential_p():
+    counters = {"views": {"A": 10000, "B": 10000}, "clicks": {"A": 500, "B": 650}, "saves": {"A": 40, "B": 40}}
+    out = experiment_results(counters, ["A", "B"], ["ctr", "saves"], weights={"A": 1, "B": 1})
+    b = out["metrics"]["ctr"]["arms"]["B"]
+    assert b["rate"] == 0.065
+    assert b["abs_lift"] == pytest.approx(0.015)
+    assert b["rel_lift"] == pytest.approx(0.3)
+    assert b["abs_lift_ci"][0] > 0 and b["p_value_sequential"] < 0.01 and b["prob_beats_control"] > 0.99
+    same = out["metrics"]["saves"]["arms"]["B"]
+    assert same["abs_lift"] == 0 and same["p_value_sequential"] == 1.0
+    assert "abs_lift" not in out["metrics"]["ctr"]["arms"]["A"]
+    assert out["srm"]["mismatch"] is False
+    flipped = experiment_results(counters, ["A", "B"], ["ctr"], control="B")
+    assert flipped["metrics"]["ctr"]["arms"]["A"]["abs_lift"] == pytest.approx(-0.015)
+    assert flipped["srm"] is None
+
+
+def test_results_endpoint(client):
+    exp = client.post(
+        "/v1/abtests",
+        json={"name": "results", "goal": "CTR", "variants": {"A": "x", "B": "y", "C": "z"}, "secondary_metrics": ["saves"]},
+    ).json()
+    events = [
+        {"exp_id": exp["id"], "variant": v, "event": e, "event_id": uuid4().hex}
+        for v, n_views, n_clicks in (("A", 100, 10), ("B", 100, 20), ("C", 100, 5))
+        for e in ["view"] * n_views + ["click"] * n_clicks
+    ]
+    client.post("/v1/abtests/events:batch", content=json.dumps(events))
+    out = client.get(f"/v1/abtests/{exp['id']}/results").json()
+    assert out["goal_metric"] == "ctr" and list(out["metrics"]) == ["ctr", "saves"]
+    assert out["control"] == "A" and out["views"] == {"A": 100, "B": 100, "C": 100}
+    assert out["metrics"]["ctr"]["arms"]["B"]["rate"] == 0.2
+    assert out["srm"]["mismatch"] is False
+    assert out["allocation"] == {"mode": "fixed", "weights": None}
+    narrow = client.get(f"/v1/abtests/{exp['id']}/results", params={"alpha": 0.2}).json()
+    wide_ci, narrow_ci = out["metrics"]["ctr"]["arms"]["B"]["ci"], narrow["metrics"]["ctr"]["arms"]["B"]["ci"]
+    assert narrow_ci[1] - narrow_ci[0] < wide_ci[1] - wide_ci[0]
+    assert client.get(f"/v1/abtests/{exp['id']}/results", params={"control": "C"}).json()["control"] == "C"
+    assert client.get(f"/v1/abtests/{exp['id']}/results", params={"control": "Z"}).status_code == 422
+    assert client.get("/v1/abtests/missing/results").status_code == 404
+
+
+def test_clicks_without_views_do_not_break_results(client):
+    assert ArmCounts(5, 2) == ArmCounts(2, 2)
+    assert ArmCounts(3, 0).wilson() == (0.0, 1.0)
+    exp = client.post("/v1/abtests", json={"name": "click-only", "goal": "ctr", "a": "x", "b": "y"}).json()
+    client.post(f"/v1/abtests/{exp['id']}/start")
+    for _ in range(3):
+        client.post(f"/v1/abtests/{exp['id']}/click", params={"variant": "B"})
+    events = [{"exp_id": exp["id"], "variant": "A", "event": "click", "event_id": uuid4().hex} for _ in range(2)]
+    events.append({"exp_id": exp["id"], "variant": "A", "event": "view", "event_id": uuid4().hex})
+    client.post("/v1/abtests/events:batch", content=json.dumps(events))
+    r = client.get(f"/v1/abtests/{exp['id']}/results")
+    assert r.status_code == 200
+    arms = r.json()["metrics"]["ctr"]["arms"]
+    assert arms["A"]["rate"] == 1.0 and arms["B"]["rate"] == 0.0
+    assert all(0.0 <= x <= 1.0 for arm in arms.values() for x in arm["ci"])
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from app.agents.image_agent import BRANDS, RATIOS, background_stats, gradient_background, prewarm_backgrounds
+
+
+def test_background_is_built_once_and_copied():
+    start, end, _ = BRANDS["emerald"]
+    a = gradient_background(320, 240, start, end)
+    hits = background_stats()["hits"]
+    b = gradient_background(320, 240, start, end)
+    assert background_stats()["hits"] == hits + 1
+    assert a is not b and a.tobytes() == b.tobytes()
+    a.putpixel((0, 0), (255, 0, 0))  # callers draw on their copy...
+    assert gradient_background(320, 240, start, end).getpixel((0, 0)) != (255, 0, 0)  # ...not the cached one
+
+
+def test_prewarm_covers_every_brand_and_ratio():
+    assert prewarm_backgrounds([200]) == len(BRANDS) * len(RATIOS)
+    misses = background_stats()["misses"]
+    start, end, _ = BRANDS["amber"]
+    gradient_background(200, 200, start, end)
+    assert background_stats()["misses"] == misses
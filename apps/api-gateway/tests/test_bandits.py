@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from collections import Counter
+import json
+from uuid import uuid4
+
+import pytest
+
+from app.experiments import BanditReweigher, bandit_weights, build_alias, compile_assigner, get_bandits
+from app.experiments.bandit import thompson_weights, ucb_weights
+
+USERS = [f"user-{i}" for i in range(20000)]
+
+
+def test_alias_table_draws_match_weights():
+    weights = {"A": 0.5, "B": 0.3, "C": 0.15, "D": 0.05}
+    prob, alias = build_alias(list(weights.values()))
+    assert len(prob) == len(alias) == 4
+    assigner = compile_assigner("alias", weights, alias=True)
+    counts = Counter(assigner.assign(u) for u in USERS)
+    for arm, share in weights.items():
+        assert counts[arm] / len(USERS) == pytest.approx(share, abs=0.015)
+    zero = compile_assigner("alias-zero", {"A": 1, "B": 0}, alias=True)
+    assert {zero.assign(u) for u in USERS[:2000]} == {"A"}
+
+
+def test_thompson_favours_the_better_arm_and_keeps_a_floor():
+    w = thompson_weights({"A": 50, "B": 80}, {"A": 1000, "B": 1000}, ["A", "B"], min_share=0.1, seed=1)
+    assert sum(w.values()) == pytest.approx(1.0)
+    assert w["B"] > 0.85 and w["A"] == pytest.approx(0.1, abs=0.01)
+    assert thompson_weights({}, {}, ["A", "B"], seed=1) == thompson_weights({}, {}, ["A", "B"], seed=1)
+    even = thompson_weights({}, {}, ["A", "B", "C"], seed=2)
+    assert all(v == pytest.approx(1 / 3, abs=0.05) for v in even.values())
+
+
+def test_ucb_plays_unseen_arms_first():
+    w = ucb_weights({"A": 10}, {"A": 100}, ["A", "B"], min_share=0.05)
+    assert w["B"] == pytest.approx(0.95) and w["A"] == pytest.approx(0.05)
+    w = ucb_weights({"A": 10, "B": 30}, {"A": 1000, "B": 1000}, ["A", "B"], min_share=0.05)
+    assert w["B"] > w["A"]
+
+
+def test_bandit_weights_are_a_pure_function_of_counters():
+    doc = {"id": "bw", "allocation": "thompson", "variants": {"A": "", "B": ""}, "goal_metric": "ctr",
+           "metrics": {"views": {"A": 500, "B": 500}, "clicks": {"A": 20, "B": 40}}}
+    assert bandit_weights(doc) == bandit_weights(dict(doc))  # same on every worker
+    assert bandit_weights({**doc, "allocation": "fixed"}) is None
+    assert bandit_weights({**doc, "allocation": "ucb"})["B"] > 0.5
+
+
+def test_reweigher_builds_alias_assigners_for_bandits_only():
+    docs = [
+        {"id": "t", "allocation": "thompson", "variants": {"A": "", "B": ""}, "goal_metric": "ctr",
+         "metrics": {"views": {"A": 1000, "B": 1000}, "clicks": {"A": 10, "B": 90}}},
+        {"id": "f", "allocation": "fixed", "variants": {"A": "", "B": ""}},
+        {"id": "bad", "allocation": "ucb", "exposure_percent": "lots"},  # logged and skipped
+    ]
+    reweigher = BanditReweigher(lambda: docs, min_share=0.05)
+    reweigher.recompute()
+    assert set(reweigher.assigners) == {"t"}
+    assert reweigher.assigners["t"].alias
+    assert reweigher.weights["t"]["B"] > 0.9
+    assert reweigher.stats()["recomputes"] == 1
+
+
+def test_bandit_experiment_end_to_end(client):
+    exp = client.post(
+        "/v1/abtests", json={"name": "bandit", "goal": "ctr", "a": "x", "b": "y", "allocation": "thompson"}
+    ).json()
+    client.post(f"/v1/abtests/{exp['id']}/start")
+    assert get_bandits().weights[exp["id"]] == pytest.approx({"A": 0.5, "B": 0.5}, abs=0.05)
+    events = [
+        {"exp_id": exp["id"], "variant": v, "event": e, "event_id": uuid4().hex}
+        for v, clicks in (("A", 10), ("B", 60))
+        for e in ["view"] * 500 + ["click"] * clicks
+    ]
+    client.post("/v1/abtests/events:batch", content=json.dumps(events))
+    get_bandits().recompute()  # the lifespan task does this every AB_BANDIT_INTERVAL_S
+
+    seen = Counter(
+        client.get(f"/v1/abtests/{exp['id']}/assign", params={"user_id": f"u{i}"}).json()["variant"] for i in range(1000)
+    )
+    assert seen["B"] > 800 and seen["A"] > 0  # floor keeps A alive
+    out = client.get(f"/v1/abtests/{exp['id']}/results").json()
+    assert out["allocation"]["mode"] == "thompson" and out["allocation"]["weights"]["B"] > 0.9
+    assert out["srm"] is None  # the split moves on purpose
+    assert exp["id"] in client.get("/v1/abtests/bandits/stats").json()["weights"]
+
+    client.post(f"/v1/abtests/{exp['id']}/stop")
+    get_bandits().recompute()
+    assert exp["id"] not in get_bandits().weights
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import time
+
+from app.cache import DiskCache, LRUCache, TieredCache, stable_key
+
+
+def test_stable_key_ignores_dict_order():
+    assert stable_key("x", {"a": 1, "b": 2}) == stable_key("x", {"b": 2, "a": 1})
+    assert stable_key("x", 1) != stable_key("x", "1")
+
+
+def test_lru_evicts_least_recently_used():
+    c: LRUCache[int] = LRUCache(maxsize=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # a is now the most recent
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+
+def test_lru_ttl_global_and_per_entry():
+    c: LRUCache[str] = LRUCache(maxsize=10, ttl=0.05)
+    c.set("short", "x")
+    c.set("long", "y", ttl=60)
+    time.sleep(0.08)
+    assert c.get("short") is None
+    assert c.get("long") == "y"
+
+
+def test_lru_byte_budget():
+    c: LRUCache[bytes] = LRUCache(maxsize=100, max_bytes=10)
+    c.set("a", b"12345")
+    c.set("b", b"12345")
+    c.set("c", b"1")
+    assert c.get("a") is None  # evicted to stay within 10 bytes
+    assert c.stats()["bytes"] == 6
+    c.set("huge", b"x" * 11)  # larger than the whole budget: not cached
+    assert c.get("huge") is None and c.get("b") == b"12345"
+
+
+def test_disabled_cache_stores_nothing():
+    c: LRUCache[int] = LRUCache(maxsize=0)
+    c.set("a", 1)
+    assert c.get("a") is None
+
+
+def test_disk_cache_roundtrip_and_ttl(tmp_path):
+    d = DiskCache(str(tmp_path), ttl=60)
+    key = stable_key("k")
+    d.set(key, b"payload")
+    assert DiskCache(str(tmp_path)).get(key) == b"payload"  # survives a new instance
+    expired = DiskCache(str(tmp_path), ttl=0)
+    assert expired.get(key) is None
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    dumps = lambda v: v.encode()
+    loads = lambda b: b.decode()
+    first = TieredCache(LRUCache(maxsize=10), DiskCache(str(tmp_path)), dumps=dumps, loads=loads)
+    first.set("k", "value")
+    # a fresh process: empty memory tier, same directory
+    second = TieredCache(LRUCache(maxsize=10), DiskCache(str(tmp_path)), dumps=dumps, loads=loads)
+    assert second.get("k") == "value"
+    assert second.memory.get("k") == "value"  # promoted
+    assert second.stats()["disk"]["hits"] == 1
+
+
+def test_content_generate_is_cached(client):
+    body = {"type": "article", "topic": "cache tiers", "n_variants": 2}
+    before = client.get("/v1/content/cache/stats").json()["memory"]["hits"]
+    first = client.post("/v1/content/generate", json=body).json()
+    assert client.post("/v1/content/generate", json=body).json() == first
+    assert client.get("/v1/content/cache/stats").json()["memory"]["hits"] == before + 1
+    # cache=false recomputes (and stores) rather than reading
+    client.post("/v1/content/generate", params={"cache": "false"}, json=body)
+    assert client.get("/v1/content/cache/stats").json()["memory"]["hits"] == before + 1
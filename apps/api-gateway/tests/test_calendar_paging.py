@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+
+def seed(client, days=10, per_day=3):
+    start = date(2025, 5, 1)
+    for d in range(days):
+        for k in range(per_day):
+            day = (start + timedelta(days=d)).isoformat()
+            client.post("/v1/calendar", params={"date": day, "title": f"Post {d}-{k}"})
+
+
+def test_range_is_inclusive_and_accepts_other_formats(client):
+    seed(client, days=5, per_day=1)
+    items = client.get("/v1/calendar", params={"from": "2025-05-02", "to": "04/05/2025"}).json()
+    assert [it["date"] for it in items] == ["2025-05-02", "2025-05-03", "2025-05-04"]
+    assert client.get("/v1/calendar", params={"from": "May 2"}).status_code == 422
+
+
+def test_cursor_pages_cover_everything_once(client):
+    seed(client)
+    everything = client.get("/v1/calendar").json()
+    assert len(everything) == 30
+    assert [it["date"] for it in everything] == sorted(it["date"] for it in everything)
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        r = client.get("/v1/calendar", params=params)
+        seen += r.json()
+        pages += 1
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert pages == 5
+    assert [it["id"] for it in seen] == [it["id"] for it in everything]
+
+
+def test_paging_composes_with_filters_and_edits(client):
+    seed(client, days=4, per_day=2)
+    first = client.get("/v1/calendar", params={"from": "2025-05-02", "to": "2025-05-03", "limit": 2})
+    page = first.json()
+    assert len(page) == 2 and first.headers["X-Next-Cursor"]
+    # an item edited onto an earlier page after the cursor was issued is not repeated
+    client.put(f"/v1/calendar/{page[1]['id']}", json={**page[1], "status": "scheduled"})
+    rest = client.get(
+        "/v1/calendar", params={"from": "2025-05-02", "to": "2025-05-03", "limit": 2, "cursor": first.headers["X-Next-Cursor"]}
+    )
+    assert [it["date"] for it in rest.json()] == ["2025-05-03", "2025-05-03"]
+    assert {it["id"] for it in rest.json()}.isdisjoint(it["id"] for it in page)
+    scheduled = client.get("/v1/calendar", params={"status": "scheduled"}).json()
+    assert [it["id"] for it in scheduled] == [page[1]["id"]]
+
+
+def test_last_partial_page_has_no_cursor(client):
+    seed(client, days=1, per_day=3)
+    r = client.get("/v1/calendar", params={"limit": 5})
+    assert len(r.json()) == 3
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_bad_cursor_is_rejected(client):
+    assert client.get("/v1/calendar", params={"cursor": "!!not-a-cursor"}).status_code == 422
+    assert client.get("/v1/calendar", params={"limit": 0}).status_code == 422
+
+
+def test_cursor_header_is_readable_cross_origin(client):
+    seed(client, days=1, per_day=2)
+    r = client.get("/v1/calendar", params={"limit": 1}, headers={"Origin": "https://app.example.com"})
+    assert r.headers["X-Next-Cursor"]
+    assert "x-next-cursor" in r.headers["Access-Control-Expose-Headers"].lower()
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import json
+
+import httpx
+import pytest
+
+from app.routers.content import GenReq, _cache_key, _hybrid_generate, _split_variants
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def llm(monkeypatch, settings):
+    monkeypatch.setenv("VLLM_BASE_URL", "http://vllm.test")
+    monkeypatch.setattr(settings, "VLLM_DEADLINE_S", 5.0)
+    return settings
+
+
+async def test_n_mode_is_one_request_with_n_choices(llm, monkeypatch):
+    monkeypatch.setattr(llm, "VLLM_BATCH_MODE", "n")
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"v{k}"}} for k in range(body["n"])]})
+
+    req = GenReq(type="text", topic="RAG", n_variants=3)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        variants, complete = await _hybrid_generate(req, client)
+    assert complete
+    assert variants == ["v0", "v1", "v2"]
+    assert len(bodies) == 1 and bodies[0]["n"] == 3
+
+
+async def test_structured_mode_splits_one_reply(llm, monkeypatch):
+    monkeypatch.setattr(llm, "VLLM_BATCH_MODE", "structured")
+    reply = "Sure!\n=== VARIANT 1 ===\nfirst\n=== VARIANT 2 ===\nsecond\n"
+
+    def handler(request):
+        assert "n" not in json.loads(request.content)
+        return httpx.Response(200, json={"choices": [{"message": {"content": reply}}]})
+
+    req = GenReq(type="text", topic="RAG", n_variants=2)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        variants, complete = await _hybrid_generate(req, client)
+    assert complete
+    assert variants == ["first", "second"]
+
+
+async def test_short_batch_is_topped_up_per_slot(llm, monkeypatch):
+    monkeypatch.setattr(llm, "VLLM_BATCH_MODE", "n")
+    calls = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        calls.append(body.get("n"))
+        if body.get("n"):
+            return httpx.Response(200, json={"choices": [{"message": {"content": "batched"}}]})
+        return httpx.Response(200, json={"choices": [{"message": {"content": "single"}}]})
+
+    req = GenReq(type="text", topic="RAG", n_variants=3)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        variants, complete = await _hybrid_generate(req, client)
+    assert complete
+    assert variants == ["batched", "single", "single"]
+    assert calls == [3, None, None]
+
+
+def test_split_variants_drops_preamble():
+    assert _split_variants("intro\n=== VARIANT 1 ===\na\n===VARIANT 2===\nb") == ["a", "b"]
+
+
+def test_cache_key_depends_on_batch_mode(monkeypatch, settings):
+    req = GenReq(type="text", topic="RAG", n_variants=2)
+    monkeypatch.setenv("VLLM_BASE_URL", "http://vllm.test")
+    keys = set()
+    for mode in ("off", "n", "structured"):
+        monkeypatch.setattr(settings, "VLLM_BATCH_MODE", mode)
+        keys.add(_cache_key(req))
+    assert len(keys) == 3
+    monkeypatch.delenv("VLLM_BASE_URL")
+    assert _cache_key(req) not in keys  # templates never share LLM entries
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.routers.content import ANGLES, GenReq, _hybrid_generate, _template_generate
+
+pytestmark = pytest.mark.anyio
+
+
+def _angle(request: httpx.Request) -> str:
+    prompt = json.loads(request.content)["messages"][1]["content"]
+    return next(a for a in ANGLES if f"angle '{a}'" in prompt)
+
+
+def _reply(text: str) -> httpx.Response:
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+@pytest.fixture
+def llm(monkeypatch, settings):
+    monkeypatch.setenv("VLLM_BASE_URL", "http://vllm.test")
+    monkeypatch.setattr(settings, "VLLM_BATCH_MODE", "off")
+    monkeypatch.setattr(settings, "VLLM_MAX_CONCURRENCY", 4)
+    monkeypatch.setattr(settings, "VLLM_DEADLINE_S", 5.0)
+    return settings
+
+
+async def test_variants_are_requested_concurrently(llm):
+    async def handler(request):
+        await asyncio.sleep(0.2)
+        return _reply(f"llm {_angle(request)}")
+
+    req = GenReq(type="text", topic="RAG", n_variants=4)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        started = time.monotonic()
+        variants, complete = await _hybrid_generate(req, client)
+    assert time.monotonic() - started < 0.6  # not 4 x 0.2s
+    assert complete
+    assert variants == [f"llm {a}" for a in ANGLES[:4]]
+
+
+async def test_in_flight_completions_are_bounded(llm, monkeypatch):
+    monkeypatch.setattr(llm, "VLLM_MAX_CONCURRENCY", 2)
+    inflight = peak = 0
+
+    async def handler(request):
+        nonlocal inflight, peak
+        inflight += 1
+        peak = max(peak, inflight)
+        await asyncio.sleep(0.05)
+        inflight -= 1
+        return _reply("ok")
+
+    req = GenReq(type="text", topic="RAG", n_variants=6)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        variants, _ = await _hybrid_generate(req, client)
+    assert len(variants) == 6
+    assert peak == 2
+
+
+async def test_failed_slot_falls_back_to_its_template(llm):
+    async def handler(request):
+        if _angle(request) == ANGLES[1]:
+            return httpx.Response(500)
+        return _reply("from llm")
+
+    req = GenReq(type="text", topic="RAG", n_variants=3)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        variants, complete = await _hybrid_generate(req, client)
+    assert not complete
+    assert variants[0] == variants[2] == "from llm"
+    assert variants[1] == _template_generate(req)[1]
+
+
+async def test_slots_past_the_deadline_fall_back(llm, monkeypatch):
+    monkeypatch.setattr(llm, "VLLM_DEADLINE_S", 0.3)
+
+    async def handler(request):
+        if _angle(request) == ANGLES[0]:
+            await asyncio.sleep(5)
+        return _reply("fast")
+
+    req = GenReq(type="text", topic="RAG", n_variants=2)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        started = time.monotonic()
+        variants, complete = await _hybrid_generate(req, client)
+    assert time.monotonic() - started < 1.0
+    assert not complete
+    assert variants == [_template_generate(req)[0], "fast"]
+
+
+def test_template_path_without_model_server(client):
+    r = client.post("/v1/content/generate", json={"type": "poll", "topic": "RAG", "n_variants": 3})
+    assert r.status_code == 200
+    assert len(r.json()["variants"]) == 3
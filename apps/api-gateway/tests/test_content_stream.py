@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from typing import List, Tuple
+
+import httpx
+import pytest
+
+from app.routers.content import GenReq, _stream_events, _template_generate
+
+
+def _parse(text: str) -> List[Tuple[str, dict]]:
+    events = []
+    for block in text.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_template_stream_then_cache(client):
+    body = {"type": "text", "topic": "streaming tests", "n_variants": 2}
+    r = client.post("/v1/content/generate/stream", json=body)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    events = _parse(r.text)
+    assert [e for e, _ in events] == ["variant", "variant", "done"]
+    assert {d["source"] for _, d in events[:2]} == {"template"}
+
+    again = _parse(client.post("/v1/content/generate/stream", json=body).text)
+    assert [d["source"] for _, d in again[:2]] == ["cache", "cache"]
+    assert [d["content"] for _, d in again[:2]] == [d["content"] for _, d in events[:2]]
+
+
+@pytest.mark.anyio
+async def test_llm_stream_forwards_deltas_and_falls_back_per_slot(monkeypatch, settings):
+    monkeypatch.setenv("VLLM_BASE_URL", "http://vllm.test")
+    monkeypatch.setattr(settings, "VLLM_DEADLINE_S", 5.0)
+
+    def handler(request):
+        prompt = json.loads(request.content)["messages"][1]["content"]
+        if "how-to" in prompt:  # slot 1 fails
+            return httpx.Response(503)
+        chunks = [{"choices": [{"delta": {"content": t}}]} for t in ("Hel", "lo")]
+        sse = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=sse, headers={"content-type": "text/event-stream"})
+
+    req = GenReq(type="text", topic="stream fallback", n_variants=2)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        text = "".join([chunk async for chunk in _stream_events(req, client, use_cache=False)])
+    events = _parse(text)
+    deltas = "".join(d["text"] for e, d in events if e == "delta" and d["index"] == 0)
+    finals = {d["index"]: d for e, d in events if e == "variant"}
+    assert deltas == "Hello"
+    assert finals[0] == {"index": 0, "content": "Hello", "source": "llm"}
+    assert finals[1]["source"] == "template"
+    assert finals[1]["content"] == _template_generate(req)[1]
+    assert events[-1] == ("done", {"n_variants": 2})
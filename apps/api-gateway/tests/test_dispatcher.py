@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+import pytest
+
+from app.auth.jwt import create_jwt
+from app.publishing import Dispatcher, LocalPublisher, PublishError, _iso
+from app.storage import SCHEDULED_POSTS, MemoryRepository
+
+pytestmark = pytest.mark.anyio
+
+
+class RecordingPublisher:
+    """Fails the first `failures` calls per post, then succeeds; records every call."""
+
+    def __init__(self, failures: int = 0, delay: float = 0.0) -> None:
+        self.failures = failures
+        self.delay = delay
+        self.calls = []
+        self.inflight = self.peak = 0
+
+    async def publish(self, post, idempotency_key):
+        self.calls.append((post["id"], idempotency_key))
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        try:
+            await asyncio.sleep(self.delay)
+            if sum(1 for pid, _ in self.calls if pid == post["id"]) <= self.failures:
+                raise PublishError("upstream 500")
+            return f"li_{post['id']}"
+        finally:
+            self.inflight -= 1
+
+
+def due_posts(repo, n, at=None, **extra):
+    at = at or _iso(time.time() - 1)
+    for i in range(n):
+        repo.put({"id": f"p{i:03d}", "user": "u", "scheduled_at": at, "status": "scheduled",
+                  "idempotency_key": f"key-{i}", "attempts": 0, **extra})
+
+
+def dispatcher(publisher, repo, **kw):
+    kw = {"retry_base_s": 0.01, "retry_max_s": 0.02, "refill_s": 60.0, **kw}
+    return Dispatcher(publisher, repo, **kw)
+
+
+async def wait_for(pred, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not pred():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+async def test_due_posts_publish_once_with_capped_concurrency():
+    repo = MemoryRepository(SCHEDULED_POSTS)
+    due_posts(repo, 40)
+    pub = RecordingPublisher(delay=0.01)
+    d = dispatcher(pub, repo, max_concurrency=4)
+    d.start()
+    try:
+        await wait_for(lambda: d.published == 40)
+    finally:
+        await d.stop()
+    assert pub.peak == 4
+    assert len(pub.calls) == 40
+    docs = repo.find()
+    assert {doc["status"] for doc in docs} == {"published"}
+    assert docs[0]["post_id"] == "li_p000" and docs[0]["attempts"] == 1 and docs[0]["lease_token"] is None
+
+
+async def test_failures_retry_with_the_same_idempotency_key():
+    repo = MemoryRepository(SCHEDULED_POSTS)
+    due_posts(repo, 3)
+    pub = RecordingPublisher(failures=2)
+    d = dispatcher(pub, repo, max_attempts=5)
+    d.start()
+    try:
+        await wait_for(lambda: d.published == 3)
+    finally:
+        await d.stop()
+    assert d.retried == 6 and d.failed == 0
+    assert {key for pid, key in pub.calls if pid == "p001"} == {"key-1"}
+    doc = repo.get("p001")
+    assert doc["status"] == "published" and doc["attempts"] == 3
+    assert doc["last_error"]
+
+
+async def test_gives_up_after_max_attempts():
+    repo = MemoryRepository(SCHEDULED_POSTS)
+    due_posts(repo, 1)
+    pub = RecordingPublisher(failures=99)
+    d = dispatcher(pub, repo, max_attempts=3)
+    d.start()
+    try:
+        await wait_for(lambda: d.failed == 1)
+        await asyncio.sleep(0.05)
+    finally:
+        await d.stop()
+    assert len(pub.calls) == 3
+    assert repo.get("p000")["status"] == "failed"
+    assert d.stats()["pending"] == 0
+
+
+async def test_two_dispatchers_on_one_store_publish_each_post_once():
+    repo = MemoryRepository(SCHEDULED_POSTS)
+    due_posts(repo, 30)
+    pub = RecordingPublisher(delay=0.005)
+    workers = [dispatcher(pub, repo), dispatcher(pub, repo)]
+    for d in workers:
+        d.start()
+    try:
+        await wait_for(lambda: sum(d.published for d in workers) == 30)
+        await asyncio.sleep(0.05)
+    finally:
+        for d in workers:
+            await d.stop()
+    assert sorted(pid for pid, _ in pub.calls) == [f"p{i:03d}" for i in range(30)]
+
+
+async def test_live_lease_is_respected_and_expired_one_is_taken_over():
+    repo = MemoryRepository(SCHEDULED_POSTS)
+    due_posts(repo, 1, lease_until=time.time() + 60, lease_token="other-worker")
+    repo.put({**repo.get("p000"), "id": "stale", "lease_until": time.time() - 1})
+    pub = RecordingPublisher()
+    d = dispatcher(pub, repo)
+    d.start()
+    try:
+        await wait_for(lambda: d.published == 1)
+        await asyncio.sleep(0.05)
+    finally:
+        await d.stop()
+    assert [pid for pid, _ in pub.calls] == ["stale"]
+    assert repo.get("p000")["status"] == "scheduled"
+
+
+async def test_notify_wakes_the_loop_for_new_posts():
+    repo = MemoryRepository(SCHEDULED_POSTS)
+    pub = RecordingPublisher()
+    d = dispatcher(pub, repo, refill_s=3600)  # only notify() can bring the post in
+    d.start()
+    try:
+        await asyncio.sleep(0.02)
+        doc = repo.put({"id": "soon", "user": "u", "scheduled_at": _iso(time.time() + 1), "status": "scheduled"})
+        d.notify(doc)
+        await asyncio.sleep(0.02)
+        assert d.stats()["pending"] == 1 and d.stats()["next_due"] == doc["scheduled_at"]
+        await wait_for(lambda: d.published == 1, timeout=3)
+    finally:
+        await d.stop()
+    assert pub.calls == [("soon", "soon")]  # falls back to the post id as key
+
+
+async def test_local_publisher_is_idempotent():
+    pub = LocalPublisher()
+    first = await pub.publish({"text": "hi"}, "k1")
+    assert await pub.publish({"text": "hi"}, "k1") == first
+    assert await pub.publish({"text": "hi"}, "k2") != first
+    flaky = LocalPublisher(fail_rate=1.0)
+    with pytest.raises(PublishError):
+        await flaky.publish({}, "k3")
+
+
+def test_publish_endpoint_honours_idempotency_key(client, settings):
+    headers = {"Authorization": f"Bearer {create_jwt(sub='idem@example.com', settings=settings)}"}
+    body = {"text": "Hello"}
+    a = client.post("/v1/linkedin/publish", json=body, headers={**headers, "Idempotency-Key": "abc"}).json()
+    b = client.post("/v1/linkedin/publish", json=body, headers={**headers, "Idempotency-Key": "abc"}).json()
+    c = client.post("/v1/linkedin/publish", json=body, headers=headers).json()
+    assert a["post_id"] == b["post_id"] != c["post_id"]
+    stats = client.get("/v1/linkedin/dispatcher/stats").json()
+    assert {"pending", "inflight", "published", "retried", "failed"} <= set(stats)
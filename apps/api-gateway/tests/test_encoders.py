@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from app.agents.image_agent import build_spec, encode_image, render_poster, sniff_media_type
+
+MAGIC = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+@pytest.mark.parametrize("fmt", sorted(MAGIC))
+@pytest.mark.parametrize("profile", ["default", "preview"])
+def test_each_format_and_profile_encodes(fmt, profile):
+    spec = build_spec("Encoder matrix", ["a"], width=640, format=fmt, profile=profile)
+    img_bytes = render_poster(spec)
+    assert sniff_media_type(img_bytes) == MAGIC[fmt]
+    assert Image.open(BytesIO(img_bytes)).size == (spec.width, spec.height)
+
+
+def test_quality_and_compress_level_are_honoured():
+    img = Image.effect_noise((256, 256), 64).convert("RGB")
+    assert len(encode_image(img, "jpeg", quality=20)) < len(encode_image(img, "jpeg", quality=95))
+    assert len(encode_image(img, "png", compress_level=0)) > len(encode_image(img, "png", compress_level=9))
+    assert encode_image(img, "jpg")[:2] == b"\xff\xd8"  # alias
+
+
+def test_preview_png_is_fast_encode_not_optimize():
+    spec = build_spec("Preview profile", ["b"], width=640)
+    preview = build_spec("Preview profile", ["b"], width=640, profile="preview")
+    # same pixels, cheaper zlib level: never smaller than the optimized asset
+    assert len(render_poster(preview)) >= len(render_poster(spec))
+
+
+def test_endpoint_media_type_follows_format(client):
+    for fmt, media_type in MAGIC.items():
+        r = client.post(
+            "/v1/images/generate",
+            json={"title": "Format endpoint", "output": "binary", "format": fmt, "width": 640},
+        )
+        assert r.headers["content-type"] == media_type
+        data = client.post(
+            "/v1/images/generate", json={"title": "Format endpoint", "format": fmt, "width": 640}
+        ).json()["data_url"]
+        assert data.startswith(f"data:{media_type};base64,")
+    assert client.post("/v1/images/generate", json={"title": "x", "format": "gif"}).status_code == 422
+    assert client.post("/v1/images/generate", json={"title": "x", "quality": 0}).status_code == 422
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from app.agents.image_agent import font_stats, load_font, resolved_fonts
+
+
+def test_fonts_are_memoized_by_weight_and_size():
+    assert load_font(41, "bold") is load_font(41, "bold")
+    assert load_font(41, "bold") is not load_font(42, "bold")
+    hits = font_stats()["hits"]
+    load_font(41, "bold")
+    assert font_stats()["hits"] == hits + 1
+
+
+def test_unknown_weight_uses_regular():
+    assert load_font(30, "extra-black") is load_font(30, "regular")
+
+
+def test_paths_resolve_once_per_weight():
+    assert resolved_fonts() == resolved_fonts()
+    assert set(resolved_fonts()) == {"regular", "bold", "mono"}
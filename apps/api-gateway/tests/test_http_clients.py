@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import deps
+from app.deps import HttpClients, get_http, get_linkedin_http, get_llm_client, http_clients
+from app.main import app
+
+@pytest.mark.anyio
+async def test_one_pooled_client_per_upstream(settings):
+    clients = HttpClients(settings)
+    try:
+        llm = clients.get("vllm")
+        assert clients.get("vllm") is llm
+        assert clients.get("linkedin") is not llm
+        assert llm.timeout.read == settings.VLLM_TIMEOUT_S
+        assert llm.timeout.connect == min(settings.VLLM_TIMEOUT_S, settings.HTTP_CONNECT_TIMEOUT_S)
+        assert clients.get("linkedin").timeout.read == settings.LINKEDIN_TIMEOUT_S
+        assert clients.get().timeout.read == settings.HTTP_TIMEOUT_S
+        assert clients.stats()["open"] == ["default", "linkedin", "vllm"]
+    finally:
+        await clients.aclose()
+    assert llm.is_closed
+    assert clients.stats()["open"] == []
+
+
+@pytest.mark.anyio
+async def test_closed_client_is_replaced(settings):
+    clients = HttpClients(settings)
+    first = clients.get()
+    await first.aclose()
+    second = clients.get()
+    assert second is not first and not second.is_closed
+    await clients.aclose()
+
+
+def test_lifespan_shares_and_closes_clients():
+    with TestClient(app):
+        registry = http_clients()
+        assert get_llm_client() is get_llm_client() is registry.get("vllm")
+        assert get_http() is registry.get("default")
+        assert get_linkedin_http() is registry.get("linkedin")
+        llm = get_llm_client()
+    assert llm.is_closed
+    assert deps._clients is None
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.routers import images
+
+
+@pytest.fixture
+def render_calls(monkeypatch):
+    calls = []
+    render, image_response = images.render, images.image_response
+
+    async def counting_render(spec):
+        calls.append(spec)
+        return await render(spec)
+
+    async def counting_response(spec, output="data_url"):
+        calls.append(spec)
+        return await image_response(spec, output)
+
+    monkeypatch.setattr(images, "render", counting_render)
+    monkeypatch.setattr(images, "image_response", counting_response)
+    return calls
+
+
+def slides(n, **extra):
+    return [{"title": f"Carousel slide {i}", "width": 640, **extra} for i in range(n)]
+
+
+def test_zip_has_one_entry_per_item_in_order(client, render_calls):
+    items = slides(3) + [{"title": "Carousel slide 0", "width": 640, "format": "webp"}] + slides(1)
+    r = client.post("/v1/images/generate/batch", json={"items": items})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(r.content)) as zf:
+        names = zf.namelist()
+        assert names == ["01-poster.png", "02-poster.png", "03-poster.png", "04-poster.webp", "05-poster.png"]
+        assert zf.read("04-poster.webp")[:4] == b"RIFF"
+        assert zf.read("05-poster.png") == zf.read("01-poster.png")
+        assert len(render_calls) == 4  # the repeated slide is drawn once
+        single = client.post("/v1/images/generate", json={**items[1], "output": "binary"}).content
+        assert zf.read("02-poster.png") == single
+
+
+def test_identical_items_render_once(client, render_calls):
+    items = slides(2) * 3
+    r = client.post("/v1/images/generate/batch", json={"items": items, "output": "data_url"})
+    out = r.json()["items"]
+    assert len(out) == 6
+    assert out[0] == out[2] == out[4] and out[1] == out[3] == out[5]
+    assert len(render_calls) == 2
+
+
+def test_url_output_lists_fetchable_urls(client):
+    r = client.post("/v1/images/generate/batch", json={"items": slides(2, brand="rose"), "output": "url"})
+    urls = [it["url"] for it in r.json()["items"]]
+    assert len(set(urls)) == 2
+    for url in urls:
+        assert client.get(url).status_code == 200
+
+
+def test_batch_size_is_bounded(client):
+    assert client.post("/v1/images/generate/batch", json={"items": []}).status_code == 422
+    assert client.post("/v1/images/generate/batch", json={"items": slides(21)}).status_code == 422
+
+
+def test_batch_fanout_is_bounded_by_pool_workers(client, monkeypatch):
+    class Pool:
+        workers = 2
+
+    inflight, peak = [0], [0]
+
+    async def slow_render(spec):
+        inflight[0] += 1
+        peak[0] = max(peak[0], inflight[0])
+        await asyncio.sleep(0.01)
+        inflight[0] -= 1
+        return b"\x89PNG"
+
+    monkeypatch.setattr(images, "get_render_pool", lambda: Pool())
+    monkeypatch.setattr(images, "render", slow_render)
+    r = client.post("/v1/images/generate/batch", json={"items": slides(12, brand="amber")})
+    assert r.status_code == 200
+    assert peak[0] == 2
@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from app.agents import image_agent
+from app.agents.image_agent import render_cache
+from app.storage import IMAGE_SPECS, get_repository
+
+
+def test_binary_output_is_raw_image_with_etag(client):
+    r = client.post("/v1/images/generate", json={"title": "Binary output", "output": "binary"})
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "image/png"
+    assert r.content.startswith(b"\x89PNG")
+    assert r.headers["etag"].strip('"') and "immutable" in r.headers["cache-control"]
+
+
+def test_url_output_serves_the_same_bytes(client):
+    body = {"title": "URL output", "bullets": ["one"]}
+    url = client.post("/v1/images/generate", json={**body, "output": "url"}).json()["url"]
+    assert url.startswith("/v1/images/")
+    direct = client.post("/v1/images/generate", json={**body, "output": "binary"})
+    fetched = client.get(url)
+    assert fetched.status_code == 200
+    assert fetched.content == direct.content
+    assert fetched.headers["etag"] == f'"{url.rsplit("/", 1)[1]}"'
+
+
+def test_if_none_match_answers_304(client):
+    url = client.post("/v1/images/generate", json={"title": "Conditional GET", "output": "url"}).json()["url"]
+    etag = client.get(url).headers["etag"]
+    r = client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+
+def test_url_survives_a_cold_worker(client):
+    # another worker has neither the spec nor the render cached; the spec comes from storage
+    url = client.post("/v1/images/generate", json={"title": "Cold worker URL", "output": "url"}).json()["url"]
+    key = url.rsplit("/", 1)[1]
+    expected = client.get(url).content
+    assert get_repository(IMAGE_SPECS).get(key) is not None
+    image_agent._SPECS.clear()
+    render_cache().memory.clear()
+    r = client.get(url)
+    assert r.status_code == 200
+    assert r.content == expected
+
+
+def test_unknown_or_malformed_id(client):
+    assert client.get("/v1/images/" + "0" * 64).status_code == 404
+    assert client.get("/v1/images/not-a-hash").status_code in (404, 422)
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth import jwt as jwt_mod
+from app.auth.jwt import create_jwt, decode_jwt, invalidate_token_cache, token_cache_stats
+
+
+def test_repeat_decode_is_a_cache_hit(settings):
+    token = create_jwt(sub="cache@example.com", settings=settings)
+    first = decode_jwt(token, settings)
+    hits = token_cache_stats()["hits"]
+    again = decode_jwt(token, settings)
+    assert again is first
+    assert token_cache_stats()["hits"] == hits + 1
+
+
+def test_entries_expire_with_the_token(settings, monkeypatch):
+    token = create_jwt(sub="ttl@example.com", settings=settings, ttl_minutes=1)
+    decode_jwt(token, settings)
+    misses = token_cache_stats()["misses"]
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    assert jwt_mod._token_cache.get(token) is None
+    assert token_cache_stats()["misses"] == misses + 1
+
+
+def test_expired_and_forged_tokens_are_rejected(settings):
+    rejected = token_cache_stats()["rejected"]
+    expired = create_jwt(sub="old@example.com", settings=settings, ttl_minutes=-1)
+    forged = create_jwt(sub="evil@example.com", settings=settings.model_copy(update={"JWT_SECRET": "other"}))
+    for token in (expired, forged, "not.a.jwt"):
+        with pytest.raises(HTTPException) as exc:
+            decode_jwt(token, settings)
+        assert exc.value.status_code == 401
+    assert token_cache_stats()["rejected"] == rejected + 3
+
+
+def test_secret_rotation_drops_verified_tokens(settings):
+    token = create_jwt(sub="rotate@example.com", settings=settings)
+    decode_jwt(token, settings)
+    rotated = settings.model_copy(update={"JWT_SECRET": "rotated-secret"})
+    invalidations = token_cache_stats()["invalidations"]
+    with pytest.raises(HTTPException):
+        decode_jwt(token, rotated)  # not served from the old secret's cache
+    assert token_cache_stats()["invalidations"] == invalidations + 1
+    assert token_cache_stats()["entries"] == 0
+    decode_jwt(token, settings)  # rotating back re-verifies rather than trusting stale entries
+    assert token_cache_stats()["invalidations"] == invalidations + 2
+
+
+def test_invalidate_forgets_everything(settings):
+    decode_jwt(create_jwt(sub="inv@example.com", settings=settings), settings)
+    assert token_cache_stats()["entries"] >= 1
+    invalidate_token_cache()
+    assert token_cache_stats()["entries"] == 0
+
+
+def test_me_endpoint_uses_cache(client, settings):
+    token = client.post("/v1/users/signup", json={"email": "me-cache@example.com", "password": "pw"}).json()
+    headers = {"Authorization": f"Bearer {token['access_token']}"}
+    assert client.get("/v1/users/me", headers=headers).json()["email"] == "me-cache@example.com"
+    hits = client.get("/v1/users/token-cache/stats").json()["hits"]
+    client.get("/v1/users/me", headers=headers)
+    assert client.get("/v1/users/token-cache/stats").json()["hits"] == hits + 1
+    assert client.get("/v1/users/me", headers={"Authorization": "Bearer nope"}).status_code == 401
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+from dataclasses import replace
+
+import pytest
+from app.agents import render_pool
+from app.agents.image_agent import build_spec, layout_params, render_poster, score_poster
+
+
+def test_seed_does_not_change_pixels_but_layout_variant_does():
+    spec = build_spec("Seeded poster", ["one", "two"], width=640)
+    assert render_poster(replace(spec, seed=7)) == render_poster(spec)
+    assert render_poster(replace(spec, layout_variant=7)) != render_poster(spec)
+    assert layout_params(None) == layout_params(None)
+    assert layout_params(7) == layout_params(7) != layout_params(8)
+
+
+def test_score_is_deterministic_and_bounded():
+    spec = build_spec("Scored poster", ["a", "b", "c"], width=640, layout_variant=3)
+    assert score_poster(spec) == score_poster(spec)
+    assert 0.0 <= score_poster(spec) <= 1.0
+
+
+@pytest.mark.anyio
+async def test_rank_candidates_sorted_with_house_layout_first_candidate(client):
+    spec = build_spec("Ranked poster", ["a", "b"], width=640)
+    ranked = await render_pool.rank_candidates(spec, 5)
+    assert len(ranked) == 5
+    assert [s for s, _ in ranked] == sorted((s for s, _ in ranked), reverse=True)
+    specs = [c for _, c in ranked]
+    assert spec in specs
+    assert len({c.layout_variant for c in specs}) == 5
+    again = await render_pool.rank_candidates(spec, 5)
+    assert [c for _, c in again] == specs  # reproducible
+
+
+@pytest.mark.anyio
+async def test_fanout_never_exceeds_pool_workers(monkeypatch):
+    class FakePool:
+        workers = 2
+        inflight = peak = 0
+
+        async def run(self, fn, *args):
+            self.inflight += 1
+            self.peak = max(self.peak, self.inflight)
+            await asyncio.sleep(0.01)
+            self.inflight -= 1
+            return 0.5
+
+    pool = FakePool()
+    monkeypatch.setattr(render_pool, "get_render_pool", lambda: pool)
+    ranked = await render_pool.rank_candidates(build_spec("Fan-out", []), 12)
+    assert len(ranked) == 12
+    assert pool.peak == 2
+
+
+def test_agents_endpoint_returns_reproducible_top_k(client):
+    body = {"title": "Agent candidates", "bullets": ["x"], "width": 640, "n_candidates": 4, "top_k": 3}
+    out = client.post("/v1/agents/images/generate", json=body).json()
+    cands = out["candidates"]
+    assert len(cands) == 3
+    assert out["data_url"] == cands[0]["data_url"]
+    assert [c["score"] for c in cands] == sorted((c["score"] for c in cands), reverse=True)
+    # a candidate's layout_variant reproduces it
+    pick = cands[1]
+    again = client.post(
+        "/v1/agents/images/generate",
+        json={"title": "Agent candidates", "bullets": ["x"], "width": 640, "layout_variant": pick["layout_variant"]},
+    ).json()
+    assert again["data_url"] == pick["data_url"]
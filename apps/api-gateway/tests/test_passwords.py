@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+from importlib.util import find_spec
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth.passwords import PasswordHasher
+from app.storage import USERS, get_repository
+
+
+@pytest.fixture
+def hasher():
+    h = PasswordHasher(bcrypt_rounds=4, workers=1, queue_size=1)
+    yield h
+    h.shutdown()
+
+
+@pytest.mark.anyio
+async def test_hash_and_verify(hasher):
+    hashed = await hasher.hash("hunter2")
+    assert hashed.startswith("$2b$04$")
+    assert await hasher.verify("hunter2", hashed) == (True, None)
+    assert await hasher.verify("wrong", hashed) == (False, None)
+    assert await hasher.verify("hunter2", "not-a-hash") == (False, None)
+    assert hasher.stats()["hashed"] == 1 and hasher.stats()["verified"] == 3
+
+
+@pytest.mark.anyio
+async def test_verify_rehashes_other_cost(hasher):
+    old = PasswordHasher(bcrypt_rounds=5, workers=1)
+    try:
+        ok, new_hash = await hasher.verify("pw", await old.hash("pw"))
+    finally:
+        old.shutdown()
+    assert ok and new_hash.startswith("$2b$04$")
+    assert await hasher.verify("pw", new_hash) == (True, None)
+    assert hasher.stats()["rehashed"] == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.skipif(find_spec("argon2") is None, reason="needs the argon2 extra")
+async def test_verify_migrates_between_schemes(hasher):
+    argon = PasswordHasher(scheme="argon2", argon2_time_cost=1, argon2_memory_kib=1024, workers=1)
+    try:
+        ok, new_hash = await hasher.verify("pw", await argon.hash("pw"))
+        assert ok and new_hash.startswith("$2b$04$")
+        ok, new_hash = await argon.verify("pw", await hasher.hash("pw"))
+        assert ok and new_hash.startswith("$argon2id$")
+    finally:
+        argon.shutdown()
+    with pytest.raises(ValueError):
+        PasswordHasher(scheme="md5")
+
+
+@pytest.mark.anyio
+async def test_admission_rejects_beyond_capacity(hasher):
+    gate = threading.Event()
+    jobs = [asyncio.ensure_future(hasher._run(gate.wait, 5)) for _ in range(hasher.capacity)]
+    await asyncio.sleep(0.05)
+    assert hasher.queue_depth == 1
+    with pytest.raises(HTTPException) as exc:
+        await hasher.hash("pw")
+    assert exc.value.status_code == 503
+    assert int(exc.value.headers["Retry-After"]) >= 1
+    gate.set()
+    await asyncio.gather(*jobs)
+    assert hasher.stats()["inflight"] == 0
+    assert hasher.stats()["rejected"] == 1
+
+
+@pytest.mark.anyio
+async def test_cancelled_job_keeps_its_slot_until_it_finishes(hasher):
+    gate = threading.Event()
+    running = asyncio.ensure_future(hasher._run(gate.wait, 5))
+    queued = asyncio.ensure_future(hasher._run(gate.wait, 5))
+    await asyncio.sleep(0.05)
+    running.cancel()  # the caller went away, the thread is still hashing
+    await asyncio.sleep(0.05)
+    with pytest.raises(HTTPException):
+        await hasher.hash("pw")
+    gate.set()
+    await queued
+    await asyncio.sleep(0.05)
+    assert hasher.stats()["inflight"] == 0
+    assert await hasher.hash("pw")
+
+
+def test_signup_login_and_rehash_on_login(client):
+    email = "rehash@example.com"
+    assert client.post("/v1/users/signup", json={"email": email, "password": "pw"}).status_code == 200
+    assert client.post("/v1/users/signup", json={"email": email, "password": "pw"}).status_code == 400
+    assert client.post("/v1/users/login", json={"email": email, "password": "nope"}).status_code == 401
+    assert client.post("/v1/users/login", json={"email": "who@example.com", "password": "pw"}).status_code == 401
+
+    # stored before PASSWORD_BCRYPT_ROUNDS was changed
+    old = PasswordHasher(bcrypt_rounds=5, workers=1)
+    try:
+        legacy = asyncio.run(old.hash("pw"))
+    finally:
+        old.shutdown()
+    get_repository(USERS).update(email, lambda u: {**u, "password_hash": legacy})
+    token = client.post("/v1/users/login", json={"email": email, "password": "pw"}).json()["access_token"]
+    assert get_repository(USERS).get(email)["password_hash"].startswith("$2b$04$")
+    me = client.get("/v1/users/me", headers={"Authorization": f"Bearer {token}"}).json()
+    assert me["email"] == email
+    assert client.get("/v1/users/hash/stats").json()["rehashed"] >= 1
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from dataclasses import replace
+
+from app.agents.image_agent import build_spec, poster_bytes, render_cache, spec_key
+
+
+def test_spec_key_is_content_addressed():
+    a = build_spec("Same title", ["one", "two"], brand="indigo")
+    b = build_spec(" Same title ", ["one", " two "], brand="indigo")  # normalised by build_spec
+    assert spec_key(a) == spec_key(b)
+    assert spec_key(a) != spec_key(replace(a, brand="rose"))
+    assert spec_key(a) != spec_key(replace(a, format="webp"))
+
+
+def test_poster_bytes_served_from_cache():
+    spec = build_spec("Render cache hit", ["x"])
+    first = poster_bytes(spec)
+    hits = render_cache().memory.hits
+    assert poster_bytes(spec) is first
+    assert render_cache().memory.hits == hits + 1
+
+
+def test_generate_endpoint_reuses_render(client):
+    params = {"title": "Cached endpoint render", "output": "binary"}
+    first = client.get("/v1/images/generate", params=params)
+    hits = client.get("/v1/images/cache/stats").json()["memory"]["hits"]
+    second = client.get("/v1/images/generate", params=params)
+    assert second.content == first.content
+    assert client.get("/v1/images/cache/stats").json()["memory"]["hits"] == hits + 1
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.agents.image_agent import build_spec, render_cache, spec_key
+from app.agents.render_pool import RenderPool
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_admission_control_rejects_with_retry_after():
+    pool = RenderPool(backend="thread", workers=1, queue_size=0, timeout=5)
+    gate = threading.Event()
+    try:
+        import asyncio
+        busy = asyncio.ensure_future(pool.run(gate.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as exc:
+            await pool.run(int, "1")
+        assert exc.value.status_code == 503
+        assert int(exc.value.headers["Retry-After"]) >= 1
+        gate.set()
+        assert await busy is True
+        assert await pool.run(int, "1") == 1  # slot released
+        assert pool.stats()["rejected"] == 1
+    finally:
+        gate.set()
+        pool.shutdown()
+
+
+async def test_timeout_answers_504_but_keeps_the_slot_until_the_job_ends():
+    import asyncio
+    pool = RenderPool(backend="thread", workers=1, queue_size=0, timeout=0.05)
+    gate = threading.Event()
+    try:
+        with pytest.raises(HTTPException) as exc:
+            await pool.run(gate.wait, 5)
+        assert exc.value.status_code == 504
+        with pytest.raises(HTTPException) as busy:
+            await pool.run(int, "1")  # the timed-out job is still running
+        assert busy.value.status_code == 503
+        gate.set()
+        await asyncio.sleep(0.05)
+        assert await pool.run(int, "2") == 2
+    finally:
+        gate.set()
+        pool.shutdown()
+
+
+async def test_render_goes_through_the_cache():
+    pool = RenderPool(backend="thread", workers=1, queue_size=1)
+    try:
+        spec = build_spec("Pool render", ["a"])
+        img = await pool.render(spec)
+        assert render_cache().get(spec_key(spec)) == img
+        assert await pool.render(spec) == img
+        assert pool.stats()["completed"] == 1  # second call never reached the pool
+    finally:
+        pool.shutdown()
+
+
+async def test_worker_stats_come_from_the_worker_processes():
+    pool = RenderPool(backend="process", workers=2, queue_size=0, prewarm_widths=[200])
+    try:
+        pid = await pool.run(os.getpid)
+        stats = pool.worker_stats()
+        assert 1 <= stats["reporting"] <= 2
+        assert pid in {w["pid"] for w in stats["workers"]}  # reported with the job's result
+        for w in stats["workers"]:
+            assert w["pid"] != os.getpid()
+            assert w["backgrounds"]["entries"] > 0  # prewarmed in the worker, not here
+            assert "hits" in w["fonts"]
+        completed = pool.stats()["completed"]
+        pool.worker_stats()
+        assert pool.stats()["completed"] == completed  # reading stats runs nothing on the workers
+    finally:
+        pool.shutdown()
+
+
+def test_stats_endpoints_report_per_worker(client):
+    client.get("/v1/images/generate", params={"title": "stats probe"})
+    stats = client.get("/v1/images/cache/stats").json()
+    assert stats["renderer"]["backend"] == "thread"
+    assert stats["workers_reporting"] == 1
+    assert stats["backgrounds"][0]["pid"] == os.getpid()
+    fonts = client.get("/v1/images/fonts").json()
+    assert fonts["workers"][0]["cached"] > 0
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from app.auth.jwt import create_jwt
+
+
+def auth(settings, email):
+    return {"Authorization": f"Bearer {create_jwt(sub=email, settings=settings)}"}
+
+
+def schedule(client, headers, when, text="post"):
+    r = client.post("/v1/linkedin/schedule", headers=headers, json={"scheduled_at": when, "text": text})
+    return r.json()["scheduled_id"]
+
+
+def test_list_is_per_user_and_chronological(client, settings):
+    alice, bob = auth(settings, "alice@example.com"), auth(settings, "bob@example.com")
+    late = schedule(client, alice, "2099-01-03T09:00:00Z")
+    early = schedule(client, alice, "2099-01-01T10:00:00+01:00")  # normalised to UTC
+    schedule(client, bob, "2099-01-02T09:00:00Z")
+    items = client.get("/v1/linkedin/scheduled", headers=alice).json()["items"]
+    assert [it["id"] for it in items] == [early, late]
+    assert items[0]["scheduled_at"] == "2099-01-01T09:00:00Z"
+    assert {it["user"] for it in items} == {"alice@example.com"}
+    assert client.get("/v1/linkedin/scheduled").status_code in (401, 403)
+
+
+def test_range_status_and_next_due(client, settings):
+    h = auth(settings, "range@example.com")
+    assert client.get("/v1/linkedin/scheduled/next", headers=h).json()["item"] is None
+    ids = [schedule(client, h, f"2099-02-0{d}T09:00:00Z") for d in range(1, 6)]
+    r = client.get("/v1/linkedin/scheduled", headers=h, params={"from": "2099-02-02T09:00:00Z", "to": "2099-02-04T09:00:00Z"})
+    assert [it["id"] for it in r.json()["items"]] == ids[1:3]  # to is exclusive
+    assert client.get("/v1/linkedin/scheduled", headers=h, params={"status": "published"}).json()["items"] == []
+    assert client.get("/v1/linkedin/scheduled/next", headers=h).json()["item"]["id"] == ids[0]
+    assert client.get("/v1/linkedin/scheduled", headers=h, params={"from": "soon"}).status_code == 422
+
+
+def test_cursor_paging(client, settings):
+    h = auth(settings, "pages@example.com")
+    ids = [schedule(client, h, "2099-03-01T09:00:00Z", text=str(i)) for i in range(7)]  # same timestamp: id breaks ties
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/v1/linkedin/scheduled", headers=h, params=params).json()
+        seen += [it["id"] for it in body["items"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == sorted(ids)
+    assert client.get("/v1/linkedin/scheduled", headers=h, params={"cursor": "bogus"}).status_code == 422
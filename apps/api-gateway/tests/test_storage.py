@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents import image_agent
+from app.agents.image_agent import render_cache
+from app.main import app
+from app.storage import (
+    CALENDAR,
+    IMAGE_SPECS,
+    USERS,
+    Collection,
+    MemoryRepository,
+    SQLiteRepository,
+    Store,
+    get_repository,
+)
+from app.storage.sqlite import SQLitePool
+
+POSTS = Collection("posts", user_field="user", date_field="date", status_field="status")
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def repo(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryRepository(POSTS)
+        return
+    pool = SQLitePool(str(tmp_path / "store.db"), size=2)
+    r = SQLiteRepository(POSTS, pool)
+    yield r
+    r.close()
+    pool.close()
+
+
+def seed(repo):
+    docs = [
+        {"id": "a", "user": "u1", "date": "2025-01-01", "status": "draft"},
+        {"id": "b", "user": "u1", "date": "2025-01-02", "status": "scheduled"},
+        {"id": "c", "user": "u2", "date": "2025-01-02", "status": "draft"},
+        {"id": "d", "user": "u1", "date": "2025-01-03", "status": "draft"},
+    ]
+    for d in docs:
+        repo.put(d)
+    return docs
+
+
+def test_crud(repo):
+    doc = {"id": "x", "title": "hello", "tags": ["a"]}
+    assert repo.put(doc) == doc
+    got = repo.get("x")
+    assert got == doc
+    got["tags"].append("mutated")  # callers get copies
+    assert repo.get("x")["tags"] == ["a"]
+    assert repo.add(doc) is False
+    assert repo.add({"id": "y"}) is True
+    assert repo.count() == 2
+    assert repo.delete("x") is True
+    assert repo.delete("x") is False
+    assert repo.get("x") is None
+
+
+def test_update_pins_the_id(repo):
+    repo.put({"id": "x", "n": 1})
+    out = repo.update("x", lambda d: {**d, "id": "other", "n": d["n"] + 1})
+    assert out == {"id": "x", "n": 2}
+    assert repo.get("other") is None
+    assert repo.count() == 1
+    assert repo.update("x", lambda d: None) == {"id": "x", "n": 2}
+    assert repo.update("missing", lambda d: d) is None
+
+
+def test_find_filters_and_orders(repo):
+    seed(repo)
+    assert [d["id"] for d in repo.find()] == ["a", "b", "c", "d"]
+    assert [d["id"] for d in repo.find(user="u1")] == ["a", "b", "d"]
+    assert [d["id"] for d in repo.find(status="draft", user="u1")] == ["a", "d"]
+    assert [d["id"] for d in repo.find(start="2025-01-02", end="2025-01-03")] == ["b", "c"]  # half-open
+    assert [d["id"] for d in repo.find(after=("2025-01-02", "b"))] == ["c", "d"]
+    assert [d["id"] for d in repo.find(limit=2)] == ["a", "b"]
+
+
+def test_reindexes_on_update(repo):
+    seed(repo)
+    repo.update("a", lambda d: {**d, "status": "published", "date": "2025-02-01"})
+    assert [d["id"] for d in repo.find(status="published")] == ["a"]
+    assert [d["id"] for d in repo.find()][-1] == "a"
+
+
+def test_concurrent_updates_are_atomic(repo):
+    repo.put({"id": "counter", "n": 0})
+
+    def bump():
+        for _ in range(50):
+            repo.update("counter", lambda d: {**d, "n": d["n"] + 1})
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert repo.get("counter")["n"] == 200
+
+
+def test_sqlite_store_is_shared_across_handles(tmp_path):
+    path = str(tmp_path / "shared.db")
+    one, two = Store("sqlite", path), Store("sqlite", path)
+    try:
+        one.repository(CALENDAR).put({"id": "i", "date": "2025-01-01", "title": "t", "status": "draft"})
+        assert two.repository(CALENDAR).get("i")["title"] == "t"  # e.g. another uvicorn worker
+    finally:
+        one.close()
+        two.close()
+    with pytest.raises(ValueError):
+        Store("redis")
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_calendar_put_uses_the_path_id(backend, settings, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", backend)
+    monkeypatch.setattr(settings, "STORAGE_SQLITE_PATH", str(tmp_path / "cal.db"))
+    with TestClient(app) as client:
+        item = client.post("/v1/calendar", params={"date": "2025-03-01", "title": "Launch"}).json()
+        body = {**item, "id": "something-else", "title": "Launch day", "date": "02/03/2025"}
+        r = client.put(f"/v1/calendar/{item['id']}", json=body)
+        assert r.json() == {**item, "title": "Launch day", "date": "2025-03-02"}
+        assert get_repository(CALENDAR).count() == 1
+        assert client.put("/v1/calendar/missing", json=body).status_code == 404
+        assert client.delete(f"/v1/calendar/{item['id']}").json() == {"ok": True}
+        assert client.get("/v1/calendar").json() == []
+
+
+def test_async_routes_keep_storage_off_the_event_loop(client, monkeypatch):
+    on_loop = []
+
+    def watch(repo):
+        for name in ("get", "add", "update"):
+            real = getattr(repo, name)
+
+            def wrapper(*args, _real=real, **kw):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop.append(_real.__name__)
+                except RuntimeError:
+                    pass
+                return _real(*args, **kw)
+
+            monkeypatch.setattr(repo, name, wrapper)
+
+    watch(get_repository(USERS))
+    watch(get_repository(IMAGE_SPECS))
+    client.post("/v1/users/signup", json={"email": "offloop@example.com", "password": "pw"})
+    client.post("/v1/users/login", json={"email": "offloop@example.com", "password": "pw"})
+    url = client.post("/v1/images/generate", json={"title": "Off-loop spec", "output": "url"}).json()["url"]
+    image_agent._SPECS.clear()
+    render_cache().memory.clear()
+    assert client.get(url).status_code == 200
+    assert on_loop == []
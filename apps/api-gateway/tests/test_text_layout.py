@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app.agents.image_agent import TITLE_MAX_LINES, build_spec, fit_font, load_font, render_poster, wrap
+
+WORDS = "grow your audience with honest posts about community building and weekly office hours".split()
+
+
+def exact_wrap(draw, text, font, max_w):
+    lines, cur = [], ""
+    for w in text.split():
+        trial = f"{cur} {w}" if cur else w
+        if cur and draw.textlength(trial, font=font) > max_w:
+            lines.append(cur)
+            cur = w
+        else:
+            cur = trial
+    return lines + [cur] if cur else lines
+
+
+@pytest.fixture
+def draw():
+    return ImageDraw.Draw(Image.new("RGB", (10, 10)))
+
+
+@pytest.mark.parametrize("size", [24, 48, 81])
+def test_wrap_matches_exact_measurement(draw, size):
+    font = load_font(size, "bold")
+    rng = random.Random(size)
+    for _ in range(50):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 25)))
+        max_w = rng.randint(150, 900)
+        assert wrap(draw, text, font, max_w) == exact_wrap(draw, text, font, max_w)
+
+
+def test_wrap_edge_cases(draw):
+    font = load_font(32)
+    assert wrap(draw, "   ", font, 300) == []
+    assert wrap(draw, "supercalifragilistic", font, 10) == ["supercalifragilistic"]  # a long word gets its own line
+
+
+def test_fit_font_shrinks_only_when_needed(draw):
+    short = fit_font(draw, "Short title", "bold", 800, TITLE_MAX_LINES, 80, 48)
+    assert short.size == 80
+    long_title = " ".join(WORDS * 2)
+    fitted = fit_font(draw, long_title, "bold", 800, TITLE_MAX_LINES, 80, 48)
+    assert 48 <= fitted.size < 80
+    if fitted.size > 48:
+        assert len(wrap(draw, long_title, fitted, 800)) <= TITLE_MAX_LINES
+        assert len(wrap(draw, long_title, load_font(fitted.size + 1, "bold"), 800)) > TITLE_MAX_LINES
+
+
+def test_long_headline_still_renders():
+    spec = build_spec(" ".join(WORDS * 3), ["one"], width=640)
+    assert render_poster(spec)[:4] == b"\x89PNG"